@@ -129,10 +129,10 @@ class ReviewFeedbackAdmin(admin.ModelAdmin):
 
 @admin.register(WebhookEventLog)
 class WebhookEventLogAdmin(admin.ModelAdmin):
-    list_display = ('id', 'event_type', 'status', 'created_at', 'error_message_short')
-    search_fields = ('event_type', 'error_message', 'payload') # Added payload to search
+    list_display = ('id', 'event_type', 'status', 'payload_size', 'created_at', 'error_message_short')
+    search_fields = ('event_id', 'event_type', 'error_message', 'payload_sha256') # Payload bodies are compressed and not searchable
     list_filter = ('event_type', 'status', 'created_at')
-    readonly_fields = ('payload_pretty', 'created_at', 'updated_at') # Make payload readable
+    readonly_fields = ('payload_pretty', 'payload_size', 'payload_sha256', 'created_at', 'updated_at') # Make payload readable
 
     def error_message_short(self, obj):
         if obj.error_message:
@@ -1,6 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework import status
 
 from .models import (
     User,
@@ -11,6 +12,8 @@ from .models import (
 from .serializers import (
     UserSerializer, AdminUserUpdateSerializer
 )
+from .review_scheduler import review_queue_depths
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 import logging
 # Create a logger instance
@@ -32,6 +35,27 @@ class AdminStatsView(APIView):
             'llm_usages': llm_usage_count,
         })
 
+class AdminReviewQueueView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """Depth of the fair review queue per repository, deepest first."""
+        try:
+            depths = review_queue_depths()
+        except Exception as e:
+            logger.warning(f"Could not read review queue depths: {str(e)}")
+            return Response({"detail": "Review queue unavailable."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        repo_names = dict(DBRepository.objects.filter(id__in=depths.keys()).values_list('id', 'repo_name'))
+        queues = [
+            {'repository_id': int(repo_id), 'repo_name': repo_names.get(int(repo_id)), 'queued': depth}
+            for repo_id, depth in sorted(depths.items(), key=lambda item: item[1], reverse=True)
+        ]
+        return Response({
+            'fair_scheduling_enabled': settings.REVIEW_FAIR_SCHEDULING_ENABLED,
+            'total_queued': sum(depths.values()),
+            'repositories': queues,
+        })
+
 class AdminUserListView(APIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
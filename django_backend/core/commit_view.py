@@ -5,7 +5,6 @@ from rest_framework.decorators import action
 
 from .tasks.review_tasks import process_commit_review
 from .models import (
-    User,
     Repository as DBRepository,
     Commit as CommitModel,
     Review as ReviewModel,
@@ -158,9 +157,10 @@ class CommitViewSet(viewsets.ModelViewSet):
         if not CanAccessRepository().has_object_permission(request, self, repository):
             raise PermissionDenied("You do not have permission to trigger reviews for this repository.")
         
-        # Check for existing reviews that are completed or in progress
+        # Check for existing reviews that are completed or in progress (reviews of a push ending at this commit don't count)
         existing_reviews = ReviewModel.objects.filter(
             commit=commit,
+            base_sha__isnull=True,
             status__in=['completed', 'in_progress', 'pending']
         )
         
@@ -181,51 +181,8 @@ class CommitViewSet(viewsets.ModelViewSet):
             review_data={'message': 'Commit review manually triggered by user.'}
         )
         
-        # Prepare data for the Celery task
-        event_data = {
-            'commit': {
-                'id': commit.commit_hash,
-                'sha': commit.commit_hash,
-                'message': commit.message,
-                'url': commit.url,
-                'author': {
-                    'id': commit.author_github_id,
-                    'name': (
-                        User.objects.filter(github_id=commit.author_github_id).values_list('username', flat=True).first() 
-                        if commit.author_github_id and User.objects.filter(github_id=commit.author_github_id).exists()
-                        else None
-                    ),
-                    'email': (
-                        User.objects.filter(github_id=commit.author_github_id).values_list('email', flat=True).first()
-                        if commit.author_github_id and User.objects.filter(github_id=commit.author_github_id).exists()
-                        else None
-                    )
-                },
-                'committer': {
-                    'id': commit.committer_github_id,
-                    'name': (
-                        User.objects.filter(github_id=commit.committer_github_id).values_list('username', flat=True).first()
-                        if commit.committer_github_id and User.objects.filter(github_id=commit.committer_github_id).exists()
-                        else None
-                    ),
-                    'email': (
-                        User.objects.filter(github_id=commit.committer_github_id).values_list('email', flat=True).first()
-                        if commit.committer_github_id and User.objects.filter(github_id=commit.committer_github_id).exists()
-                        else None
-                    )
-                },
-                'timestamp': commit.timestamp.isoformat() if commit.timestamp else None
-            },
-            'repository': {
-                'id': repository.github_native_id,
-                'full_name': repository.repo_name,
-                'owner': {'login': repository.owner.username}
-            },
-            'action': 'manual_trigger'
-        }
-        
-        # Enqueue the review task
-        process_commit_review.delay(event_data, repository.id, commit.id)
+        # Enqueue the review task ahead of the webhook backlog; it builds the commit data from the DB
+        process_commit_review.apply_async(args=({}, repository.id, commit.id), queue='interactive')
         
         # Return response
         return Response({
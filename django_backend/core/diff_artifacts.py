@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from .diff_filtering import get_review_file_policy, omission_reason
+from .models import DiffArtifact, Repository
+from .services import GitHubService
+
+logger = logging.getLogger(__name__)
+
+# Fields kept from GitHub's pull request files and compare entries
+DIFF_FILE_FIELDS = ('filename', 'previous_filename', 'status', 'additions', 'deletions', 'changes', 'patch')
+
+def _decode_text(raw_content: bytes) -> Optional[str]:
+    try:
+        return raw_content.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+async def _fetch_diff_files(github: GitHubService, owner_login: str, repo_name: str, base_sha: str, head_sha: str, pr_number: Optional[int], file_policy: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if pr_number:
+        changed_files = await github.list_pull_request_files(owner_login, repo_name, pr_number)
+    else:
+        changed_files = (await github.compare_commits(owner_login, repo_name, base_sha, head_sha)).get('files') or []
+    files = [{field: changed_file[field] for field in DIFF_FILE_FIELDS if field in changed_file} for changed_file in changed_files]
+
+    try:
+        sizes = await github.get_file_sizes(owner_login, repo_name, head_sha)
+    except Exception as e:
+        logger.warning(f"Could not list file sizes of {repo_name} at {head_sha}, checking them after download: {str(e)}")
+        sizes = {}
+
+    # Pick what to download up front: nothing the file policy drops, within the file and byte caps
+    remaining_bytes = settings.DIFF_ARTIFACT_MAX_BYTES
+    to_fetch = []
+    for changed_file in files:
+        if changed_file.get('status') == 'removed':
+            continue
+        reason = omission_reason(changed_file, file_policy)
+        size = sizes.get(changed_file['filename'])
+        if reason:
+            changed_file['content_omitted'] = reason
+        elif len(to_fetch) >= settings.DIFF_ARTIFACT_MAX_FILES:
+            changed_file['content_omitted'] = 'file_limit'
+        elif size is not None and size > min(settings.DIFF_ARTIFACT_MAX_FILE_BYTES, remaining_bytes):
+            changed_file['content_omitted'] = 'too_large'
+        else:
+            remaining_bytes -= size or 0
+            to_fetch.append(changed_file)
+
+    contents = await github.get_file_contents(
+        owner_login, repo_name,
+        [changed_file['filename'] for changed_file in to_fetch],
+        head_sha,
+        concurrency=settings.DIFF_ARTIFACT_FETCH_CONCURRENCY,
+    )
+    # Files of unknown size are only checked once downloaded
+    remaining_bytes = settings.DIFF_ARTIFACT_MAX_BYTES
+    for changed_file in to_fetch:
+        raw_content = contents.get(changed_file['filename'])
+        if raw_content is None:
+            continue
+        if len(raw_content) > min(settings.DIFF_ARTIFACT_MAX_FILE_BYTES, remaining_bytes):
+            changed_file['content_omitted'] = 'too_large'
+            continue
+        text = _decode_text(raw_content)
+        if text is None:
+            changed_file['content_omitted'] = 'not_text'
+            continue
+        changed_file['content'] = text
+        remaining_bytes -= len(raw_content)
+    return files
+
+def get_stored_diff_size(repo: Repository, base_sha: Optional[str], head_sha: Optional[str]) -> Dict[str, int]:
+    """
+    The changed_files, additions and deletions of base..head as a pull_request payload counts
+    them, from the stored diff; empty if the range was never fetched.
+    """
+    artifact = DiffArtifact.objects.filter(repository=repo, base_sha=base_sha, head_sha=head_sha).only('content').first()
+    if artifact is None:
+        return {}
+    files = artifact.files
+    return {
+        'changed_files': len(files),
+        'additions': sum(diff_file.get('additions') or 0 for diff_file in files),
+        'deletions': sum(diff_file.get('deletions') or 0 for diff_file in files),
+    }
+
+def get_diff_artifact(repo: Repository, base_sha: Optional[str], head_sha: Optional[str], pr_number: Optional[int] = None, time_budget: Optional[float] = None) -> Optional[DiffArtifact]:
+    """
+    Return the stored diff of base..head, fetching it from GitHub on first use.
+
+    With pr_number the files are listed through the pull request (up to 3000 files) rather
+    than the compare API (300). Contents are only downloaded for files the repository's file
+    policy keeps, up to DIFF_ARTIFACT_MAX_FILES files and the byte caps; the others are stored
+    with their patch and a content_omitted reason. Returns None if either SHA is unknown or the
+    fetch fails or overruns time_budget (at most DIFF_ARTIFACT_FETCH_DEADLINE); the agent then
+    fetches what it needs with its own tools.
+    """
+    if not base_sha or not head_sha:
+        return None
+    artifact = DiffArtifact.objects.filter(repository=repo, base_sha=base_sha, head_sha=head_sha).first()
+    if artifact:
+        return artifact
+
+    owner_login, repo_name = repo.repo_name.split('/')
+    time_budget = min(time_budget or settings.DIFF_ARTIFACT_FETCH_DEADLINE, settings.DIFF_ARTIFACT_FETCH_DEADLINE)
+    github = GitHubService(repo.owner.github_access_token, timeout=min(settings.GITHUB_API_TIMEOUT, time_budget))
+    file_policy = get_review_file_policy(repo)
+
+    async def fetch():
+        return await asyncio.wait_for(_fetch_diff_files(github, owner_login, repo_name, base_sha, head_sha, pr_number, file_policy), time_budget)
+
+    try:
+        files = async_to_sync(fetch)()
+    except Exception as e:
+        logger.warning(f"Could not fetch diff {base_sha}..{head_sha} of {repo.repo_name}: {str(e) or type(e).__name__}")
+        return None
+
+    raw_content = json.dumps({'files': files}).encode('utf-8')
+    artifact, _ = DiffArtifact.objects.get_or_create(
+        repository=repo, base_sha=base_sha, head_sha=head_sha,
+        defaults={
+            'content': DiffArtifact.compress_content(raw_content),
+            'file_count': len(files),
+            'raw_size': len(raw_content),
+        }
+    )
+    logger.info(f"Stored diff {base_sha[:7]}..{head_sha[:7]} of {repo.repo_name}: {len(files)} file(s), {len(raw_content)} bytes uncompressed.")
+    return artifact
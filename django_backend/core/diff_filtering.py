@@ -0,0 +1,101 @@
+import fnmatch
+import math
+import posixpath
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .models import Repository
+
+# Stand-in for the model's tokenizer; code averages about four characters per token
+CHARS_PER_TOKEN = 4
+
+# Lines this long on average are minified or generated, not written by hand
+MINIFIED_MIN_CHARS = 2000
+MINIFIED_AVG_LINE_LENGTH = 300
+
+# Fields kept when a file is summarized instead of reviewed
+SUMMARY_FIELDS = ('filename', 'previous_filename', 'status', 'additions', 'deletions', 'changes')
+
+def get_review_file_policy(repo: Repository) -> Dict[str, Any]:
+    """The repository's rules for which changed files reach the review agent, with defaults filled in."""
+    return {
+        'exclude_globs': repo.review_exclude_globs if repo.review_exclude_globs is not None else list(settings.REVIEW_DEFAULT_EXCLUDE_GLOBS),
+        'max_file_changes': repo.review_max_file_changes or settings.REVIEW_MAX_FILE_CHANGES,
+        'skip_binary': repo.review_skip_binary,
+        'chunk_token_budget': repo.review_chunk_token_budget or settings.REVIEW_CHUNK_TOKEN_BUDGET,
+    }
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def diff_file_tokens(diff_file: Dict[str, Any]) -> int:
+    """Estimated tokens a changed file adds to a run's input; at least 1 so every file counts."""
+    return max(estimate_tokens(diff_file.get('patch')) + estimate_tokens(diff_file.get('content')), 1)
+
+def matches_glob(filename: str, patterns: List[str]) -> bool:
+    """
+    Whether filename matches any of the patterns. Patterns without a slash match the file name
+    in any directory; others match the path from the repository root, with * also matching /.
+    """
+    basename = posixpath.basename(filename)
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(filename if '/' in pattern else basename, pattern):
+            return True
+    return False
+
+def _looks_minified(content: Optional[str]) -> bool:
+    if not content or len(content) < MINIFIED_MIN_CHARS:
+        return False
+    return len(content) / (content.count('\n') + 1) > MINIFIED_AVG_LINE_LENGTH
+
+def omission_reason(diff_file: Dict[str, Any], policy: Dict[str, Any]) -> Optional[str]:
+    """Why a changed file should be summarized rather than reviewed, or None to review it."""
+    if matches_glob(diff_file['filename'], policy['exclude_globs']):
+        return 'excluded'
+    if diff_file.get('status') == 'renamed' and not diff_file.get('patch') and not diff_file.get('changes'):
+        # Moved without edits: nothing to review, and not a binary file either
+        return 'renamed'
+    if policy['skip_binary']:
+        # GitHub sends no patch for binary files, which also report no changed lines
+        if diff_file.get('content_omitted') == 'not_text' or (not diff_file.get('patch') and not diff_file.get('changes') and diff_file.get('status') != 'removed'):
+            return 'binary'
+        if _looks_minified(diff_file.get('content')):
+            return 'generated'
+    if (diff_file.get('changes') or 0) > policy['max_file_changes']:
+        return 'too_large'
+    return None
+
+def fit_to_token_budget(diff_file: Dict[str, Any], token_budget: int) -> Dict[str, Any]:
+    """
+    Trim a file that alone exceeds the token budget of a run: its content goes first, then
+    its patch is cut to the budget.
+    """
+    if diff_file_tokens(diff_file) <= token_budget:
+        return diff_file
+    trimmed = {key: value for key, value in diff_file.items() if key != 'content'}
+    if 'content' in diff_file:
+        trimmed['content_omitted'] = 'token_budget'
+    patch = trimmed.get('patch')
+    if estimate_tokens(patch) > token_budget:
+        trimmed['patch'] = patch[:token_budget * CHARS_PER_TOKEN]
+        trimmed['patch_truncated'] = True
+    return trimmed
+
+def filter_diff_files(diff_files: List[Dict[str, Any]], policy: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split changed files into those to review, each trimmed to the policy's token budget, and
+    summaries (name, status and line counts, plus an omitted reason) of those not worth the
+    model's input: lockfiles, vendored and generated code, binaries, pure renames and oversized
+    files.
+    """
+    reviewed, omitted = [], []
+    for diff_file in diff_files:
+        reason = omission_reason(diff_file, policy)
+        if reason:
+            summary = {field: diff_file[field] for field in SUMMARY_FIELDS if field in diff_file}
+            summary['omitted'] = reason
+            omitted.append(summary)
+        else:
+            reviewed.append(fit_to_token_budget(diff_file, policy['chunk_token_budget']))
+    return reviewed, omitted
@@ -1,20 +1,25 @@
+import asyncio
 import logging
-import time
-from typing import Dict, Any, Optional
+import httpx
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from django.conf import settings
 from langgraph_sdk import get_client
-from langsmith import Client
 logger = logging.getLogger(__name__)
 
 class LangGraphClient:
     def __init__(self):
-        self.client = get_client(url=settings.LANGGRAPH_API_URL)
+        self.client = get_client(
+            url=settings.LANGGRAPH_API_URL,
+            timeout=httpx.Timeout(settings.LANGGRAPH_READ_TIMEOUT, connect=settings.LANGGRAPH_CONNECT_TIMEOUT)
+        )
         self.assistants = None
         self.review_agent = None
         self.feedback_agent = None
 
-    async def initialize(self):
-        """Initialize the client and get assistants"""
+    async def initialize(self, force: bool = False):
+        """Initialize the client and get assistants. Already loaded assistants are reused unless force is set."""
+        if self.review_agent and self.feedback_agent and not force:
+            return
         try:
             # Ensure client is initialized (it is in __init__ if url is present)
             # self.assistants = await self.client.assistants.search() # No longer searching all
@@ -23,7 +28,6 @@ class LangGraphClient:
             # assistants = await self.client.assistants.search()
             self.review_agent = await self.client.assistants.get(settings.LANGGRAPH_REVIEW_ASSISTANT_ID)
             self.feedback_agent = await self.client.assistants.get(settings.LANGGRAPH_FEEDBACK_ASSISTANT_ID)
-            self.langsmith_client = Client(api_key=settings.LANGSMITH_API_KEY)
             if not self.review_agent:
                 logger.error(f"Review agent with ID '{settings.LANGGRAPH_REVIEW_ASSISTANT_ID}' not found.")
             if not self.feedback_agent:
@@ -40,9 +44,36 @@ class LangGraphClient:
         self,
         pr_data: Dict[str, Any],
         repo_settings: Dict[str, Any],
-        user_id: str
+        user_id: str,
+        on_run_created: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        incremental: Optional[Dict[str, Any]] = None,
+        shard: Optional[Dict[str, Any]] = None,
+        commit_range: Optional[Dict[str, Any]] = None,
+        diff_files: Optional[List[Dict[str, Any]]] = None,
+        timeout: Optional[float] = None
     ) -> Dict[str, Any]:
-        """Generate a code review for a pull request"""
+        """
+        Generate a code review for a pull request.
+
+        incremental, if given, holds since_sha, changed_files and previous_review; the agent then
+        reviews only what changed since since_sha and builds on the previous findings.
+        shard, if given, holds files, shard_index and shard_count; the agent then reviews only
+        those files, as one of several parallel runs over a large PR.
+        commit_range, if given, holds base_sha, head_sha, commits and changed_files; the agent then
+        reviews the combined changes of a push instead of a pull request.
+        diff_files, if given, are the changed files with their patch and content, prefetched by
+        the backend (see core.diff_artifacts) so the agent need not fetch them with tool calls.
+        Entries with an omitted reason are summaries of files the repository excludes from
+        review (see core.diff_filtering).
+
+        The run is streamed rather than joined. on_run_created, if given, is awaited with
+        (thread_id, run_id) as soon as the run exists, so callers can record it for cancellation.
+        on_progress, if given, is awaited with each intermediate graph state as it arrives.
+
+        timeout, if given, is the run's deadline in seconds. A run that overruns it is cancelled
+        on the LangGraph server and TimeoutError is raised.
+        """
         if not self.review_agent:
             await self.initialize()
 
@@ -63,41 +94,95 @@ class LangGraphClient:
                 "max_tokens": 32768,
                 "max_tool_calls": 7
             }
+            if incremental:
+                input_data.update(incremental)
+            if shard:
+                input_data.update(shard)
+            if commit_range:
+                input_data.update(commit_range)
+            if diff_files is not None:
+                input_data['diff_files'] = diff_files
 
-            # Start the review process
-            run = await self.client.runs.create(
-                thread_id=thread['thread_id'],
-                assistant_id=self.review_agent['assistant_id'],
-                input=input_data,
-                config={"recursion_limit": 99999999}
-            )
+            # The SDK reports the run id from the response headers through a sync callback
+            run_meta = {}
+            final_values = {}
 
-            # Wait for the run to complete
-            completed_run = await self.client.runs.join(run_id=run['run_id'], thread_id=thread["thread_id"])
+            async def stream_run() -> None:
+                nonlocal final_values
+                run_reported = False
+                async for part in self.client.runs.stream(
+                    thread['thread_id'],
+                    self.review_agent['assistant_id'],
+                    input=input_data,
+                    config={"recursion_limit": settings.LANGGRAPH_RECURSION_LIMIT},
+                    stream_mode="values",
+                    on_run_created=run_meta.update
+                ):
+                    if part.event == 'metadata' and not run_meta.get('run_id'):
+                        run_meta['run_id'] = (part.data or {}).get('run_id')
+                    if not run_reported and run_meta.get('run_id'):
+                        run_reported = True
+                        if on_run_created:
+                            await on_run_created(thread['thread_id'], run_meta['run_id'])
+                    if part.event == 'error':
+                        raise Exception(f"LangGraph run {run_meta.get('run_id')} failed: {part.data}")
+                    if part.event == 'values' and isinstance(part.data, dict):
+                        final_values = part.data
+                        if on_progress:
+                            await on_progress(final_values)
 
-            # Get the final state of the feedback
-            final_state = await self.client.threads.get_state(thread['thread_id'])
             try:
-                time.sleep(5)  # Optional: wait a bit for the run to be fully processed
-                meta = self.langsmith_client.read_run(run_id=run['run_id'])
-                token_usage = {
-                    'input_tokens': meta.prompt_tokens,
-                    'output_tokens': meta.completion_tokens,
-                    'total_tokens': meta.total_tokens
-                }
-            except Exception as e_ls:
-                logger.error(f"Could not fetch token usage from Langsmith: {e_ls}")
+                await asyncio.wait_for(stream_run(), timeout)
+            except asyncio.TimeoutError:
+                await self._cancel_overrun(thread['thread_id'], run_meta.get('run_id'))
+                raise TimeoutError(f"Review run {run_meta.get('run_id') or '(not started)'} exceeded its {timeout:.0f}s deadline and was cancelled.")
+
+            # Token usage is read from LangSmith later by collect_llm_usage, keyed by run_id
             return {
                 'thread_id': thread['thread_id'],
-                'run_id': run['run_id'],
-                'review_data': final_state['values'],
-                'token_usage': token_usage
+                'run_id': run_meta.get('run_id'),
+                'review_data': final_values,
             }
 
         except Exception as e:
             logger.error(f"Error generating review: {str(e)}")
             raise
 
+    async def _cancel_overrun(self, thread_id: str, run_id: Optional[str]) -> None:
+        # Best effort: the server keeps running an overrun run unless told otherwise
+        if not run_id:
+            return
+        try:
+            await self.cancel_run(thread_id, run_id)
+        except Exception:
+            pass
+
+    async def cancel_run(self, thread_id: str, run_id: str) -> None:
+        """Cancel a pending or running LangGraph run."""
+        try:
+            await self.client.runs.cancel(thread_id=thread_id, run_id=run_id)
+        except Exception as e:
+            logger.error(f"Error cancelling run {run_id} on thread {thread_id}: {str(e)}")
+            raise
+
+    async def create_thread(self) -> str:
+        """Create an empty thread and return its ID."""
+        try:
+            thread = await self.client.threads.create()
+            return thread['thread_id']
+        except Exception as e:
+            logger.error(f"Error creating thread: {str(e)}")
+            raise
+
+    async def copy_thread(self, thread_id: str) -> str:
+        """Copy a thread with its state and return the new thread's ID."""
+        try:
+            thread = await self.client.threads.copy(thread_id)
+            return thread['thread_id']
+        except Exception as e:
+            logger.error(f"Error copying thread {thread_id}: {str(e)}")
+            raise
+
     async def handle_feedback(
         self,
         feedback: str,
@@ -142,7 +227,7 @@ class LangGraphClient:
                 })
             
             # The thread_id for the run/wait call
-            config = {"recursion_limit": 99999999} # Configurable can be added if needed by your LangGraph setup
+            config = {"recursion_limit": settings.LANGGRAPH_RECURSION_LIMIT}
 
             run = await self.client.runs.create( # Use create then join, or wait if your SDK version supports it well
                 assistant_id=self.feedback_agent['assistant_id'],
@@ -151,32 +236,22 @@ class LangGraphClient:
                 config=config # Pass config here if using create
             )
             
-            # Wait for the run to complete
-            completed_run = await self.client.runs.join(run_id=run['run_id'], thread_id=thread_id) # Adjust timeout
+            # Wait for the run to complete, but not past the deadline of the request waiting on it
+            try:
+                completed_run = await asyncio.wait_for(
+                    self.client.runs.join(run_id=run['run_id'], thread_id=thread_id), settings.FEEDBACK_RUN_DEADLINE
+                )
+            except asyncio.TimeoutError:
+                await self._cancel_overrun(thread_id, run['run_id'])
+                raise TimeoutError(f"Feedback run {run['run_id']} exceeded its {settings.FEEDBACK_RUN_DEADLINE}s deadline and was cancelled.")
 
             # Get the final state of the feedback
             final_state = await self.client.threads.get_state(thread_id)
             
-            # Fetch token usage if not in completed_run or final_state
-            # This part depends on your LangGraph SDK version and Langsmith client integration
-            # token_usage = completed_run.get('token_usage', {})
-            # if not token_usage and hasattr(self, 'langsmith_client'): # Hypothetical langsmith_client
-            token_usage = {}
-            try:
-                time.sleep(1)  # Optional: wait a bit for the run to be fully processed
-                meta = self.langsmith_client.read_run(run_id=run['run_id'])
-                token_usage = {
-                    'input_tokens': meta.prompt_tokens,
-                    'output_tokens': meta.completion_tokens,
-                    'total_tokens': meta.total_tokens
-                }
-            except Exception as e_ls:
-                logger.error(f"Could not fetch token usage from Langsmith: {e_ls}")
-
+            # Token usage is read from LangSmith later by collect_llm_usage, keyed by run_id
             return {
                 'run_id': run['run_id'],
                 'feedback_data': final_state.get('values', {}), # Get the 'values' from the state
-                'token_usage': token_usage
             }
 
         except Exception as e:
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+import aiohttp
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Repository, WebhookEventLog
+
+class Command(BaseCommand):
+    help = (
+        "Replay stored webhook deliveries (or an NDJSON capture) against github_webhook, "
+        "re-signed with each repository's secret, and report latency and throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000/api/v1/webhook/github/', help="Webhook endpoint to send deliveries to.")
+        parser.add_argument('--ndjson', help="Read deliveries from an NDJSON file instead of WebhookEventLog. Each line: {\"event_type\": ..., \"payload\": {...}}.")
+        parser.add_argument('--repo', help="Only replay deliveries for this repository full name (owner/name).")
+        parser.add_argument('--event-type', help="Only replay deliveries of this event type, e.g. pull_request or push.")
+        parser.add_argument('--since-days', type=int, help="Only replay stored deliveries from the last N days.")
+        parser.add_argument('--limit', type=int, default=1000, help="Maximum number of distinct deliveries to load.")
+        parser.add_argument('--requests', type=int, help="Total requests to send, cycling through the loaded deliveries. Defaults to one per delivery.")
+        parser.add_argument('--rate', type=float, default=0, help="Target requests per second. 0 sends as fast as concurrency allows.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Maximum requests in flight.")
+        parser.add_argument('--timeout', type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument('--secret', help="Sign every request with this secret instead of the repository's.")
+        parser.add_argument('--keep-delivery-ids', action='store_true', help="Reuse stored X-GitHub-Delivery IDs (they will be deduplicated by the endpoint).")
+
+    def handle(self, *args, **options):
+        deliveries = self._load_ndjson(options) if options['ndjson'] else self._load_event_logs(options)
+        if not deliveries:
+            raise CommandError("No webhook deliveries found to replay.")
+
+        total_requests = options['requests'] or len(deliveries)
+        self.stdout.write(
+            f"Replaying {total_requests} request(s) from {len(deliveries)} delivery(ies) to {options['url']} "
+            f"(rate: {str(options['rate']) + '/s' if options['rate'] else 'unlimited'}, concurrency: {options['concurrency']})"
+        )
+        results, elapsed = asyncio.run(self._replay(deliveries, total_requests, options))
+        self._report(results, elapsed)
+
+    def _load_event_logs(self, options):
+        queryset = WebhookEventLog.objects.select_related('payload_blob').filter(payload_blob__isnull=False).order_by('created_at')
+        if options['repo']:
+            queryset = queryset.filter(repository__repo_name=options['repo'])
+        if options['event_type']:
+            queryset = queryset.filter(event_type=options['event_type'])
+        if options['since_days']:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=options['since_days']))
+
+        deliveries = []
+        for event_log in queryset[:options['limit']]:
+            body = event_log.raw_payload
+            deliveries.append({
+                'event_type': event_log.event_type,
+                'delivery_id': event_log.event_id,
+                'repo_name': self._repo_name(json.loads(body)),
+                'body': body,
+            })
+        return self._sign(deliveries, options)
+
+    def _load_ndjson(self, options):
+        deliveries = []
+        try:
+            with open(options['ndjson'], encoding='utf-8') as capture:
+                for line_number, line in enumerate(capture, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        payload = record['payload']
+                        event_type = record['event_type']
+                    except (json.JSONDecodeError, KeyError) as e:
+                        raise CommandError(f"Invalid NDJSON record on line {line_number}: {e}")
+                    repo_name = self._repo_name(payload)
+                    if options['repo'] and repo_name != options['repo']:
+                        continue
+                    if options['event_type'] and event_type != options['event_type']:
+                        continue
+                    deliveries.append({
+                        'event_type': event_type,
+                        'delivery_id': record.get('delivery_id'),
+                        'repo_name': repo_name,
+                        'body': json.dumps(payload).encode('utf-8'),
+                    })
+                    if len(deliveries) >= options['limit']:
+                        break
+        except OSError as e:
+            raise CommandError(f"Could not read {options['ndjson']}: {e}")
+        return self._sign(deliveries, options)
+
+    @staticmethod
+    def _repo_name(payload):
+        return (payload.get('repository') or {}).get('full_name') if isinstance(payload, dict) else None
+
+    def _sign(self, deliveries, options):
+        """Attach an X-Hub-Signature-256 computed with the secret github_webhook will check against."""
+        secrets = dict(
+            Repository.objects.filter(
+                repo_name__in={d['repo_name'] for d in deliveries if d['repo_name']}
+            ).values_list('repo_name', 'webhook_secret')
+        )
+        for delivery in deliveries:
+            secret = options['secret'] or secrets.get(delivery['repo_name']) or settings.GITHUB_WEBHOOK_SECRET
+            digest = hmac.new(secret.encode('utf-8'), delivery['body'], hashlib.sha256).hexdigest()
+            delivery['signature'] = f"sha256={digest}"
+        return deliveries
+
+    async def _replay(self, deliveries, total_requests, options):
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        timeout = aiohttp.ClientTimeout(total=options['timeout'])
+        interval = 1 / options['rate'] if options['rate'] else 0
+        results = []
+
+        async def send(session, delivery):
+            delivery_id = delivery['delivery_id'] if options['keep_delivery_ids'] and delivery['delivery_id'] else str(uuid.uuid4())
+            headers = {
+                'Content-Type': 'application/json',
+                'X-GitHub-Event': delivery['event_type'],
+                'X-GitHub-Delivery': delivery_id,
+                'X-Hub-Signature-256': delivery['signature'],
+            }
+            started = time.perf_counter()
+            try:
+                async with session.post(options['url'], data=delivery['body'], headers=headers) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = type(e).__name__
+            finally:
+                semaphore.release()
+            results.append((status, time.perf_counter() - started))
+
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            started = time.perf_counter()
+            tasks = []
+            for i in range(total_requests):
+                if interval:
+                    # Open-loop schedule so a slow endpoint shows up as latency, not a lower send rate
+                    delay = started + i * interval - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await semaphore.acquire()
+                tasks.append(asyncio.create_task(send(session, deliveries[i % len(deliveries)])))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+        return results, elapsed
+
+    def _report(self, results, elapsed):
+        latencies = sorted(latency for _, latency in results)
+        statuses = Counter(str(status) for status, _ in results)
+        succeeded = sum(count for status, count in statuses.items() if status.startswith('2'))
+
+        def percentile(pct):
+            # Nearest-rank percentile over the sorted latencies, in milliseconds
+            index = max(0, math.ceil(pct / 100 * len(latencies)) - 1)
+            return latencies[index] * 1000
+
+        self.stdout.write(f"Requests:   {len(results)} in {elapsed:.2f}s ({len(results) / elapsed if elapsed else 0:.1f} req/s)")
+        self.stdout.write(f"Succeeded:  {succeeded} (2xx)")
+        self.stdout.write("Statuses:   " + ", ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+        self.stdout.write(f"Latency ms: p50={percentile(50):.1f} p95={percentile(95):.1f} p99={percentile(99):.1f} max={latencies[-1] * 1000:.1f}")
+        if succeeded == len(results):
+            self.stdout.write(self.style.SUCCESS("All requests succeeded."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(results) - succeeded} request(s) did not return 2xx."))
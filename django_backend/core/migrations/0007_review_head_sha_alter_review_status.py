@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_thread_created_by'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='head_sha',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('failed', 'Failed'), ('processing', 'Processing'), ('pending_analysis', 'Pending Analysis'), ('superseded', 'Superseded')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_review_head_sha_alter_review_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='langgraph_run_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='langgraph_thread_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
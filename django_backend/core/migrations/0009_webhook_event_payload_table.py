@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:06
+
+import gzip
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_payloads_to_payload_table(apps, schema_editor):
+    WebhookEventLog = apps.get_model('core', 'WebhookEventLog')
+    WebhookEventPayload = apps.get_model('core', 'WebhookEventPayload')
+    for event in WebhookEventLog.objects.only('id', 'payload', 'headers').iterator(chunk_size=500):
+        raw_body = json.dumps(event.payload).encode('utf-8')
+        WebhookEventPayload.objects.create(
+            event_id=event.id,
+            body=gzip.compress(raw_body),
+            headers=gzip.compress(json.dumps(event.headers).encode('utf-8')) if event.headers else None,
+        )
+        WebhookEventLog.objects.filter(id=event.id).update(
+            payload_size=len(raw_body),
+            payload_sha256=hashlib.sha256(raw_body).hexdigest(),
+        )
+
+
+def move_payloads_back_to_log_table(apps, schema_editor):
+    WebhookEventLog = apps.get_model('core', 'WebhookEventLog')
+    WebhookEventPayload = apps.get_model('core', 'WebhookEventPayload')
+    for blob in WebhookEventPayload.objects.iterator(chunk_size=500):
+        WebhookEventLog.objects.filter(id=blob.event_id).update(
+            payload=json.loads(gzip.decompress(blob.body)),
+            headers=json.loads(gzip.decompress(blob.headers)) if blob.headers else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_review_langgraph_run_id_review_langgraph_thread_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEventPayload',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload_blob', serialize=False, to='core.webhookeventlog')),
+                ('body', models.BinaryField(help_text='gzip-compressed raw request body')),
+                ('headers', models.BinaryField(blank=True, help_text='gzip-compressed JSON request headers', null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='webhookeventlog',
+            name='payload_sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 of the raw request body', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='webhookeventlog',
+            name='payload_size',
+            field=models.PositiveIntegerField(default=0, help_text='Size of the raw request body in bytes'),
+        ),
+        migrations.AlterField(
+            model_name='webhookeventlog',
+            name='payload',
+            field=models.JSONField(null=True),
+        ),
+        # Payloads are restored as JSON on reverse; original byte-for-byte bodies are not kept by the old schema
+        migrations.RunPython(move_payloads_to_payload_table, move_payloads_back_to_log_table),
+        migrations.RemoveField(
+            model_name='webhookeventlog',
+            name='headers',
+        ),
+        migrations.RemoveField(
+            model_name='webhookeventlog',
+            name='payload',
+        ),
+    ]
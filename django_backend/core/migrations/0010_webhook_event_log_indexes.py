@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_webhook_event_payload_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='webhookeventlog',
+            index=models.Index(fields=['repository', '-created_at'], name='webhook_event_repo_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookeventlog',
+            index=models.Index(fields=['created_at'], name='webhook_event_created_idx'),
+        ),
+    ]
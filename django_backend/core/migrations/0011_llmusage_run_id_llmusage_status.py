@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_webhook_event_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmusage',
+            name='run_id',
+            field=models.CharField(blank=True, db_index=True, help_text='LangGraph/LangSmith run the tokens were spent on', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='llmusage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('recorded', 'Recorded'), ('unavailable', 'Unavailable')], default='recorded', max_length=20),
+        ),
+    ]
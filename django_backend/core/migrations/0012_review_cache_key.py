@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_llmusage_run_id_llmusage_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_review_cache_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='base_sha',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_review_base_sha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiffArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('base_sha', models.CharField(max_length=255)),
+                ('head_sha', models.CharField(max_length=255)),
+                ('content', models.BinaryField(help_text='gzip-compressed JSON: changed files with patch and content')),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('raw_size', models.PositiveIntegerField(default=0, help_text='Size of the uncompressed JSON in bytes')),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='diff_artifacts', to='core.repository')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='diff_artifact_created_idx')],
+                'unique_together': {('repository', 'base_sha', 'head_sha')},
+            },
+        ),
+    ]
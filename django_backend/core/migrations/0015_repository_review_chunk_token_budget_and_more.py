@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_diffartifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repository',
+            name='review_chunk_token_budget',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='review_exclude_globs',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='review_max_file_changes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='review_skip_binary',
+            field=models.BooleanField(default=True),
+        ),
+    ]
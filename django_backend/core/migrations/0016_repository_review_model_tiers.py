@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_repository_review_chunk_token_budget_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repository',
+            name='review_model_tiers',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
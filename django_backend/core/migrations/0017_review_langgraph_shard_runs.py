@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_repository_review_model_tiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='langgraph_shard_runs',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_review_langgraph_shard_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commit',
+            name='changed_file_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from .models import Repository
+
+logger = logging.getLogger(__name__)
+
+# Local size estimate of a diff in model tokens, from the line and file counts GitHub sends
+# with webhooks: a changed line with its share of hunk context, plus each file's header
+TOKENS_PER_CHANGED_LINE = 12
+TOKENS_PER_CHANGED_FILE = 150
+# Push payloads list changed files but no line counts
+ASSUMED_LINES_PER_FILE = 40
+
+def get_review_model_tiers(repo: Repository) -> List[Dict[str, Any]]:
+    """The repository's model tiers, smallest max_tokens first and unlimited (null) last."""
+    tiers = repo.review_model_tiers if repo.review_model_tiers is not None else settings.REVIEW_MODEL_TIERS
+    return sorted(tiers, key=lambda tier: (tier.get('max_tokens') is None, tier.get('max_tokens') or 0))
+
+def estimate_review_tokens(changed_lines: Optional[int] = None, changed_files: Optional[int] = None) -> Optional[int]:
+    """Estimated diff tokens of a review, or None if neither count is known."""
+    if changed_lines is None and changed_files is None:
+        return None
+    if changed_lines is None:
+        changed_lines = changed_files * ASSUMED_LINES_PER_FILE
+    return changed_lines * TOKENS_PER_CHANGED_LINE + (changed_files or 0) * TOKENS_PER_CHANGED_FILE
+
+def route_review_model(repo: Repository, estimated_tokens: Optional[int]) -> str:
+    """
+    Pick the model for a review of the given estimated size: the first of the repository's
+    tiers whose max_tokens it fits, or the last tier if it fits none. Without tiers, or
+    without an estimate, the repository's llm_preference is used.
+    """
+    default_model = repo.llm_preference or settings.DEFAULT_LLM_MODEL
+    tiers = get_review_model_tiers(repo)
+    if not tiers or estimated_tokens is None:
+        return default_model
+    for tier in tiers:
+        if tier.get('max_tokens') is None or estimated_tokens <= tier['max_tokens']:
+            return tier['model']
+    logger.info(f"Review of about {estimated_tokens} tokens in {repo.repo_name} exceeds every model tier. Using {tiers[-1]['model']}.")
+    return tiers[-1]['model']
+
+def route_pr_review_model(repo: Repository, pr_data: Dict[str, Any]) -> str:
+    """
+    Route a PR review by the additions, deletions and changed_files of its pull_request payload.
+    Manual triggers carry no counts, so they get the repository's llm_preference.
+    """
+    changed_lines = None if pr_data.get('additions') is None else pr_data['additions'] + (pr_data.get('deletions') or 0)
+    return route_review_model(repo, estimate_review_tokens(changed_lines, pr_data.get('changed_files')))
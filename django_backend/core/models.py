@@ -1,3 +1,5 @@
+import gzip
+import json
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -67,6 +69,11 @@ class Repository(TimestampMixin):
     webhook_url = models.CharField(max_length=255, null=True, blank=True) # FastAPI: webhook_url
     webhook_secret = models.CharField(max_length=255, null=True, blank=True) # For verifying incoming webhooks
     webhook_last_event_at = models.DateTimeField(null=True, blank=True) # FastAPI: webhook_last_event_at
+    review_exclude_globs = models.JSONField(null=True, blank=True) # Files not sent to the review agent (List[str]); null uses REVIEW_DEFAULT_EXCLUDE_GLOBS
+    review_max_file_changes = models.PositiveIntegerField(null=True, blank=True) # Files with more changed lines are summarized, not reviewed; null uses REVIEW_MAX_FILE_CHANGES
+    review_skip_binary = models.BooleanField(default=True) # Summarize binary and minified files instead of reviewing them
+    review_chunk_token_budget = models.PositiveIntegerField(null=True, blank=True) # Diff tokens per review run; null uses REVIEW_CHUNK_TOKEN_BUDGET
+    review_model_tiers = models.JSONField(null=True, blank=True) # Models by estimated diff size (List[{model, max_tokens}]); null uses REVIEW_MODEL_TIERS, [] always uses llm_preference
 
     class Meta:
         unique_together = ('owner', 'repo_name') # Alembic: UniqueConstraint('owner_id', 'repo_name')
@@ -122,6 +129,7 @@ class Commit(TimestampMixin):
     message = models.TextField() # Alembic: commit_message (was String(255))
     url = models.CharField(max_length=255, null=True, blank=True) # Added from webhook logic
     timestamp = models.DateTimeField(null=True, blank=True) # Added from webhook logic
+    changed_file_count = models.PositiveIntegerField(null=True, blank=True) # Files added, modified or removed, from the push payload; sizes manual reviews for model routing
 
     class Meta:
         unique_together = ('repository', 'commit_hash')
@@ -136,7 +144,8 @@ class Review(TimestampMixin):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('processing', 'Processing'), # Added from webhook logic
-        ('pending_analysis', 'Pending Analysis') # Added from webhook logic
+        ('pending_analysis', 'Pending Analysis'), # Added from webhook logic
+        ('superseded', 'Superseded'), # A newer push replaced this review before it ran
     ]
     repository = models.ForeignKey(Repository, related_name='reviews', on_delete=models.CASCADE)
     pull_request = models.ForeignKey(PullRequest, related_name='reviews', on_delete=models.CASCADE, null=True, blank=True)
@@ -144,6 +153,12 @@ class Review(TimestampMixin):
     parent_review = models.ForeignKey('self', related_name='re_reviews', on_delete=models.SET_NULL, null=True, blank=True)
     status = models.CharField(max_length=20, choices=REVIEW_STATUS_CHOICES, default='pending')
     review_data = models.JSONField(null=True, blank=True)
+    head_sha = models.CharField(max_length=255, null=True, blank=True) # PR head commit this review was requested for
+    base_sha = models.CharField(max_length=255, null=True, blank=True) # Push reviews: the push's before SHA, so base_sha..head_sha is the range reviewed
+    langgraph_thread_id = models.CharField(max_length=255, null=True, blank=True) # Thread of the LangGraph run generating this review
+    langgraph_run_id = models.CharField(max_length=255, null=True, blank=True) # Recorded as soon as the run starts so it can be cancelled
+    langgraph_shard_runs = models.JSONField(null=True, blank=True) # Sharded reviews: [thread_id, run_id] of every shard's run, so all can be cancelled; chat uses the review's main Thread
+    cache_key = models.CharField(max_length=64, null=True, blank=True, db_index=True) # Identifies the diff and settings reviewed; see core.review_cache
     error_message = models.TextField(null=True, blank=True) # New field for storing error messages
     # user = models.ForeignKey(User, related_name='reviews', on_delete=models.CASCADE) # Consider who owns/requested the review
 
@@ -155,6 +170,11 @@ class Review(TimestampMixin):
             )
         ]
 
+    @property
+    def is_push_review(self) -> bool:
+        # Push reviews hang off the pushed head commit and are the only commit reviews with a base SHA
+        return self.commit_id is not None and self.base_sha is not None
+
     def __str__(self):
         if self.pull_request:
             return f"Review for PR #{self.pull_request.pr_number}"
@@ -193,12 +213,19 @@ class Comment(TimestampMixin):
         return f"Comment by {self.user.username} on Thread {self.thread.id}"
 
 class LLMUsage(TimestampMixin):
+    USAGE_STATUS_CHOICES = [
+        ('pending', 'Pending'), # Tokens not yet read from LangSmith
+        ('recorded', 'Recorded'),
+        ('unavailable', 'Unavailable'), # LangSmith never reported usage for the run
+    ]
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='llm_usages', on_delete=models.CASCADE)
     review = models.ForeignKey(Review, related_name='llm_usages', null=True, blank=True, on_delete=models.CASCADE)
     llm_model = models.CharField(max_length=255)
     input_tokens = models.IntegerField()
     output_tokens = models.IntegerField()
     cost = models.FloatField()
+    run_id = models.CharField(max_length=255, null=True, blank=True, db_index=True, help_text="LangGraph/LangSmith run the tokens were spent on")
+    status = models.CharField(max_length=20, choices=USAGE_STATUS_CHOICES, default='recorded')
 
     def __str__(self):
         return f"LLM Usage by {self.user.username} for Review {self.review.id if self.review else 'N/A'}"
@@ -216,8 +243,8 @@ class WebhookEventLog(TimestampMixin):
     repository = models.ForeignKey(Repository, related_name='webhook_events', on_delete=models.CASCADE, null=True, blank=True)
     event_id = models.CharField(max_length=255, unique=True, null=True, blank=True, help_text="GitHub event ID (X-GitHub-Delivery)")
     event_type = models.CharField(max_length=100, help_text="e.g., pull_request, push")
-    payload = models.JSONField()
-    headers = models.JSONField(null=True, blank=True)
+    payload_size = models.PositiveIntegerField(default=0, help_text="Size of the raw request body in bytes")
+    payload_sha256 = models.CharField(max_length=64, null=True, blank=True, help_text="SHA-256 of the raw request body")
     status = models.CharField(max_length=20, default='received', choices=[
         ('received', 'Received'),
         ('processed', 'Processed'),
@@ -226,10 +253,93 @@ class WebhookEventLog(TimestampMixin):
     error_message = models.TextField(null=True, blank=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Per-repository counts and "recent events" in webhook_status
+            models.Index(fields=['repository', '-created_at'], name='webhook_event_repo_recent_idx'),
+            # Retention pruning by age
+            models.Index(fields=['created_at'], name='webhook_event_created_idx'),
+        ]
+
     def __str__(self):
         repo_name = self.repository.repo_name if self.repository else "Unknown"
         return f"Event {self.event_id} ({self.event_type}) - {repo_name} - {self.status}"
 
+    def _payload_blob(self):
+        try:
+            return self.payload_blob
+        except WebhookEventPayload.DoesNotExist:
+            return None
+
+    @property
+    def raw_payload(self):
+        """Raw request body as received from GitHub, loaded lazily from the payload table."""
+        blob = self._payload_blob()
+        return gzip.decompress(blob.body) if blob else None
+
+    @property
+    def payload(self):
+        """Decoded JSON payload, loaded lazily from the payload table."""
+        raw_payload = self.raw_payload
+        return json.loads(raw_payload) if raw_payload is not None else None
+
+    @property
+    def headers(self):
+        """Request headers of the delivery, loaded lazily from the payload table."""
+        blob = self._payload_blob()
+        return json.loads(gzip.decompress(blob.headers)) if blob and blob.headers else None
+
+class WebhookEventPayload(models.Model):
+    """
+    Cold storage for webhook bodies and headers, kept out of the WebhookEventLog table
+    so that status and admin queries stay on a small, index-friendly table.
+    """
+    event = models.OneToOneField(WebhookEventLog, related_name='payload_blob', on_delete=models.CASCADE, primary_key=True)
+    body = models.BinaryField(help_text="gzip-compressed raw request body")
+    headers = models.BinaryField(null=True, blank=True, help_text="gzip-compressed JSON request headers")
+
+    @staticmethod
+    def compress_body(raw_body: bytes) -> bytes:
+        return gzip.compress(raw_body, compresslevel=6)
+
+    @staticmethod
+    def compress_headers(headers: dict) -> bytes:
+        return gzip.compress(json.dumps(headers).encode('utf-8'), compresslevel=6)
+
+    def __str__(self):
+        return f"Payload for Event {self.event_id}"
+
+class DiffArtifact(TimestampMixin):
+    """
+    Changed files of one base..head range, with their patches and contents at head, fetched
+    from GitHub once and handed to every review of that range.
+    """
+    repository = models.ForeignKey(Repository, related_name='diff_artifacts', on_delete=models.CASCADE)
+    base_sha = models.CharField(max_length=255)
+    head_sha = models.CharField(max_length=255)
+    content = models.BinaryField(help_text="gzip-compressed JSON: changed files with patch and content")
+    file_count = models.PositiveIntegerField(default=0)
+    raw_size = models.PositiveIntegerField(default=0, help_text="Size of the uncompressed JSON in bytes")
+
+    class Meta:
+        unique_together = ('repository', 'base_sha', 'head_sha')
+        indexes = [
+            # Retention pruning by age
+            models.Index(fields=['created_at'], name='diff_artifact_created_idx'),
+        ]
+
+    @staticmethod
+    def compress_content(raw_content: bytes) -> bytes:
+        return gzip.compress(raw_content, compresslevel=6)
+
+    @property
+    def files(self):
+        """Decoded list of changed files."""
+        return json.loads(gzip.decompress(self.content))['files']
+
+    def __str__(self):
+        return f"Diff {self.base_sha[:7]}..{self.head_sha[:7]} of {self.repository.repo_name}"
+
 # Remember to add 'core.apps.CoreConfig' to INSTALLED_APPS in django_backend/settings.py
 # Also, set AUTH_USER_MODEL = 'core.User' in django_backend/settings.py if you use this User model for authentication.
 # Then run:
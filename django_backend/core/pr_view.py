@@ -3,9 +3,8 @@ from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .tasks.review_tasks import process_pr_review
+from .tasks.review_tasks import build_pr_payload, process_pr_review
 from .models import (
-    User,
     Repository as DBRepository,
     PullRequest as PRModel,
     Review as ReviewModel,
@@ -23,6 +22,8 @@ from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
 import logging
 from .permissions import (CanAccessRepository)
+from .review_cache import compute_review_cache_key, find_cached_review, complete_from_cache
+from .model_routing import route_pr_review_model
 # Create a logger instance
 logger = logging.getLogger(__name__)
 
@@ -252,45 +253,30 @@ class PullRequestViewSet(viewsets.ModelViewSet):
         review = ReviewModel.objects.create(
             repository=repository,
             pull_request=pr,
+            head_sha=pr.head_sha,
             status='pending',
             review_data={'message': 'Review manually triggered by user.'}
         )
-        
-        # Prepare data for the Celery task
-        author_user = User.objects.filter(github_id=pr.author_github_id).first()
-        author_login = author_user.username if author_user else None
 
-        event_data = {
-            'pull_request': {
-                'number': pr.pr_number,
-                'id': pr.pr_github_id, # Ensure this field is populated on PRModel
-                'title': pr.title,
-                'body': pr.body,
-                'html_url': pr.url,
-                'state': pr.status,
-                'head': {'sha': pr.head_sha},
-                'base': {'sha': pr.base_sha},
-                'user': {
-                    'id': pr.author_github_id, # Ensure this field is populated
-                    'login': author_login 
-                },
-                'base': { 
-                    'repo': {
-                        'owner': {'login': repository.owner.username},
-                        'name': repository.repo_name.split('/')[-1]
-                    }
-                }
-            },
-            'repository': {
-                'id': repository.github_native_id, # Ensure this field is populated
-                'full_name': repository.repo_name,
-                'owner': {'login': repository.owner.username}
-            },
-            'action': 'manual_trigger_general' 
-        }
+        # Prepare the compact pull request data the Celery task reads
+        pr_data = build_pr_payload(pr)
+
+        # Reuse a completed review of the same diff, model and settings instead of running the model again
+        llm_model = route_pr_review_model(repository, pr_data)
+        cached_review = find_cached_review(compute_review_cache_key(repository, pr.base_sha, pr.head_sha, llm_model))
+        if cached_review and complete_from_cache(review, cached_review):
+            return Response({
+                "detail": "AI review reused from an identical earlier review.",
+                "review_id": review.id,
+                "status": review.status
+            }, status=status.HTTP_201_CREATED)
         
-        # Enqueue the review task
-        process_pr_review.delay(event_data, repository.id, pr.id, triggering_user_id=request.user.id)
+        # Enqueue the review task ahead of the webhook backlog
+        process_pr_review.apply_async(
+            args=(pr_data, repository.id, pr.id),
+            kwargs={'triggering_user_id': request.user.id},
+            queue='interactive'
+        )
         
         # Return response
         return Response({
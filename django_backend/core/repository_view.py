@@ -8,6 +8,7 @@ from .models import (
     RepoCollaborator,
     PullRequest as PRModel,
     Commit as CommitModel,
+    Review as ReviewModel,
     WebhookEventLog
 )
 from .serializers import (
@@ -29,6 +30,8 @@ from django.shortcuts import get_object_or_404
 from django.urls import reverse
 import logging
 from .permissions import (IsRepositoryOwner,CanAccessRepository)
+from .webhook_secrets import invalidate_repo_webhook_secret
+from .review_scheduler import review_queue_depth
 # Create a logger instance
 logger = logging.getLogger(__name__)
 
@@ -69,11 +72,25 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         
         # Add owner as a collaborator
         RepoCollaborator.objects.create(repository=instance, user=self.request.user, role='owner')
+        # Drop any cached "not registered" entry so the new secret is used right away
+        invalidate_repo_webhook_secret(instance.repo_name)
+
+    def perform_update(self, serializer):
+        old_repo_name = serializer.instance.repo_name
+        instance = serializer.save()
+        invalidate_repo_webhook_secret(old_repo_name)
+        if instance.repo_name != old_repo_name:
+            invalidate_repo_webhook_secret(instance.repo_name)
+
+    def perform_destroy(self, instance):
+        repo_name = instance.repo_name
+        instance.delete()
+        invalidate_repo_webhook_secret(repo_name)
 
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy', 'regenerate_webhook_secret', 'webhook_status']:
             self.permission_classes = [IsAuthenticated, IsRepositoryOwner]
-        elif self.action in ['retrieve', 'collaborators', 'registered_collaborators']:
+        elif self.action in ['retrieve', 'collaborators', 'registered_collaborators', 'review_queue']:
             self.permission_classes = [IsAuthenticated, CanAccessRepository]
         elif self.action == 'by_github_id':
             # now allow owners _and_ collaborators
@@ -91,6 +108,7 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         new_secret = hashlib.sha256(os.urandom(32)).hexdigest()
         repository.webhook_secret = new_secret
         repository.save(update_fields=['webhook_secret'])
+        invalidate_repo_webhook_secret(repository.repo_name)
         # TODO: Potentially, this should also update the webhook secret on GitHub if the app manages the webhook creation.
         # For now, it just updates the secret in the DB, and the user would need to update it on GitHub manually.
         return Response({"status": "webhook secret regenerated", "new_secret_hint": "New secret stored. Update your Git provider if necessary."})
@@ -101,16 +119,15 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         repository = self.get_object() # Applies object-level permissions (IsRepositoryOwner or CanAccessRepository based on get_permissions)
         # The permission is currently set to IsRepositoryOwner in get_permissions for 'webhook_status'.
 
-        # Fetch last 5 webhook events for this repository as an example
-        recent_events = WebhookEventLog.objects.filter(repository=repository).order_by('-created_at')[:5]
-        # You might want to serialize these events if you send them
-        # For now, just a summary
+        # Fetch the last webhook event for this repository (served by the repository/created_at index)
+        last_event = WebhookEventLog.objects.filter(repository=repository).order_by('-created_at').only(
+            'event_type', 'status', 'processed_at', 'created_at'
+        ).first()
         last_event_summary = None
-        if recent_events.exists():
-            last_event = recent_events.first()
+        if last_event:
             last_event_summary = {
                 "type": last_event.event_type,
-                "timestamp": last_event.processed_at.isoformat(),
+                "timestamp": (last_event.processed_at or last_event.created_at).isoformat(),
                 "status_code": last_event.status # Assuming you add status_code to WebhookEventLog
             }
 
@@ -121,10 +138,28 @@ class RepositoryViewSet(viewsets.ModelViewSet):
             "secret": repository.webhook_secret, # Don't send this in production!
             "is_active_on_github": None, # This would require a GitHub API call to check actual status
             "last_event_received": last_event_summary,
-            "recent_event_count": WebhookEventLog.objects.filter(repository=repository).count()
+            # Bounded by WEBHOOK_EVENT_RETENTION_DAYS since older events are pruned nightly
+            "recent_event_count": WebhookEventLog.objects.filter(repository=repository).count(),
+            "retention_days": settings.WEBHOOK_EVENT_RETENTION_DAYS,
         }
         return Response(status_data)
 
+    @action(detail=True, methods=['get'], url_path='review-queue')
+    def review_queue(self, request, pk=None):
+        """Webhook-driven reviews of this repository waiting in the fair review queue, and reviews running now."""
+        repository = self.get_object() # Applies CanAccessRepository permission
+        try:
+            queued = review_queue_depth(repository.id)
+        except Exception as e:
+            logger.warning(f"Could not read review queue depth for repo {repository.id}: {str(e)}")
+            queued = None
+        return Response({
+            "repository_id": repository.id,
+            "queued": queued,
+            "in_progress": ReviewModel.objects.filter(repository=repository, status='in_progress').count(),
+            "fair_scheduling_enabled": settings.REVIEW_FAIR_SCHEDULING_ENABLED,
+        })
+
     def list(self, request, *args, **kwargs):
         """List repositories for which the current user is an owner or collaborator."""
         # Get repos owned by the user
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from django.utils import timezone
+
+from .models import Repository, Review, Thread
+from .diff_filtering import get_review_file_policy
+from .tasks.runtime import get_langgraph_client, run_async
+
+logger = logging.getLogger(__name__)
+
+def compute_review_cache_key(repo: Repository, base_sha: Optional[str], head_sha: Optional[str], llm_model: str) -> Optional[str]:
+    """
+    Key a review result by what it was computed from: repository, diff endpoints,
+    coding standards, code metrics, file filtering rules and the model the review was
+    routed to. Returns None if either SHA is unknown.
+    """
+    if not base_sha or not head_sha:
+        return None
+    review_settings = json.dumps(
+        {
+            'coding_standards': repo.coding_standards or [],
+            'code_metrics': repo.code_metrics or [],
+            'file_policy': get_review_file_policy(repo),
+        },
+        sort_keys=True,
+    )
+    settings_hash = hashlib.sha256(review_settings.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{repo.id}:{base_sha}:{head_sha}:{settings_hash}:{llm_model}".encode('utf-8')).hexdigest()
+
+def find_cached_review(cache_key: Optional[str], exclude_review_id: Optional[int] = None) -> Optional[Review]:
+    """Return the latest completed review with this cache key, if any."""
+    if not cache_key:
+        return None
+    reviews = Review.objects.filter(cache_key=cache_key, status='completed')
+    if exclude_review_id:
+        reviews = reviews.exclude(id=exclude_review_id)
+    return reviews.order_by('-updated_at').first()
+
+def copy_main_thread(source: Review, target: Review) -> None:
+    """
+    Give target its own copy of source's main conversation thread, so follow-up
+    questions on a cloned review start from the same LangGraph state.
+    """
+    source_thread = source.threads.filter(thread_type='main').order_by('created_at').first()
+    if not source_thread:
+        return
+    try:
+        thread_id = run_async(get_langgraph_client().copy_thread(source_thread.thread_id))
+    except Exception as e:
+        logger.warning(f"Could not copy thread {source_thread.thread_id} for cloned review {target.id}: {str(e)}")
+        return
+    Thread.objects.create(
+        review=target,
+        thread_id=thread_id,
+        thread_type='main',
+        title=source_thread.title,
+        status='open'
+    )
+
+def complete_from_cache(review: Review, source: Review) -> bool:
+    """
+    Complete an in-progress or pending review with a cached result instead of calling the model.
+
+    Returns False if the review was superseded or finished in the meantime.
+    """
+    if not Review.objects.filter(id=review.id, status__in=['pending', 'in_progress']).update(
+        review_data=source.review_data, cache_key=source.cache_key, status='completed', updated_at=timezone.now()
+    ):
+        return False
+    review.review_data = source.review_data
+    review.cache_key = source.cache_key
+    review.status = 'completed'
+    copy_main_thread(source, review)
+    logger.info(f"Review {review.id} completed from cached review {source.id}.")
+    return True
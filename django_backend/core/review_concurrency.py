@@ -0,0 +1,94 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Each limit is a sorted set of holders scored by lease expiry, so slots held by a
+# crashed worker free themselves once their lease runs out. A holder taking several
+# slots is stored as one member per slot.
+# KEYS: one set per limit; ARGV: now, lease expiry, member count n, n members, then one limit per key.
+# Takes the slots in every set or in none of them.
+_ACQUIRE_SCRIPT = """
+local count = tonumber(ARGV[3])
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', ARGV[1])
+    local needed = 0
+    for m = 1, count do
+        if redis.call('ZSCORE', key, ARGV[3 + m]) == false then
+            needed = needed + 1
+        end
+    end
+    if needed > 0 and redis.call('ZCARD', key) + needed > tonumber(ARGV[3 + count + i]) then
+        return 0
+    end
+end
+for i, key in ipairs(KEYS) do
+    for m = 1, count do
+        redis.call('ZADD', key, ARGV[2], ARGV[3 + m])
+    end
+    redis.call('EXPIRE', key, math.ceil(tonumber(ARGV[2]) - tonumber(ARGV[1])))
+end
+return 1
+"""
+
+_redis_client = None
+_acquire = None
+
+def get_redis_client() -> redis.Redis:
+    """Redis connection for review scheduling state shared by web and worker processes."""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REVIEW_CONCURRENCY_REDIS_URL)
+    return _redis_client
+
+def _get_acquire_script():
+    global _acquire
+    if _acquire is None:
+        _acquire = get_redis_client().register_script(_ACQUIRE_SCRIPT)
+    return _acquire
+
+def _slot_limits(llm_model: str, repository_id: int):
+    model = (llm_model or settings.DEFAULT_LLM_MODEL).lower()
+    model_limit = settings.REVIEW_MODEL_CONCURRENCY_LIMITS.get(model, settings.REVIEW_CONCURRENCY_PER_MODEL)
+    return [
+        (f"review-slots:model:{model}", model_limit),
+        (f"review-slots:repo:{repository_id}", settings.REVIEW_CONCURRENCY_PER_REPO),
+    ]
+
+def _slot_members(holder: str, slots: int):
+    return [holder] if slots == 1 else [f"{holder}:{index}" for index in range(slots)]
+
+def acquire_review_slot(llm_model: str, repository_id: int, holder: str, slots: int = 1) -> bool:
+    """
+    Take the given number of review slots for the model and for the repository, or none.
+
+    A review running several LangGraph runs at once (e.g. one per shard) takes a slot per run.
+    Returns False when either limit has no room for them. If Redis is unavailable the limiter
+    fails open, so reviews are never blocked by the limiter itself.
+    """
+    limits = _slot_limits(llm_model, repository_id)
+    members = _slot_members(holder, slots)
+    now = time.time()
+    try:
+        acquired = _get_acquire_script()(
+            keys=[key for key, _ in limits],
+            args=[now, now + settings.REVIEW_SLOT_LEASE_SECONDS, len(members), *members, *[limit for _, limit in limits]],
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Review concurrency limiter unavailable, not limiting {holder}: {str(e)}")
+        return True
+    return bool(acquired)
+
+def release_review_slot(llm_model: str, repository_id: int, holder: str, slots: int = 1) -> None:
+    """Give back the slots taken by acquire_review_slot."""
+    try:
+        pipeline = get_redis_client().pipeline()
+        for key, _ in _slot_limits(llm_model, repository_id):
+            pipeline.zrem(key, *_slot_members(holder, slots))
+        pipeline.execute()
+    except redis.RedisError as e:
+        # The lease expires on its own
+        logger.warning(f"Could not release review slots for {holder}: {str(e)}")
@@ -0,0 +1,41 @@
+import logging
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+def _progress_key(review_id: int) -> str:
+    return f"review-progress:{review_id}"
+
+def _progress_event(status: str, checkpoint: int, files_with_findings: int) -> Dict[str, Any]:
+    return {
+        'status': status,
+        'checkpoint': checkpoint,
+        'files_with_findings': files_with_findings,
+        'updated_at': timezone.now().isoformat(),
+    }
+
+async def apublish_review_progress(review_id: int, status: str, checkpoint: int = 0, files_with_findings: int = 0) -> None:
+    """Publish the latest progress of a running review to the shared cache."""
+    try:
+        await cache.aset(_progress_key(review_id), _progress_event(status, checkpoint, files_with_findings), settings.REVIEW_PROGRESS_TTL)
+    except Exception as e:
+        logger.warning(f"Could not publish progress for review {review_id}: {str(e)}")
+
+def publish_review_progress(review_id: int, status: str, checkpoint: int = 0, files_with_findings: int = 0) -> None:
+    """Sync counterpart of apublish_review_progress, for the start and end of a review task."""
+    try:
+        cache.set(_progress_key(review_id), _progress_event(status, checkpoint, files_with_findings), settings.REVIEW_PROGRESS_TTL)
+    except Exception as e:
+        logger.warning(f"Could not publish progress for review {review_id}: {str(e)}")
+
+def get_review_progress(review_id: int) -> Optional[Dict[str, Any]]:
+    """Return the last published progress of a review, or None if nothing was published recently."""
+    try:
+        return cache.get(_progress_key(review_id))
+    except Exception as e:
+        logger.warning(f"Could not read progress for review {review_id}: {str(e)}")
+        return None
@@ -0,0 +1,120 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List
+
+from django.conf import settings
+
+from .review_concurrency import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Per-repository sorted set of review jobs scored by the time they are due, plus a ring of
+# repositories with queued jobs. The set mirrors the ring so membership checks stay O(1).
+_REPO_QUEUE_PREFIX = "review-queue:repo:"
+_RING_KEY = "review-queue:ring"
+_ACTIVE_KEY = "review-queue:active"
+
+# KEYS: repo queue, ring, active set; ARGV: job, repository id, due time
+_ENQUEUE_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+if redis.call('SADD', KEYS[3], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+end
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# Drops a repository from the ring only if its queue is still empty, so a job
+# enqueued concurrently is never orphaned.
+# KEYS: repo queue, ring, active set; ARGV: repository id
+_RETIRE_SCRIPT = """
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[1])
+    redis.call('LREM', KEYS[2], 0, ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_scripts = {}
+
+def _script(source: str):
+    if source not in _scripts:
+        _scripts[source] = get_redis_client().register_script(source)
+    return _scripts[source]
+
+def _repo_queue_key(repository_id) -> str:
+    return f"{_REPO_QUEUE_PREFIX}{repository_id}"
+
+def enqueue_review_job(repository_id: int, task_name: str, args: list, kwargs: Dict[str, Any], countdown: int = 0) -> int:
+    """
+    Queue a review task with the other jobs of its repository. It is released to Celery by
+    dispatch_fair_reviews once it is due and its repository's turn comes; jobs of a
+    repository are released in the order they fall due.
+
+    Returns the repository's queue depth.
+    """
+    not_before = time.time() + countdown
+    job = json.dumps({
+        'id': uuid.uuid4().hex, # Keeps identical jobs distinct members of the sorted set
+        'task': task_name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'not_before': not_before,
+    })
+    return _script(_ENQUEUE_SCRIPT)(
+        keys=[_repo_queue_key(repository_id), _RING_KEY, _ACTIVE_KEY], args=[job, repository_id, not_before]
+    )
+
+def pop_due_review_jobs(limit: int) -> List[Dict[str, Any]]:
+    """
+    Take up to limit due jobs, visiting repositories round-robin.
+
+    Each repository gives up to its weight in REVIEW_FAIR_REPO_WEIGHTS (default 1) jobs per
+    round, and the ring is rotated so the next call starts with the following repository.
+    Must only be called by one dispatcher at a time.
+    """
+    client = get_redis_client()
+    retire = _script(_RETIRE_SCRIPT)
+    ring = [repo_id.decode() for repo_id in client.lrange(_RING_KEY, 0, -1)]
+    now = time.time()
+    jobs = []
+    while ring and len(jobs) < limit:
+        released_this_round = False
+        for repo_id in list(ring):
+            if len(jobs) >= limit:
+                break
+            queue_key = _repo_queue_key(repo_id)
+            take = min(settings.REVIEW_FAIR_REPO_WEIGHTS.get(repo_id, 1), limit - len(jobs))
+            # Due jobs are found past ones still waiting out a countdown (e.g. a PR's debounce)
+            due_jobs = client.zrangebyscore(queue_key, '-inf', now, start=0, num=take)
+            if not due_jobs:
+                # The script only retires the repository if its queue is empty
+                retire(keys=[queue_key, _RING_KEY, _ACTIVE_KEY], args=[repo_id])
+                ring.remove(repo_id)
+                continue
+            for raw_job in due_jobs:
+                if client.zrem(queue_key, raw_job):
+                    jobs.append(json.loads(raw_job))
+                    released_this_round = True
+            if len(due_jobs) < take:
+                ring.remove(repo_id)
+        if not released_this_round:
+            break
+    if client.llen(_RING_KEY) > 1:
+        client.lmove(_RING_KEY, _RING_KEY, 'LEFT', 'RIGHT')
+    return jobs
+
+def review_queue_depths() -> Dict[str, int]:
+    """Queued review jobs per repository id, for repositories that have any."""
+    client = get_redis_client()
+    repo_ids = [repo_id.decode() for repo_id in client.lrange(_RING_KEY, 0, -1)]
+    pipeline = client.pipeline()
+    for repo_id in repo_ids:
+        pipeline.zcard(_repo_queue_key(repo_id))
+    return {repo_id: depth for repo_id, depth in zip(repo_ids, pipeline.execute()) if depth}
+
+def review_queue_depth(repository_id: int) -> int:
+    """Queued review jobs for one repository."""
+    return get_redis_client().zcard(_repo_queue_key(repository_id))
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import math
+import posixpath
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.langgraph_client.client import LangGraphClient
+
+logger = logging.getLogger(__name__)
+
+# State keys whose findings differ per shard and are combined; the rest is the same for every shard
+SHARD_MERGED_KEYS = ('reviews', 'fixes', 'metrics', 'final_result')
+
+def _file_weight(changed_file: Dict[str, Any]) -> int:
+    # Renames and binary files report no changed lines but still cost the agent a look
+    return max(changed_file.get('changes') or 0, 1)
+
+def plan_review_shards(
+    changed_files: List[Dict[str, Any]],
+    target_weight: int,
+    max_files: int,
+    max_shards: int,
+    weight: Callable[[Dict[str, Any]], int] = _file_weight
+) -> List[List[str]]:
+    """
+    Split a pull request's changed files (GitHub PR files entries) into groups for parallel review.
+
+    A file's weight is its changed lines, or e.g. its estimated input tokens if another weight
+    is given. Aims for about target_weight and max_files files per group, with at most
+    max_shards groups. Files in the same directory stay together unless their directory alone
+    exceeds a group's share. Returns a single group when the PR fits in one run.
+    """
+    filenames = [changed_file['filename'] for changed_file in changed_files]
+    total_weight = sum(weight(changed_file) for changed_file in changed_files)
+    shard_count = min(
+        max_shards,
+        len(filenames),
+        max(math.ceil(total_weight / target_weight), math.ceil(len(filenames) / max_files)),
+    )
+    if shard_count <= 1:
+        return [filenames]
+
+    by_directory = defaultdict(list)
+    for changed_file in changed_files:
+        by_directory[posixpath.dirname(changed_file['filename'])].append(changed_file)
+    share = total_weight / shard_count
+    units = []
+    for directory_files in by_directory.values():
+        directory_weight = sum(weight(changed_file) for changed_file in directory_files)
+        if directory_weight <= share:
+            units.append((directory_weight, [changed_file['filename'] for changed_file in directory_files]))
+        else:
+            units.extend((weight(changed_file), [changed_file['filename']]) for changed_file in directory_files)
+
+    # Largest first into the lightest group keeps the biggest group, and so the wall-clock time, small
+    shards = [[0, []] for _ in range(shard_count)]
+    for unit_weight, unit_filenames in sorted(units, key=lambda unit: unit[0], reverse=True):
+        lightest = min(shards, key=lambda shard: shard[0])
+        lightest[0] += unit_weight
+        lightest[1].extend(unit_filenames)
+    return [shard_filenames for _, shard_filenames in shards if shard_filenames]
+
+def select_diff_files(diff_files: Optional[List[Dict[str, Any]]], filenames: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    The entries of diff_files for the given files, or None if there are no prefetched files.
+    Summaries of files omitted from review (see core.diff_filtering) are kept for every selection.
+    """
+    if diff_files is None:
+        return None
+    wanted = set(filenames)
+    return [diff_file for diff_file in diff_files if diff_file.get('filename') in wanted or 'omitted' in diff_file]
+
+def _merge_values(merged: Any, value: Any) -> Any:
+    if merged is None:
+        return value
+    if isinstance(merged, list) and isinstance(value, list):
+        return merged + value
+    if isinstance(merged, dict) and isinstance(value, dict):
+        combined = dict(merged)
+        for key, item in value.items():
+            combined[key] = _merge_values(combined.get(key), item)
+        return combined
+    if isinstance(merged, str) and isinstance(value, str) and value and value != merged:
+        return f"{merged}\n\n{value}" if merged else value
+    return merged
+
+def merge_shard_review_data(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the graph states of a review's shards into one.
+
+    Findings lists are concatenated, dicts are merged key by key and differing texts are
+    joined. Keys outside SHARD_MERGED_KEYS are taken from the first shard.
+    """
+    merged = {}
+    for part in parts:
+        for key, value in part.items():
+            if key not in merged:
+                merged[key] = value
+            elif key in SHARD_MERGED_KEYS:
+                merged[key] = _merge_values(merged[key], value)
+    return merged
+
+async def generate_sharded_review(
+    client: LangGraphClient,
+    shards: List[List[str]],
+    pr_data: Dict[str, Any],
+    repo_settings: Dict[str, Any],
+    user_id: str,
+    on_run_created: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    diff_files: Optional[List[Dict[str, Any]]] = None,
+    incremental: Optional[Dict[str, Any]] = None,
+    commit_range: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Review each file group in its own LangGraph run, all runs in parallel, and merge the results.
+
+    on_progress receives the merged state of all shards so far. If any shard fails, the others
+    are stopped and their runs cancelled. Each run is given only its own files out of diff_files,
+    plus the summaries of omitted files; incremental and commit_range go to every run as given.
+
+    Each shard's thread only holds its own files, so the review's thread_id is a new empty
+    thread: the first chat message in it is seeded with the merged review (see thread_view).
+    Returns that thread_id, the first shard's run_id, every run id in run_ids and the merged
+    review_data; each shard's own thread and run are reported through on_run_created.
+    """
+    shard_values = [{} for _ in shards]
+    started_runs = {}
+
+    async def review_shard(index: int, filenames: List[str]) -> Dict[str, Any]:
+        async def record_run(thread_id: str, run_id: str) -> None:
+            started_runs[run_id] = thread_id
+            if on_run_created:
+                await on_run_created(thread_id, run_id)
+
+        async def record_progress(values: Dict[str, Any]) -> None:
+            shard_values[index] = values
+            if on_progress:
+                await on_progress(merge_shard_review_data(shard_values))
+
+        return await client.generate_review(
+            pr_data=pr_data,
+            repo_settings=repo_settings,
+            user_id=user_id,
+            on_run_created=record_run,
+            on_progress=record_progress,
+            shard={'files': filenames, 'shard_index': index, 'shard_count': len(shards)},
+            incremental=incremental,
+            commit_range=commit_range,
+            diff_files=select_diff_files(diff_files, filenames),
+            timeout=timeout
+        )
+
+    tasks = [asyncio.ensure_future(review_shard(index, filenames)) for index, filenames in enumerate(shards)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Nothing may keep running on the worker's shared loop, or on the LangGraph server
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for run_id, thread_id in started_runs.items():
+            try:
+                await client.cancel_run(thread_id, run_id)
+            except Exception:
+                pass
+        raise
+
+    try:
+        thread_id = await client.create_thread()
+    except Exception as e:
+        logger.warning(f"Could not create the chat thread of a sharded review, using the first shard's: {str(e)}")
+        thread_id = results[0]['thread_id']
+
+    return {
+        'thread_id': thread_id,
+        'run_id': results[0]['run_id'],
+        'run_ids': [result['run_id'] for result in results if result.get('run_id')],
+        'review_data': merge_shard_review_data([result['review_data'] for result in results]),
+    }
@@ -3,7 +3,7 @@ from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .tasks.review_tasks import process_pr_review
+from .tasks.review_tasks import build_pr_payload, process_pr_review, process_commit_review
 from .models import (
     Review as ReviewModel,
     Thread as ThreadModel,
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.db.models import Q 
 import logging
 from .permissions import (CanAccessRepository)
+from .review_progress import get_review_progress
 # Create a logger instance
 logger = logging.getLogger(__name__)
 
@@ -137,6 +138,24 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     @action(detail=True, methods=['get'])
+    def progress(self, request, pk=None):
+        """
+        Lightweight progress for a pending or running review.
+
+        Clients poll this instead of the full review and re-fetch the review only when
+        the checkpoint number changes.
+        """
+        review = self.get_object()
+        progress = get_review_progress(review.id) or {
+            'status': review.status,
+            'checkpoint': 0,
+            'files_with_findings': 0,
+            'updated_at': review.updated_at.isoformat() if review.updated_at else None,
+        }
+        # The row is authoritative for status; superseded reviews never publish progress
+        return Response({'review_id': review.id, **progress, 'status': review.status})
+
+    @action(detail=True, methods=['get'])
     def threads(self, request, pk=None):
         review = self.get_object() # pk is reviewId
         threads_qs = ThreadModel.objects.filter(review=review)
@@ -182,6 +201,12 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 {"detail": "No issues provided for re-review"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if review.is_push_review:
+            # Re-running it as a commit review would cover only the head commit, not the pushed range
+            return Response(
+                {"detail": "Push reviews cannot be re-reviewed. Trigger a review of the commit or of its pull request instead."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             
         try:
             # Create new review based on previous one
@@ -189,27 +214,21 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 repository=review.repository,
                 pull_request=review.pull_request,
                 commit=review.commit,
+                head_sha=review.pull_request.head_sha if review.pull_request else None,
                 status='pending',
                 parent_review=review
             )
             
             # Trigger re-review process
-            process_pr_review.delay({
-                'pull_request': {
-                    'number': review.pull_request.pr_number if review.pull_request else None,
-                    'user': {'id': request.user.id},
-                    'base': {
-                        'repo': {
-                            'owner': {'login': review.repository.owner.username},
-                            'name': review.repository.repo_name.split('/')[-1]
-                        }
-                    }
-                },
-                'repository': {
-                    'owner': {'login': review.repository.owner.username},
-                    'name': review.repository.repo_name.split('/')[-1]
-                }
-            })
+            if review.pull_request:
+                pr = review.pull_request
+                process_pr_review.apply_async(
+                    args=(build_pr_payload(pr), review.repository.id, pr.id),
+                    kwargs={'triggering_user_id': request.user.id},
+                    queue='interactive'
+                )
+            else:
+                process_commit_review.apply_async(args=({}, review.repository.id, review.commit.id), queue='interactive')
             
             return Response({
                 'review_id': new_review.id,
@@ -24,7 +24,9 @@ class RepositorySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'owner', 'repo_name', 'repo_url', 'description', 'github_native_id',
             'coding_standards', 'code_metrics', 'llm_preference', 'webhook_url',
-            'created_at', 'updated_at', 'webhook_last_event_at', 'webhook_secret'
+            'created_at', 'updated_at', 'webhook_last_event_at', 'webhook_secret',
+            'review_exclude_globs', 'review_max_file_changes', 'review_skip_binary', 'review_chunk_token_budget',
+            'review_model_tiers'
         ]
         read_only_fields = ['id', 'owner', 'created_at', 'updated_at', 'webhook_url', 'webhook_secret', 'webhook_last_event_at']
 
@@ -38,6 +40,24 @@ class RepositorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("repo_name must be in the format 'owner/repo'.")
         return value
 
+    def validate_review_exclude_globs(self, value):
+        if value is not None and (not isinstance(value, list) or not all(isinstance(pattern, str) and pattern.strip() for pattern in value)):
+            raise serializers.ValidationError("review_exclude_globs must be a list of glob patterns.")
+        return value
+
+    def validate_review_model_tiers(self, value):
+        if value is None:
+            return value
+        if not isinstance(value, list):
+            raise serializers.ValidationError("review_model_tiers must be a list of tiers.")
+        for tier in value:
+            if not isinstance(tier, dict) or not isinstance(tier.get('model'), str) or not tier['model'].strip():
+                raise serializers.ValidationError("Each model tier needs a model.")
+            max_tokens = tier.get('max_tokens')
+            if max_tokens is not None and (not isinstance(max_tokens, int) or isinstance(max_tokens, bool) or max_tokens <= 0):
+                raise serializers.ValidationError("A model tier's max_tokens must be a positive integer or null.")
+        return value
+
 class RepoCollaboratorSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     repo_id = serializers.PrimaryKeyRelatedField(queryset=DBRepository.objects.all(), source='repository')
@@ -326,9 +346,10 @@ class ReviewSerializer(serializers.ModelSerializer):
             'commit', 'commit_id', 
             'parent_review', 'parent_review_id',
             'status', 'review_data', 'threads', 'thread_count', 'error_message',
+            'head_sha', 'base_sha',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'repository', 'pull_request', 'commit', 'parent_review', 'threads', 'thread_count']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'repository', 'pull_request', 'commit', 'parent_review', 'threads', 'thread_count', 'head_sha', 'base_sha']
         extra_kwargs = {
             'status': {'required': False},  # Often auto-set
             'review_data': {'required': False},  # Often set by system processes
@@ -381,7 +402,7 @@ class WebhookEventLogSerializer(serializers.ModelSerializer):
         model = WebhookEventLog
         fields = [
             'id', 'repository', 'repository_id', 'event_id', 'event_type', 
-            'payload', 'headers', 'status', 'error_message', 
+            'payload_size', 'payload_sha256', 'status', 'error_message', 
             'processed_at', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'repository']
\ No newline at end of file
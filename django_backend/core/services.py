@@ -3,6 +3,7 @@ from django.conf import settings
 import secrets
 import urllib.parse
 import aiohttp
+import asyncio
 import hmac
 import hashlib
 
@@ -53,7 +54,7 @@ def exchange_code_for_github_token(code):
         "code": code,
     }
     headers = {"Accept": "application/json"}
-    response = requests.post(GITHUB_OAUTH_TOKEN_URL, data=payload, headers=headers)
+    response = requests.post(GITHUB_OAUTH_TOKEN_URL, data=payload, headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()  # Raise an exception for bad status codes
     return response.json().get("access_token")
 
@@ -63,13 +64,13 @@ def get_github_user_info(github_token):
         "Authorization": f"token {github_token}",
         "Accept": "application/vnd.github.v3+json",
     }
-    response = requests.get(GITHUB_API_USER_URL, headers=headers)
+    response = requests.get(GITHUB_API_USER_URL, headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()
     
     user_data = response.json()
     
     # Attempt to get primary email if available
-    email_data = requests.get(f"{GITHUB_API_USER_URL}/emails", headers=headers)
+    email_data = requests.get(f"{GITHUB_API_USER_URL}/emails", headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
     if email_data.status_code == 200:
         for email_entry in email_data.json():
             if email_entry.get('primary') and email_entry.get('verified'):
@@ -87,7 +88,7 @@ def get_user_repos_from_github(github_token, page=1, per_page=30):
         "Accept": "application/vnd.github.v3+json",
     }
     params = {"per_page": per_page, "page": page, "sort": "updated", "direction": "desc"}
-    response = requests.get(f"{GITHUB_API_USER_URL}/repos", headers=headers, params=params)
+    response = requests.get(f"{GITHUB_API_USER_URL}/repos", headers=headers, params=params, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()
     return response.json()
 
@@ -98,7 +99,7 @@ def get_user_orgs_from_github(github_token, page=1, per_page=30):
         "Accept": "application/vnd.github.v3+json",
     }
     params = {"per_page": per_page, "page": page}
-    response = requests.get(f"{GITHUB_API_USER_URL}/orgs", headers=headers, params=params)
+    response = requests.get(f"{GITHUB_API_USER_URL}/orgs", headers=headers, params=params, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()
     return response.json()
 
@@ -112,7 +113,7 @@ def get_all_repo_collaborators_from_github(owner_login: str, repo_name: str, git
             "Authorization": f"token {github_token}",
             "Accept": "application/vnd.github.v3+json",
         }
-        response = requests.get(url, headers=headers)
+        response = requests.get(url, headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
         response.raise_for_status()  # Raise an exception for HTTP errors
         current_page_collaborators = response.json()
         if not current_page_collaborators:
@@ -131,7 +132,7 @@ def get_repo_collaborators_from_github(github_token, owner_login, repo_name, pag
     }
     params = {"per_page": per_page, "page": page}
     url = f"https://api.github.com/repos/{owner_login}/{repo_name}/collaborators"
-    response = requests.get(url, headers=headers, params=params)
+    response = requests.get(url, headers=headers, params=params, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()
     return response.json()
 
@@ -146,7 +147,7 @@ def get_repository_commits_from_github(github_token: str, owner_login: str, repo
     params = {"per_page": per_page, "page": page}
     
     url = f"https://api.github.com/repos/{owner_login}/{repo_name}/commits"
-    response = requests.get(url, headers=headers, params=params)
+    response = requests.get(url, headers=headers, params=params, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()  # Raise an exception for bad status codes
     return response.json()
 
@@ -169,7 +170,7 @@ def get_repository_pull_requests_from_github(github_token: str, owner_login: str
         "page": page,
     }
     url = f"https://api.github.com/repos/{owner_login}/{repo_name}/pulls"
-    response = requests.get(url, headers=headers, params=params)
+    response = requests.get(url, headers=headers, params=params, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()  # Raise an exception for bad status codes
     return response.json()
 
@@ -182,7 +183,7 @@ def get_single_pull_request_from_github(github_token: str, owner_login: str, rep
         "Accept": "application/vnd.github.v3+json",
     }
     url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/pulls/{pr_number}"
-    response = requests.get(url, headers=headers)
+    response = requests.get(url, headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()  # Raise an exception for bad status codes (404 if not found)
     return response.json()
 
@@ -195,7 +196,7 @@ def get_single_commit_from_github(github_token: str, owner_login: str, repo_name
         "Accept": "application/vnd.github.v3+json", # Or "application/vnd.github.sha" for just the SHA
     }
     url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/commits/{commit_sha}"
-    response = requests.get(url, headers=headers)
+    response = requests.get(url, headers=headers, timeout=settings.GITHUB_API_TIMEOUT)
     response.raise_for_status()  # Raise an exception for bad status codes (404 if not found, 422 for invalid SHA)
     return response.json()
 
@@ -223,14 +224,16 @@ class LangGraphService:
 class GitHubService:
     """Service class for interacting with the GitHub API."""
     
-    def __init__(self, user_token=None):
+    def __init__(self, user_token=None, timeout=None):
         """
         Initialize the GitHub service with optional user token.
         
         Args:
             user_token (str, optional): GitHub access token. If None, use app-level authentication.
+            timeout (float, optional): Seconds allowed per request. Defaults to GITHUB_API_TIMEOUT.
         """
         self.token = user_token
+        self.timeout = aiohttp.ClientTimeout(total=timeout or settings.GITHUB_API_TIMEOUT)
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
         }
@@ -243,7 +246,7 @@ class GitHubService:
         if not self.token:
             raise ValueError("Authentication token required for this operation")
             
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.get(GITHUB_API_USER_URL, headers=self.headers) as response:
                 response.raise_for_status()
                 return await response.json()
@@ -254,7 +257,7 @@ class GitHubService:
             raise ValueError("Authentication token required for this operation")
             
         params = {"per_page": per_page, "page": page, "sort": "updated", "direction": "desc"}
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.get(f"{GITHUB_API_USER_URL}/repos", headers=self.headers, params=params) as response:
                 response.raise_for_status()
                 return await response.json()
@@ -262,7 +265,7 @@ class GitHubService:
     async def get_pull_request(self, owner_login, repo_name, pr_number):
         """Get specific pull request details."""
         url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/pulls/{pr_number}"
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.get(url, headers=self.headers) as response:
                 response.raise_for_status()
                 return await response.json()
@@ -270,17 +273,75 @@ class GitHubService:
     async def get_commit(self, owner_login, repo_name, commit_sha):
         """Get specific commit details."""
         url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/commits/{commit_sha}"
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.get(url, headers=self.headers) as response:
                 response.raise_for_status()
                 return await response.json()
     
+    async def compare_commits(self, owner_login, repo_name, base_sha, head_sha):
+        """Compare two commits; the response lists the files changed between them."""
+        url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/compare/{base_sha}...{head_sha}"
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with session.get(url, headers=self.headers) as response:
+                response.raise_for_status()
+                return await response.json()
+    
+    async def list_pull_request_files(self, owner_login, repo_name, pr_number):
+        """List the files changed by a pull request, following pagination (GitHub stops at 3000 files)."""
+        url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/pulls/{pr_number}/files"
+        files = []
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            for page in range(1, 31):
+                params = {"per_page": 100, "page": page}
+                async with session.get(url, headers=self.headers, params=params) as response:
+                    response.raise_for_status()
+                    page_files = await response.json()
+                files.extend(page_files)
+                if len(page_files) < 100:
+                    break
+        return files
+
+    async def get_file_sizes(self, owner_login, repo_name, ref):
+        """
+        Sizes in bytes of the files at ref, by path, from one recursive tree listing.
+        GitHub truncates very large trees, so paths may be missing.
+        """
+        url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/git/trees/{ref}"
+
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with session.get(url, headers=self.headers, params={"recursive": "1"}) as response:
+                response.raise_for_status()
+                tree = await response.json()
+        return {entry['path']: entry['size'] for entry in tree.get('tree', []) if entry.get('type') == 'blob' and 'size' in entry}
+
+    async def get_file_contents(self, owner_login, repo_name, paths, ref, concurrency=8):
+        """
+        Fetch the raw contents of several files at ref over one session, a few at a time.
+
+        Returns a dict of path to bytes; files that cannot be fetched map to None.
+        """
+        headers = {**self.headers, "Accept": "application/vnd.github.raw"}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(session, path):
+            url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/contents/{urllib.parse.quote(path)}"
+            async with semaphore:
+                try:
+                    async with session.get(url, headers=headers, params={"ref": ref}) as response:
+                        response.raise_for_status()
+                        return path, await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    return path, None
+
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            return dict(await asyncio.gather(*(fetch(session, path) for path in paths)))
+
     async def post_pr_comment(self, owner_login, repo_name, pr_number, body):
         """Post a comment on a pull request."""
         url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/issues/{pr_number}/comments"
         payload = {"body": body}
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.post(url, headers=self.headers, json=payload) as response:
                 response.raise_for_status()
                 return await response.json()
@@ -290,7 +351,7 @@ class GitHubService:
         url = f"{GITHUB_API_BASE_URL}/repos/{owner_login}/{repo_name}/commits/{commit_sha}/comments"
         payload = {"body": body}
         
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
             async with session.post(url, headers=self.headers, json=payload) as response:
                 response.raise_for_status()
                 return await response.json()
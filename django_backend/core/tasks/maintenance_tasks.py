@@ -0,0 +1,94 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from ..models import DiffArtifact, Review, WebhookEventLog, WebhookEventPayload
+from ..review_progress import publish_review_progress
+from .review_tasks import cancel_review_run, finish_push_review
+
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True)
+def prune_webhook_event_logs(self) -> int:
+    """
+    Delete webhook deliveries older than WEBHOOK_EVENT_RETENTION_DAYS.
+
+    Rows are removed in id-ordered batches so each statement stays short and the
+    table is never locked for the whole run. Returns the number of deliveries deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_EVENT_RETENTION_DAYS)
+    batch_size = settings.WEBHOOK_EVENT_PRUNE_BATCH_SIZE
+    total_deleted = 0
+    while True:
+        batch_ids = list(
+            WebhookEventLog.objects.filter(created_at__lt=cutoff).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch_ids:
+            break
+        WebhookEventPayload.objects.filter(event_id__in=batch_ids).delete()
+        WebhookEventLog.objects.filter(id__in=batch_ids).delete()
+        total_deleted += len(batch_ids)
+    logger.info(f"PRUNE_WEBHOOK_EVENT_LOGS_TASK: Deleted {total_deleted} webhook event(s) created before {cutoff.isoformat()}.")
+    return total_deleted
+
+@shared_task(bind=True)
+def prune_diff_artifacts(self) -> int:
+    """
+    Delete diff artifacts older than DIFF_ARTIFACT_RETENTION_DAYS, in id-ordered batches.
+
+    A later review of the same range simply fetches its diff again. Returns the number deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.DIFF_ARTIFACT_RETENTION_DAYS)
+    total_deleted = 0
+    while True:
+        batch_ids = list(
+            DiffArtifact.objects.filter(created_at__lt=cutoff).order_by('id').values_list('id', flat=True)[:settings.WEBHOOK_EVENT_PRUNE_BATCH_SIZE]
+        )
+        if not batch_ids:
+            break
+        DiffArtifact.objects.filter(id__in=batch_ids).delete()
+        total_deleted += len(batch_ids)
+    logger.info(f"PRUNE_DIFF_ARTIFACTS_TASK: Deleted {total_deleted} diff artifact(s) created before {cutoff.isoformat()}.")
+    return total_deleted
+
+@shared_task(bind=True)
+def fail_stale_reviews(self) -> int:
+    """
+    Fail reviews stuck in progress for longer than REVIEW_STALE_AFTER seconds.
+
+    Review tasks enforce their own deadline, so this only catches work whose worker died
+    or was killed at the Celery hard time limit. Their LangGraph runs are cancelled too.
+    A fanned-out push review is finished here once its commit reviews have all ended, as
+    a killed commit review never reaches its own fan-in. Returns the number of reviews failed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.REVIEW_STALE_AFTER)
+    stale_reviews = list(Review.objects.filter(status='in_progress', updated_at__lt=cutoff).values_list('id', 'parent_review_id'))
+    failed = 0
+    for review_id, parent_review_id in stale_reviews:
+        if not Review.objects.filter(id=review_id, status='in_progress', updated_at__lt=cutoff).update(
+            status='failed',
+            error_message=f"Review did not finish within {settings.REVIEW_STALE_AFTER}s and was abandoned.",
+            updated_at=timezone.now(),
+        ):
+            continue
+        failed += 1
+        publish_review_progress(review_id, 'failed')
+        cancel_review_run.delay(review_id)
+    if failed:
+        logger.warning(f"FAIL_STALE_REVIEWS_TASK: Failed {failed} review(s) stuck in progress since before {cutoff.isoformat()}.")
+
+    # Push reviews still waiting on commit reviews that have all ended, e.g. the ones failed above
+    waiting_push_ids = set(
+        Review.objects.filter(
+            status='pending', commit__isnull=False, base_sha__isnull=False, created_at__lt=cutoff, re_reviews__isnull=False
+        ).values_list('id', flat=True)
+    )
+    waiting_push_ids.update(
+        Review.objects.filter(
+            id__in=[parent_review_id for _, parent_review_id in stale_reviews if parent_review_id], commit__isnull=False, base_sha__isnull=False
+        ).values_list('id', flat=True)
+    )
+    for push_review_id in waiting_push_ids:
+        finish_push_review(push_review_id)
+    return failed
@@ -1,20 +1,264 @@
 import json
 import logging
-from typing import Dict, Any
+import random
+import time
+from typing import Dict, Any, List, Optional
 import uuid
 from celery import shared_task
+from celery.exceptions import Retry
+from kombu.exceptions import ChannelError
 from django.conf import settings
-import asyncio
-from ..models import Review, Repository, PullRequest, LLMUsage, User, Commit, Thread
-from core.langgraph_client.client import LangGraphClient
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from ..models import Review, Repository, PullRequest, User, Commit, Thread, WebhookEventLog
 from core.services import GitHubService
+from core.review_progress import apublish_review_progress, publish_review_progress
+from core.review_cache import compute_review_cache_key, find_cached_review, complete_from_cache
+from core.review_concurrency import acquire_review_slot, release_review_slot
+from core.review_scheduler import enqueue_review_job, pop_due_review_jobs
+from core.review_sharding import plan_review_shards, generate_sharded_review, merge_shard_review_data, select_diff_files
+from core.diff_artifacts import get_diff_artifact, get_stored_diff_size
+from core.diff_filtering import get_review_file_policy, filter_diff_files, diff_file_tokens
+from core.model_routing import estimate_review_tokens, route_pr_review_model, route_review_model
+from django.core.cache import cache
+from .runtime import Deadline, run_async, get_langgraph_client
+from .usage_tasks import record_pending_llm_usage
 
 logger = logging.getLogger(__name__)
 
+def project_pr_payload(pull_request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a GitHub pull_request object to the fields process_pr_review and
+    LangGraphClient.generate_review read, so review messages stay small on the broker.
+    """
+    user = pull_request.get('user') or {}
+    base = pull_request.get('base') or {}
+    base_repo = base.get('repo') or {}
+    return {
+        'number': pull_request.get('number'),
+        'user': {'id': user.get('id'), 'login': user.get('login'), 'email': user.get('email')},
+        'head': {'sha': (pull_request.get('head') or {}).get('sha')},
+        'base': {
+            'sha': base.get('sha'),
+            'repo': {'name': base_repo.get('name'), 'owner': {'login': (base_repo.get('owner') or {}).get('login')}},
+        },
+        # Size of the diff, so small PRs skip listing their files for sharding
+        'changed_files': pull_request.get('changed_files'),
+        'additions': pull_request.get('additions'),
+        'deletions': pull_request.get('deletions'),
+    }
+
+def build_pr_payload(pr: PullRequest) -> Dict[str, Any]:
+    """
+    The same compact pull_request data for a PR from the database, for manual triggers and
+    re-reviews. The author's login is needed by LangGraphClient.generate_review. The diff's
+    size comes from its stored DiffArtifact, if any, so the review is routed to the same model
+    tier as the webhook-triggered review of that head and can reuse its cached result.
+    """
+    repository = pr.repository
+    author_login = User.objects.filter(github_id=pr.author_github_id).values_list('username', flat=True).first()
+    return {
+        'number': pr.pr_number,
+        'user': {'id': pr.author_github_id, 'login': author_login},
+        'head': {'sha': pr.head_sha},
+        'base': {
+            'sha': pr.base_sha,
+            'repo': {'name': repository.repo_name.split('/')[-1], 'owner': {'login': repository.owner.username}},
+        },
+        **get_stored_diff_size(repository, pr.base_sha, pr.head_sha),
+    }
+
+# review_data keys kept from the LangGraph state, for checkpoints and final results alike
+REVIEW_DATA_KEYS = ["repo", "user", "fixes", "metrics", "reviews", "llm_model", "standards", 'final_result']
+
+def filter_review_data(raw_review_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: raw_review_data[key] for key in REVIEW_DATA_KEYS if key in raw_review_data}
+
+def _finding_path(finding: Any) -> Optional[str]:
+    if not isinstance(finding, dict):
+        return None
+    return finding.get('file') or finding.get('filename') or finding.get('file_path') or finding.get('path')
+
+def count_files_with_findings(review_data: Dict[str, Any]) -> int:
+    """Distinct files the findings in review_data point at."""
+    return len({path for path in map(_finding_path, review_data.get('reviews') or []) if path})
+
+def prepare_incremental_review(repo: Repository, pr: PullRequest, review: Review, head_sha: str, timeout: Optional[float] = None):
+    """
+    Find the last completed review of an earlier head of this PR and the files changed since it.
+
+    Returns (parent_review, incremental_input) or (None, None) when a full review is needed:
+    no earlier review, history rewritten by a force-push, or too many files changed.
+    """
+    parent = Review.objects.filter(
+        pull_request=pr, status='completed', head_sha__isnull=False
+    ).exclude(id=review.id).exclude(head_sha=head_sha).order_by('-updated_at').first()
+    if not parent or not parent.review_data:
+        return None, None
+
+    owner_login, repo_name = repo.repo_name.split('/')
+    try:
+        comparison = run_async(GitHubService(repo.owner.github_access_token, timeout=timeout).compare_commits(
+            owner_login, repo_name, parent.head_sha, head_sha
+        ))
+    except Exception as e:
+        logger.warning(f"PROCESS_PR_REVIEW_TASK: Could not compare {parent.head_sha}...{head_sha} for PR {pr.id}, running a full review: {str(e)}")
+        return None, None
+    if comparison.get('status') != 'ahead':
+        logger.info(f"PROCESS_PR_REVIEW_TASK: Head {head_sha} is {comparison.get('status')} of reviewed head {parent.head_sha}. Running a full review.")
+        return None, None
+    changed_files = [changed['filename'] for changed in comparison.get('files') or []]
+    if not changed_files or len(changed_files) > settings.REVIEW_INCREMENTAL_MAX_CHANGED_FILES:
+        return None, None
+
+    return parent, {
+        'since_sha': parent.head_sha,
+        'changed_files': changed_files,
+        'previous_review': parent.review_data,
+    }
+
+def _carry_over_findings(previous_findings: Any, current_findings: Any, changed: set) -> Any:
+    # Per-file findings of the parent stay for files the new run did not look at
+    if not isinstance(previous_findings, list):
+        return current_findings
+    carried_over = [finding for finding in previous_findings if _finding_path(finding) and _finding_path(finding) not in changed]
+    return carried_over + (current_findings if isinstance(current_findings, list) else [])
+
+def _merge_incremental_final_result(previous: Any, current: Any, changed: set) -> Any:
+    # The report the UI renders: per-file lists under 'review' and fixes keyed by file under 'artifacts'
+    if not isinstance(previous, dict) or not isinstance(current, dict):
+        return current if current is not None else previous
+    merged = {**previous, **current}
+    previous_sections, current_sections = previous.get('review'), current.get('review') or {}
+    if isinstance(previous_sections, dict) and isinstance(current_sections, dict):
+        merged['review'] = {**previous_sections, **current_sections}
+        for name, findings in previous_sections.items():
+            merged['review'][name] = _carry_over_findings(findings, current_sections.get(name), changed)
+    previous_fixes = (previous.get('artifacts') or {}).get('fixes')
+    current_artifacts = current.get('artifacts') or {}
+    if isinstance(previous_fixes, dict) and isinstance(current_artifacts, dict):
+        merged['artifacts'] = {
+            **(previous.get('artifacts') or {}),
+            **current_artifacts,
+            'fixes': {
+                **{path: fix for path, fix in previous_fixes.items() if path not in changed},
+                **(current_artifacts.get('fixes') or {}),
+            },
+        }
+    return merged
+
+def merge_incremental_review_data(previous: Dict[str, Any], current: Dict[str, Any], changed_files: List[str]) -> Dict[str, Any]:
+    """
+    Keep the parent review's findings for untouched files and take the new ones for changed files,
+    in the state's findings lists and in the final_result report alike.
+    """
+    changed = set(changed_files)
+    merged = {**previous, **current}
+    for key in ('reviews', 'fixes'):
+        if isinstance(previous.get(key), list):
+            merged[key] = _carry_over_findings(previous[key], current.get(key), changed)
+    if 'final_result' in previous:
+        merged['final_result'] = _merge_incremental_final_result(previous['final_result'], current.get('final_result'), changed)
+    return merged
+
+def plan_pr_review_shards(
+    repo: Repository,
+    pr_data: Dict[str, Any],
+    file_policy: Dict[str, Any],
+    timeout: Optional[float] = None,
+    diff_files: Optional[List[Dict[str, Any]]] = None
+) -> Optional[List[List[str]]]:
+    """
+    Split a large PR into file groups to be reviewed by parallel runs.
+
+    With diff_files, the prefetched files left to review after filtering, each group stays
+    within the policy's token budget per run. Otherwise the PR's files are listed on GitHub,
+    files the policy omits are left out, and groups follow REVIEW_SHARD_TARGET_CHANGES.
+    Returns None when one run is enough, or when the PR's files cannot be listed.
+    """
+    if diff_files is not None:
+        return plan_diff_file_shards(diff_files, file_policy)
+
+    changed_file_count = pr_data.get('changed_files')
+    changed_lines = (pr_data.get('additions') or 0) + (pr_data.get('deletions') or 0)
+    if changed_file_count is not None and changed_file_count <= settings.REVIEW_SHARD_MAX_FILES and changed_lines <= settings.REVIEW_SHARD_TARGET_CHANGES:
+        return None
+
+    owner_login, repo_name = repo.repo_name.split('/')
+    try:
+        changed_files = run_async(GitHubService(repo.owner.github_access_token, timeout=timeout).list_pull_request_files(
+            owner_login, repo_name, pr_data['number']
+        ))
+    except Exception as e:
+        logger.warning(f"PROCESS_PR_REVIEW_TASK: Could not list files of PR #{pr_data['number']} in {repo.repo_name}, reviewing it in one run: {str(e)}")
+        return None
+    reviewed_files, _ = filter_diff_files(changed_files, file_policy)
+    shards = plan_review_shards(
+        reviewed_files, settings.REVIEW_SHARD_TARGET_CHANGES, settings.REVIEW_SHARD_MAX_FILES, settings.REVIEW_SHARD_MAX_SHARDS
+    )
+    return shards if len(shards) > 1 else None
+
+def plan_diff_file_shards(diff_files: List[Dict[str, Any]], file_policy: Dict[str, Any]) -> Optional[List[List[str]]]:
+    """Split prefetched files left to review into groups within the policy's token budget per run; None if one run is enough."""
+    shards = plan_review_shards(
+        diff_files, file_policy['chunk_token_budget'], settings.REVIEW_SHARD_MAX_FILES, settings.REVIEW_SHARD_MAX_SHARDS,
+        weight=diff_file_tokens
+    )
+    return shards if len(shards) > 1 else None
+
+def slot_retry_countdown() -> int:
+    # Jitter spreads out tasks that were throttled together
+    return settings.REVIEW_SLOT_RETRY_DELAY + random.randint(0, settings.REVIEW_SLOT_RETRY_DELAY)
+
+def acquire_shard_slots(llm_model: str, repository_id: int, slot_holder: str, shards: List[List[str]]) -> Optional[tuple]:
+    """
+    Take a concurrency slot for each shard past the first, which runs under the review's own slot.
+
+    Returns the slot to release, or None if the limits have no room for the extra runs; the
+    review then runs unsharded instead of exceeding the provider's concurrency limit.
+    """
+    shard_slot = (llm_model, repository_id, f"{slot_holder}:shards", len(shards) - 1)
+    return shard_slot if acquire_review_slot(*shard_slot) else None
+
+def make_progress_recorder(review_id: int):
+    """
+    Build the on_progress callback for generate_review.
+
+    Streamed states are saved to the review as partial review_data at most once every
+    REVIEW_PROGRESS_MIN_INTERVAL seconds, and each saved checkpoint is published for the UI.
+    """
+    state = {'checkpoint': 0, 'saved_at': 0.0}
+
+    async def record_progress(values: Dict[str, Any]) -> None:
+        if time.monotonic() - state['saved_at'] < settings.REVIEW_PROGRESS_MIN_INTERVAL:
+            return
+        state['saved_at'] = time.monotonic()
+        partial_review_data = filter_review_data(values)
+        saved = await Review.objects.filter(id=review_id, status='in_progress').aupdate(
+            review_data=partial_review_data, updated_at=timezone.now()
+        )
+        if saved:
+            state['checkpoint'] += 1
+            await apublish_review_progress(
+                review_id, 'in_progress', state['checkpoint'], count_files_with_findings(partial_review_data)
+            )
+
+    return record_progress
+
 @shared_task(bind=True)
-def process_webhook_event(self, event_type: str, event_data: Dict[str, Any]) -> None:
-    """Process webhook events asynchronously by dispatching to specific task handlers."""
-    logger.info(f"Received webhook event: {event_type} with action {event_data.get('action')}")
+def process_webhook_event(self, event_log_id: int) -> None:
+    """
+    Process a stored webhook delivery asynchronously by dispatching to specific task handlers.
+
+    Only the WebhookEventLog id travels through the broker; the payload is read back from the DB.
+    """
+    try:
+        event_log = WebhookEventLog.objects.select_related('payload_blob').only('event_type', 'payload_blob__body').get(id=event_log_id)
+    except WebhookEventLog.DoesNotExist:
+        logger.error(f"WebhookEventLog {event_log_id} not found. Cannot process webhook event.")
+        return
+    event_type, event_data = event_log.event_type, event_log.payload
+    logger.info(f"Received webhook event {event_log_id}: {event_type} with action {event_data.get('action')}")
     try:
         if event_type == 'pull_request':
             repo_data = event_data.get('repository', {})
@@ -56,23 +300,38 @@ def process_webhook_event(self, event_type: str, event_data: Dict[str, Any]) ->
                     logger.info(f"PR #{pr_number} for repo {repo_full_name} UPDATED in DB via webhook task.")
 
                 if action in ['opened', 'reopened', 'synchronize']:
-                    review, review_created = Review.objects.get_or_create(
-                        repository=repo,
-                        pull_request=pr,
-                        status__in=['pending', 'in_progress'],
-                        defaults={
-                            'status': 'pending',
-                            'review_data': {'message': f'Review initiated by webhook action: {action}.'}
-                        }
+                    head_sha = pr.head_sha
+                    # Coalesce bursts of pushes: only the latest head keeps a pending or running review
+                    stale_reviews = Review.objects.filter(
+                        pull_request=pr, status__in=['pending', 'in_progress']
+                    ).exclude(head_sha=head_sha)
+                    running_review_ids = list(stale_reviews.filter(status='in_progress').values_list('id', flat=True))
+                    superseded_count = stale_reviews.update(
+                        status='superseded', error_message=f"Superseded by newer head {head_sha}."
                     )
-                    if review_created:
-                        logger.info(f"PENDING review record CREATED for PR {pr.id}. Enqueuing process_pr_review.")
-                        process_pr_review.delay(event_data, repo.id, pr.id, triggering_user_id=repo.owner.id)
-                    elif review.status == 'pending':
-                        logger.info(f"PENDING review record already exists for PR {pr.id}. Enqueuing process_pr_review.")
-                        process_pr_review.delay(event_data, repo.id, pr.id, triggering_user_id=repo.owner.id)
+                    if superseded_count:
+                        logger.info(f"Marked {superseded_count} review(s) for PR {pr.id} as superseded by head {head_sha}.")
+                    for running_review_id in running_review_ids:
+                        cancel_review_run.delay(running_review_id)
+
+                    if Review.objects.filter(pull_request=pr, head_sha=head_sha, status='in_progress').exists():
+                        logger.info(f"Review for PR {pr.id} at head {head_sha} already in progress. Skipping.")
                     else:
-                        logger.info(f"Review for PR {pr.id} already in progress or completed. Status: {review.status}")
+                        review, review_created = Review.objects.get_or_create(
+                            repository=repo,
+                            pull_request=pr,
+                            head_sha=head_sha,
+                            status='pending',
+                            defaults={'review_data': {'message': f'Review initiated by webhook action: {action}.'}}
+                        )
+                        # Every push re-arms the window; earlier tasks see a newer head and drop out
+                        logger.info(f"PENDING review {review.id} for PR {pr.id} at head {head_sha} (created: {review_created}). Enqueuing process_pr_review in {settings.REVIEW_DEBOUNCE_SECONDS}s.")
+                        schedule_review_task(
+                            process_pr_review, repo.id,
+                            args=(project_pr_payload(pr_data), repo.id, pr.id),
+                            kwargs={'triggering_user_id': repo.owner.id, 'head_sha': head_sha},
+                            countdown=settings.REVIEW_DEBOUNCE_SECONDS,
+                        )
                 else:
                     logger.info(f"Skipping AI review for PR action '{action}' on PR {pr.id}")
             except Repository.DoesNotExist:
@@ -90,33 +349,19 @@ def process_webhook_event(self, event_type: str, event_data: Dict[str, Any]) ->
             
             try:
                 repo = Repository.objects.get(repo_name=repo_full_name)
-                for commit_payload in commits_data:
-                    commit_sha = commit_payload.get('id')
-                    if not commit_sha:
-                        logger.warning(f"Skipping commit with no SHA in push event: {commit_payload}")
-                        continue
-                    
-                    commit_author_github_id = str(commit_payload.get('author', {}).get('id') or commit_payload.get('author', {}).get('name'))
-                    commit_author_login = commit_payload.get('author', {}).get('username') or commit_payload.get('author', {}).get('name')
-
-                    db_commit, commit_created = Commit.objects.update_or_create(
-                        repository=repo,
-                        commit_hash=commit_sha,
-                        defaults={
-                            'author_github_id': commit_author_github_id,
-                            'message': commit_payload.get('message'),
-                            'author_name': commit_payload.get('author', {}).get('name'),
-                            'author_email': commit_payload.get('author', {}).get('email'),
-                            'timestamp': commit_payload.get('timestamp'),
-                            'url': commit_payload.get('url')
-                        }
-                    )
-                    if commit_created:
-                        logger.info(f"Commit {commit_sha:.7} for repo {repo_full_name} CREATED in DB.")
-                    else:
-                        logger.info(f"Commit {commit_sha:.7} for repo {repo_full_name} UPDATED in DB.")
-
-                    logger.info(f"Commit {db_commit.commit_sha[:7]} processed. AI review for standalone commits via push not auto-triggered by default.")
+                commits = build_commit_rows(repo, commits_data)
+                # One INSERT ... ON CONFLICT per push, however many commits it carries
+                Commit.objects.bulk_create(
+                    commits,
+                    update_conflicts=True,
+                    unique_fields=['repository', 'commit_hash'],
+                    update_fields=[*COMMIT_PUSH_FIELDS, 'updated_at'],
+                )
+                logger.info(f"Upserted {len(commits)} commit(s) for repo {repo_full_name} from push event. AI review for standalone commits via push not auto-triggered by default.")
+                if settings.REVIEW_PUSH_MODE in ('range', 'fan_out'):
+                    push_review = start_push_review(repo, event_data)
+                    if push_review:
+                        logger.info(f"PENDING push review {push_review.id} of {push_review.base_sha}..{push_review.head_sha} for repo {repo_full_name} ({settings.REVIEW_PUSH_MODE}).")
 
             except Repository.DoesNotExist:
                 logger.warning(f"Repository {repo_full_name} not found in DB. Cannot process push event.")
@@ -126,69 +371,409 @@ def process_webhook_event(self, event_type: str, event_data: Dict[str, Any]) ->
     except Exception as e:
         logger.error(f"Error in top-level process_webhook_event task: {str(e)}", exc_info=True)
 
+def schedule_review_task(task, repository_id: int, args: tuple, kwargs: Dict[str, Any], countdown: int = 0) -> None:
+    """
+    Queue a webhook-driven review behind its repository's other reviews, so one busy
+    repository cannot starve the rest. Goes straight to Celery if fair scheduling is off
+    or its Redis store is unavailable.
+    """
+    if settings.REVIEW_FAIR_SCHEDULING_ENABLED:
+        try:
+            depth = enqueue_review_job(repository_id, task.name, list(args), kwargs, countdown)
+            logger.info(f"Queued {task.name} for repo {repository_id} behind {depth - 1} other review job(s).")
+            return
+        except Exception as e:
+            logger.warning(f"Fair review queue unavailable, enqueuing {task.name} for repo {repository_id} directly: {str(e)}")
+    task.apply_async(args=args, kwargs=kwargs, countdown=countdown)
+
 @shared_task(bind=True)
-def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_model_id: int,triggering_user_id: int = None) -> None:
-    logger.info(f"PROCESS_PR_REVIEW_TASK: Starting for PR ID {pr_model_id}, Repo ID {repository_id}")
+def dispatch_fair_reviews(self) -> int:
+    """
+    Release queued review jobs to the webhook queue, round-robin across repositories.
+
+    Only enough jobs are released to keep REVIEW_FAIR_QUEUE_TARGET_DEPTH tasks waiting in the
+    broker; the rest stay in their repository's queue, where the next round can interleave
+    them with other repositories' jobs. Returns the number of jobs released.
+    """
+    # One dispatcher at a time; the lock outlives a stuck run only briefly
+    lock_key = 'review-dispatch-lock'
+    if not cache.add(lock_key, self.request.id or 1, settings.REVIEW_FAIR_DISPATCH_INTERVAL * 4):
+        return 0
+    try:
+        with self.app.connection_for_read() as connection:
+            try:
+                backlog = connection.default_channel.queue_declare(queue='webhook', passive=True).message_count
+            except ChannelError:
+                # Redis deletes a drained list, so an idle queue does not exist
+                backlog = 0
+        capacity = settings.REVIEW_FAIR_QUEUE_TARGET_DEPTH - backlog
+        if capacity <= 0:
+            return 0
+        review_tasks = {task.name: task for task in (process_pr_review, process_commit_review, process_push_review)}
+        jobs = pop_due_review_jobs(capacity)
+        for job in jobs:
+            review_tasks[job['task']].apply_async(args=job['args'], kwargs=job['kwargs'], queue='webhook')
+        if jobs:
+            logger.info(f"DISPATCH_FAIR_REVIEWS_TASK: Released {len(jobs)} review job(s) with {backlog} already waiting.")
+        return len(jobs)
+    finally:
+        cache.delete(lock_key)
+
+# before SHA of a push that created its branch
+NULL_SHA = '0' * 40
+
+def project_push_payload(push_event: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a GitHub push event to the fields process_push_review reads."""
+    repository = push_event.get('repository') or {}
+    sender = push_event.get('sender') or {}
+    commits = push_event.get('commits') or []
+    changed_files = set()
+    for commit_payload in commits:
+        for key in ('added', 'modified', 'removed'):
+            changed_files.update(commit_payload.get(key) or [])
+    return {
+        'before': push_event.get('before'),
+        'after': push_event.get('after'),
+        'user': {'id': sender.get('id'), 'login': sender.get('login')},
+        'repo': {'name': repository.get('name'), 'owner': {'login': (repository.get('owner') or {}).get('login')}},
+        'commits': [{'sha': commit_payload.get('id'), 'message': commit_payload.get('message')} for commit_payload in commits],
+        'changed_files': sorted(changed_files),
+    }
+
+def start_push_review(repo: Repository, push_event: Dict[str, Any]) -> Optional[Review]:
+    """
+    Create the review of a push and queue its work according to REVIEW_PUSH_MODE.
+
+    In range mode process_push_review reviews before..after in one run. In fan_out mode each
+    commit gets its own commit review, and the push review is filled with their summary once
+    the last one ends. Pushes that create or delete a branch are not reviewed, nor are pushes
+    to other branches than the default one if REVIEW_PUSH_DEFAULT_BRANCH_ONLY is set.
+    """
+    before, after = push_event.get('before'), push_event.get('after')
+    if push_event.get('deleted') or not before or not after or before == NULL_SHA:
+        return None
+    default_branch = (push_event.get('repository') or {}).get('default_branch')
+    if settings.REVIEW_PUSH_DEFAULT_BRANCH_ONLY and push_event.get('ref') != f"refs/heads/{default_branch}":
+        return None
+
+    commit_payloads = {commit_payload['id']: commit_payload for commit_payload in push_event.get('commits') or [] if commit_payload.get('id')}
+    commit_hashes = list(commit_payloads)
+    commits_by_hash = {commit.commit_hash: commit for commit in Commit.objects.filter(repository=repo, commit_hash__in=commit_hashes)}
+    head_commit = commits_by_hash.get(after)
+    if head_commit is None:
+        logger.warning(f"Head commit {after} of push to {repo.repo_name} is not among its commits. Not reviewing the push.")
+        return None
+    if Review.objects.filter(commit=head_commit, base_sha=before).exists():
+        # Redelivered push
+        return None
+
+    push_review = Review.objects.create(
+        repository=repo, commit=head_commit, head_sha=after, base_sha=before, status='pending',
+        review_data={'message': f'Review of push {before[:7]}..{after[:7]} ({len(commit_hashes)} commit(s)).'}
+    )
+    if settings.REVIEW_PUSH_MODE != 'fan_out' or len(commits_by_hash) > settings.REVIEW_PUSH_MAX_FAN_OUT:
+        schedule_review_task(process_push_review, repo.id, args=(project_push_payload(push_event), repo.id, push_review.id), kwargs={})
+        return push_review
+
+    commit_reviews = Review.objects.bulk_create([
+        Review(
+            repository=repo, commit=commits_by_hash[commit_hash], parent_review=push_review, status='pending',
+            review_data={'message': f'Commit review for push review {push_review.id}.'}
+        )
+        for commit_hash in commit_hashes if commit_hash in commits_by_hash
+    ])
+    for commit_review in commit_reviews:
+        # Each commit's changed-file lists let process_commit_review route it to a model tier
+        commit_payload = commit_payloads[commit_review.commit.commit_hash]
+        event_data = {'commit': {key: commit_payload.get(key) or [] for key in ('added', 'modified', 'removed')}}
+        schedule_review_task(
+            process_commit_review, repo.id,
+            args=(event_data, repo.id, commit_review.commit_id), kwargs={'push_review_id': push_review.id}
+        )
+    return push_review
+
+def post_push_review_comment(review: Review) -> None:
+    """Post the single GitHub comment for a push review, on the pushed head commit."""
+    repo = review.repository
+    owner_login, repo_name = repo.repo_name.split('/')
+    comment_body = (
+        f"🤖 AI Code Review Complete for push {review.base_sha[:7]}..{review.head_sha[:7]}!\n\n"
+        f"Status: {review.status}\n"
+        f"View the full report: {settings.FRONTEND_URL}/reviews/{review.id}\n"
+        f"(Review ID: {review.id})"
+    )
+    try:
+        run_async(GitHubService(repo.owner.github_access_token).post_commit_comment(
+            owner_login=owner_login, repo_name=repo_name, commit_sha=review.head_sha, body=comment_body
+        ))
+    except Exception as e:
+        logger.error(f"Failed to post GitHub comment for push review {review.id}: {str(e)}", exc_info=True)
+
+def finish_push_review(push_review_id: int) -> None:
+    """
+    Fill a fanned-out push review from its commit reviews once none of them is left to run,
+    then post the push's one GitHub comment.
+
+    Each commit review calls this as it ends; only the call that completes the push review posts.
+    """
+    commit_reviews = list(Review.objects.filter(parent_review_id=push_review_id).select_related('commit').order_by('id'))
+    if any(commit_review.status in ('pending', 'in_progress') for commit_review in commit_reviews):
+        return
+    completed_reviews = [commit_review for commit_review in commit_reviews if commit_review.status == 'completed']
+    review_data = merge_shard_review_data([filter_review_data(commit_review.review_data or {}) for commit_review in completed_reviews])
+    review_data['commits'] = [
+        {'sha': commit_review.commit.commit_hash, 'review_id': commit_review.id, 'status': commit_review.status}
+        for commit_review in commit_reviews
+    ]
+    push_status = 'completed' if completed_reviews else 'failed'
+    if not Review.objects.filter(id=push_review_id, status='pending').update(
+        status=push_status,
+        review_data=review_data,
+        error_message=None if completed_reviews else f"All {len(commit_reviews)} commit review(s) failed.",
+        updated_at=timezone.now(),
+    ):
+        return
+    publish_review_progress(push_review_id, push_status, files_with_findings=count_files_with_findings(review_data))
+    logger.info(f"Push review {push_review_id} {push_status} from {len(completed_reviews)}/{len(commit_reviews)} commit review(s).")
+    post_push_review_comment(Review.objects.select_related('repository__owner').get(id=push_review_id))
+
+# Commit model fields filled from push payloads (everything else is left to the DB defaults)
+COMMIT_PUSH_FIELDS = ['author_github_id', 'committer_github_id', 'message', 'url', 'timestamp', 'changed_file_count']
+
+def commit_changed_file_count(commit_payload: Dict[str, Any]) -> Optional[int]:
+    """Files a push payload's commit added, modified or removed, or None if it lists none of them."""
+    file_lists = [commit_payload[key] for key in ('added', 'modified', 'removed') if isinstance(commit_payload.get(key), list)]
+    return sum(len(files) for files in file_lists) if file_lists else None
+
+def build_commit_rows(repo: Repository, commits_data: List[Dict[str, Any]]) -> List[Commit]:
+    """Project push-event commit payloads onto unsaved Commit instances, one per SHA."""
+    rows = {}
+    for commit_payload in commits_data:
+        commit_sha = commit_payload.get('id')
+        if not commit_sha:
+            logger.warning(f"Skipping commit with no SHA in push event: {commit_payload}")
+            continue
+        author = commit_payload.get('author') or {}
+        committer = commit_payload.get('committer') or {}
+        rows[commit_sha] = Commit(
+            repository=repo,
+            commit_hash=commit_sha,
+            author_github_id=str(author.get('id') or author.get('name') or '') or None,
+            committer_github_id=str(committer.get('id') or committer.get('name') or '') or None,
+            message=commit_payload.get('message') or '',
+            url=commit_payload.get('url'),
+            timestamp=parse_datetime(commit_payload['timestamp']) if commit_payload.get('timestamp') else None,
+            changed_file_count=commit_changed_file_count(commit_payload),
+        )
+    # Deduplicated by SHA so a single upsert never touches the same row twice
+    return list(rows.values())
+
+@shared_task(bind=True, time_limit=settings.REVIEW_TASK_TIME_LIMIT)
+def process_pr_review(self, pr_data: Dict[str, Any], repository_id: int, pr_model_id: int,triggering_user_id: int = None, head_sha: str = None) -> None:
+    """
+    Run the AI review for a pull request.
+
+    pr_data is the compact pull request dict built by project_pr_payload.
+
+    When head_sha is given (webhook-driven reviews), the task only proceeds if that SHA is
+    still the PR head, which debounces bursts of pushes down to one review of the latest head.
+    """
+    logger.info(f"PROCESS_PR_REVIEW_TASK: Starting for PR ID {pr_model_id}, Repo ID {repository_id}, head {head_sha or 'N/A'}")
     review = None
-    
-    # Create a new event loop for this task execution
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    slot = None
+    shard_slot = None
     
     try:
         repo = Repository.objects.get(id=repository_id)
         pr = PullRequest.objects.get(id=pr_model_id, repository=repo)
 
-        review, created = Review.objects.get_or_create(
-            repository=repo, pull_request=pr, status='pending',
-            defaults={'status': 'in_progress', 'review_data': {'message': 'Review picked up by Celery task.'}}
-        )
-        if not created and review.status == 'pending':
+        if head_sha and pr.head_sha != head_sha:
+            logger.info(f"PROCESS_PR_REVIEW_TASK: Head {head_sha} of PR {pr.id} was superseded by {pr.head_sha}. Skipping.")
+            return
+
+        pending_reviews = Review.objects.filter(pull_request=pr, status='pending')
+        if head_sha:
+            pending_reviews = pending_reviews.filter(head_sha=head_sha)
+        review = pending_reviews.order_by('-created_at').first()
+        if review is None:
+            if head_sha:
+                logger.info(f"PROCESS_PR_REVIEW_TASK: No pending review left for PR {pr.id} at head {head_sha}. Skipping.")
+                return
+            review = Review.objects.create(
+                repository=repo, pull_request=pr, head_sha=pr.head_sha, status='in_progress',
+                review_data={'message': 'Review picked up by Celery task.'}
+            )
+        elif Review.objects.filter(id=review.id, status='pending').update(status='in_progress', updated_at=timezone.now()):
             review.status = 'in_progress'
-            review.save(update_fields=['status'])
-        elif review.status != 'in_progress':
-            logger.warning(f"PROCESS_PR_REVIEW_TASK: Review {review.id} for PR {pr.id} is not 'pending' or 'in_progress' (current: {review.status}). Skipping.")
+        else:
+            logger.warning(f"PROCESS_PR_REVIEW_TASK: Review {review.id} for PR {pr.id} was picked up by another task. Skipping.")
             return
 
         logger.info(f"PROCESS_PR_REVIEW_TASK: Processing review {review.id} for PR {pr.id}")
+        publish_review_progress(review.id, 'in_progress')
+
+        if 'pull_request' in pr_data:
+            # Messages enqueued before payloads were projected still carry the whole event
+            pr_data = project_pr_payload(pr_data['pull_request'])
+
+        # Small diffs go to a fast model and large ones to a long-context one, sized from the webhook's counts
+        llm_model = route_pr_review_model(repo, pr_data)
+
+        # A completed review of the same diff by the same model and settings is reused without calling the model
+        cache_key = compute_review_cache_key(repo, (pr_data.get('base') or {}).get('sha'), (pr_data.get('head') or {}).get('sha'), llm_model)
+        cached_review = find_cached_review(cache_key, exclude_review_id=review.id)
+        if cached_review:
+            if complete_from_cache(review, cached_review):
+                publish_review_progress(review.id, 'completed', files_with_findings=count_files_with_findings(review.review_data or {}))
+            return
 
-        client = LangGraphClient()
-        # Run the async initialize method
-        loop.run_until_complete(client.initialize())
+        # Respect the per-model and per-repository concurrency limits shared by all workers
+        slot_holder = self.request.id or f"review-{review.id}"
+        if not acquire_review_slot(llm_model, repo.id, slot_holder):
+            # Hand the review back and re-queue instead of failing against provider rate limits
+            Review.objects.filter(id=review.id, status='in_progress').update(status='pending')
+            publish_review_progress(review.id, 'pending')
+            logger.info(f"PROCESS_PR_REVIEW_TASK: Concurrency limit reached for {llm_model} or repo {repo.id}. Review {review.id} re-queued.")
+            raise self.retry(countdown=slot_retry_countdown(), max_retries=None)
+        slot = (llm_model, repo.id, slot_holder)
+        deadline = Deadline(settings.REVIEW_TASK_DEADLINE)
+
+        # Shared per-worker client; assistants are only looked up on the worker's first task
+        client = get_langgraph_client()
         
         if not client.review_agent:
             logger.error("PROCESS_PR_REVIEW_TASK: LangGraph review agent not available after initialization.")
             raise Exception("LangGraph review agent not available.")
 
-        pr_github_payload = event_data.get('pull_request', {})
-        if not pr_github_payload:
-            logger.error(f"PROCESS_PR_REVIEW_TASK: Missing 'pull_request' data in event_data for review {review.id}")
-            raise ValueError("Pull request data missing from webhook event for LangGraph")
+        pr_github_payload = pr_data
+        if not pr_github_payload.get('number'):
+            logger.error(f"PROCESS_PR_REVIEW_TASK: Missing pull request data for review {review.id}")
+            raise ValueError("Pull request data missing for LangGraph")
 
         repo_settings = {
             'coding_standards': repo.coding_standards or [],
             'code_metrics': repo.code_metrics or [],
-            'llm_preference': repo.llm_preference or settings.DEFAULT_LLM_MODEL,
+            'llm_preference': llm_model,
         }
         pr_author_github_id = str(pr_github_payload.get('user', {}).get('id'))
         pr_author_login = pr_github_payload.get('user', {}).get('login', 'unknown_user')
 
+        # Re-review only the commits pushed since the last completed review of this PR
+        parent_review, incremental_input = None, None
+        if settings.REVIEW_INCREMENTAL_ENABLED:
+            parent_review, incremental_input = prepare_incremental_review(
+                repo, pr, review, pr_github_payload['head'].get('sha'),
+                timeout=min(settings.GITHUB_API_TIMEOUT, deadline.remaining('comparing commits'))
+            )
+        if parent_review:
+            Review.objects.filter(id=review.id).update(parent_review=parent_review)
+            logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} is incremental since review {parent_review.id} ({len(incremental_input['changed_files'])} changed file(s)).")
+
+        # Changed files with patches and contents, fetched from GitHub once per base..head and reused by re-reviews
+        diff_files = None
+        if settings.DIFF_ARTIFACTS_ENABLED:
+            diff_artifact = get_diff_artifact(
+                repo, (pr_github_payload.get('base') or {}).get('sha'), pr_github_payload['head'].get('sha'),
+                pr_number=pr_github_payload['number'], time_budget=deadline.remaining('fetching the diff')
+            )
+            diff_files = diff_artifact.files if diff_artifact else None
+        if diff_files is not None and parent_review:
+            diff_files = select_diff_files(diff_files, incremental_input['changed_files'])
+        # Lockfiles, vendored and generated code, binaries and oversized files reach the agent as summaries only
+        file_policy = get_review_file_policy(repo)
+        reviewed_files = None
+        if diff_files is not None:
+            reviewed_files, omitted_files = filter_diff_files(diff_files, file_policy)
+            if omitted_files:
+                logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} summarizes {len(omitted_files)} of {len(diff_files)} changed file(s) instead of reviewing them.")
+            diff_files = reviewed_files + omitted_files
+
+        # Large PRs are split into file groups reviewed by parallel runs, so latency follows the largest group
+        # Incremental reviews are only split when their files are known, as the PR's listing covers all of it
+        shards = None
+        if settings.REVIEW_SHARDING_ENABLED and (not parent_review or reviewed_files is not None):
+            shards = plan_pr_review_shards(
+                repo, pr_github_payload, file_policy, timeout=min(settings.GITHUB_API_TIMEOUT, deadline.remaining('listing PR files')),
+                diff_files=reviewed_files
+            )
+        if shards:
+            shard_slot = acquire_shard_slots(llm_model, repo.id, slot_holder, shards)
+            if shard_slot is None:
+                logger.info(f"PROCESS_PR_REVIEW_TASK: No free slots for {len(shards)} parallel runs of {llm_model}. Review {review.id} runs unsharded.")
+                shards = None
+        if shards:
+            logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} is split into {len(shards)} parallel runs of {', '.join(str(len(shard)) for shard in shards)} file(s).")
+
+        async def record_run(thread_id: str, run_id: str) -> None:
+            # Store the run so a newer push can cancel it; if that already happened, cancel now
+            recorded = await Review.objects.filter(id=review.id, status='in_progress').aupdate(
+                langgraph_thread_id=thread_id, langgraph_run_id=run_id
+            )
+            if not recorded:
+                logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} was superseded before run {run_id} started. Cancelling it.")
+                await client.cancel_run(thread_id, run_id)
+
+        shard_runs = []
+
+        async def record_shard_run(thread_id: str, run_id: str) -> None:
+            # Every shard's run is stored, so cancelling the superseded review stops all of them
+            shard_runs.append([thread_id, run_id])
+            recorded = await Review.objects.filter(id=review.id, status='in_progress').aupdate(
+                langgraph_thread_id=shard_runs[0][0], langgraph_run_id=shard_runs[0][1], langgraph_shard_runs=list(shard_runs)
+            )
+            if not recorded:
+                # Failing this shard makes generate_sharded_review stop the others and cancel every started run
+                raise RuntimeError(f"Review {review.id} was superseded before shard run {run_id} started.")
+
         logger.info(f"PROCESS_PR_REVIEW_TASK: Calling LangGraph to generate review for review ID {review.id}")
-         # Run the async generate_review method
-        review_result = loop.run_until_complete(client.generate_review(
-            pr_data=pr_github_payload,
-            repo_settings=repo_settings,
-            user_id=pr_author_github_id 
-        ))
+        try:
+            if shards:
+                review_result = run_async(generate_sharded_review(
+                    client,
+                    shards,
+                    pr_data=pr_github_payload,
+                    repo_settings=repo_settings,
+                    user_id=pr_author_github_id,
+                    on_run_created=record_shard_run,
+                    on_progress=make_progress_recorder(review.id),
+                    diff_files=diff_files,
+                    incremental=incremental_input,
+                    timeout=deadline.remaining('starting the LangGraph runs')
+                ))
+            else:
+                # Run the async generate_review method
+                review_result = run_async(client.generate_review(
+                    pr_data=pr_github_payload,
+                    repo_settings=repo_settings,
+                    user_id=pr_author_github_id,
+                    on_run_created=record_run,
+                    on_progress=make_progress_recorder(review.id),
+                    incremental=incremental_input,
+                    diff_files=diff_files,
+                    timeout=deadline.remaining('starting the LangGraph run')
+                ))
+        except Exception:
+            if Review.objects.filter(id=review.id, status='superseded').exists():
+                logger.info(f"PROCESS_PR_REVIEW_TASK: Run for review {review.id} ended after it was superseded.")
+                return
+            raise
         logger.info(f"PROCESS_PR_REVIEW_TASK: LangGraph review generated for review ID {review.id}")
 
-        raw_review_data = review_result.get('review_data', {})
-        allowed_review_keys = ["repo", "user", "fixes", "metrics", "reviews", "llm_model", "standards",'final_result']
-        filtered_review_data = {key: raw_review_data[key] for key in allowed_review_keys if key in raw_review_data}
+        filtered_review_data = filter_review_data(review_result.get('review_data', {}))
+        if parent_review:
+            filtered_review_data = merge_incremental_review_data(
+                filter_review_data(parent_review.review_data), filtered_review_data, incremental_input['changed_files']
+            )
         
+        # Conditional update so a review superseded mid-run is not flipped back to completed
+        if not Review.objects.filter(id=review.id, status='in_progress').update(
+            review_data=filtered_review_data, status='completed', cache_key=cache_key, updated_at=timezone.now()
+        ):
+            logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} was superseded while running. Discarding its result.")
+            return
         review.review_data = filtered_review_data
         review.status = 'completed'
-        review.save()
+        publish_review_progress(review.id, 'completed', files_with_findings=count_files_with_findings(filtered_review_data))
         logger.info(f"PROCESS_PR_REVIEW_TASK: Review {review.id} updated and saved as completed.")
 
         # Create a main thread for this review
@@ -203,8 +788,9 @@ def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_m
             )
             logger.info(f"PROCESS_PR_REVIEW_TASK: Created main thread for review {review.id}")
 
-        token_usage_data = review_result.get('token_usage', {})
-        if token_usage_data:
+        # A sharded review has one run per shard
+        run_ids = review_result.get('run_ids') or [review_result.get('run_id')]
+        if any(run_ids):
             user_for_llm_usage = None
             if triggering_user_id:
                 try:
@@ -223,14 +809,10 @@ def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_m
                     }
                 )
             
-            LLMUsage.objects.create(
-                review=review, user=user_for_llm_usage,
-                llm_model=repo_settings['llm_preference'],
-                input_tokens=token_usage_data.get('prompt_tokens', 0),
-                output_tokens=token_usage_data.get('completion_tokens', 0),
-                cost=calculate_cost(token_usage_data, repo_settings['llm_preference'])
-            )
-            logger.info(f"PROCESS_PR_REVIEW_TASK: LLM usage recorded for review {review.id} by user {user_for_llm_usage.username}.")
+            # Tokens are filled in from LangSmith by collect_llm_usage once the run is ingested
+            for run_id in filter(None, run_ids):
+                record_pending_llm_usage(review, user_for_llm_usage, repo_settings['llm_preference'], run_id)
+            logger.info(f"PROCESS_PR_REVIEW_TASK: LLM usage collection scheduled for review {review.id} by user {user_for_llm_usage.username}.")
 
         github_service = GitHubService() 
         review_url = f"{settings.FRONTEND_URL}/reviews/{review.id}"
@@ -245,7 +827,7 @@ def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_m
         owner_login, repo_name = repo.repo_name.split('/')
         # Run async post_pr_comment
         # Only works if a reviewer requests a re-review
-        # loop.run_until_complete(github_service.post_pr_comment(
+        # run_async(github_service.post_pr_comment(
         #     owner_login=owner_login,
         #     repo_name=repo_name,
         #     pr_number=pr.pr_number,
@@ -253,6 +835,8 @@ def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_m
         # ))
         # logger.info(f"PROCESS_PR_REVIEW_TASK: Comment posted to GitHub for review {review.id}")
 
+    except Retry:
+        raise
     except PullRequest.DoesNotExist:
         logger.error(f"PROCESS_PR_REVIEW_TASK: PullRequest ID {pr_model_id} not found for repo {repository_id}.")
     except Repository.DoesNotExist:
@@ -261,73 +845,137 @@ def process_pr_review(self, event_data: Dict[str, Any], repository_id: int, pr_m
         task_id = self.request.id if self.request else "N/A"
         logger.error(f"PROCESS_PR_REVIEW_TASK: Unhandled error in task {task_id} for Review ID {review.id if review else 'N/A'}: {str(e)}", exc_info=True)
         if review and review.status != 'completed':
-            review.status = 'failed'
-            review.error_message = str(e)[:1023]
-            review.save(update_fields=['status', 'error_message'])
+            if Review.objects.filter(id=review.id).exclude(status__in=['completed', 'superseded']).update(
+                status='failed', error_message=str(e)[:1023], updated_at=timezone.now()
+            ):
+                publish_review_progress(review.id, 'failed')
         raise
     finally:
-        # Ensure the loop is closed
-        loop.close()
-        asyncio.set_event_loop(None) # Clear the event loop for the current thread
+        if slot:
+            release_review_slot(*slot)
+        if shard_slot:
+            release_review_slot(*shard_slot)
+
 @shared_task(bind=True)
-def process_commit_review(self, event_data: Dict[str, Any], repository_id: int, commit_model_id: int) -> None:
+def cancel_review_run(self, review_id: int) -> None:
+    """Cancel the LangGraph runs behind a review that was superseded by a newer push (one per shard if sharded)."""
+    try:
+        review = Review.objects.get(id=review_id)
+    except Review.DoesNotExist:
+        logger.warning(f"CANCEL_REVIEW_RUN_TASK: Review {review_id} not found.")
+        return
+    runs = review.langgraph_shard_runs or ([[review.langgraph_thread_id, review.langgraph_run_id]] if review.langgraph_run_id else [])
+    if not runs:
+        # The review task cancels its own run when it finds the review already superseded
+        logger.info(f"CANCEL_REVIEW_RUN_TASK: Review {review_id} has no recorded run yet. Nothing to cancel.")
+        return
+
+    client = get_langgraph_client()
+    for thread_id, run_id in runs:
+        try:
+            run_async(client.cancel_run(thread_id, run_id))
+            logger.info(f"CANCEL_REVIEW_RUN_TASK: Cancelled run {run_id} for superseded review {review_id}.")
+        except Exception as e:
+            logger.error(f"CANCEL_REVIEW_RUN_TASK: Failed to cancel run {run_id} for review {review_id}: {str(e)}", exc_info=True)
+
+@shared_task(bind=True, time_limit=settings.REVIEW_TASK_TIME_LIMIT)
+def process_commit_review(self, event_data: Dict[str, Any], repository_id: int, commit_model_id: int, push_review_id: int = None) -> None:
     """
     Process an AI review for a standalone commit.
     
     Args:
-        event_data: Dictionary of GitHub webhook data or manually prepared data
+        event_data: Optional GitHub commit data ({'commit': {...}}); when empty, it is built from the DB
         repository_id: ID of the Repository model instance
         commit_model_id: ID of the Commit model instance
+        push_review_id: Set for the commit reviews of a fanned-out push review. No comment is
+            posted for the commit; the push review gets one summary comment instead.
     """
     logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Starting for Commit ID {commit_model_id}, Repo ID {repository_id}")
     review = None
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    slot = None
     try:
         repo = Repository.objects.get(id=repository_id)
         commit = Commit.objects.get(id=commit_model_id, repository=repo)
         
-        # Get or create a pending review
-        review, created = Review.objects.get_or_create(
-            repository=repo,
-            commit=commit,
-            status='pending',
-            defaults={'status': 'in_progress', 'review_data': {'message': 'Commit review picked up by Celery task.'}}
-        )
-        if not created and review.status == 'pending':
+        if push_review_id:
+            # The commit's review was created along with the push review
+            review = Review.objects.filter(parent_review_id=push_review_id, commit=commit, status='pending').first()
+            if review is None or not Review.objects.filter(id=review.id, status='pending').update(status='in_progress', updated_at=timezone.now()):
+                logger.warning(f"PROCESS_COMMIT_REVIEW_TASK: No pending review of Commit {commit.id} left for push review {push_review_id}. Skipping.")
+                return
             review.status = 'in_progress'
-            review.save(update_fields=['status'])
-        elif review.status != 'in_progress':
+        else:
+            # Claim the commit's pending review, or create one; push reviews of the same head commit are not commit reviews
+            review = Review.objects.filter(
+                repository=repo, commit=commit, status='pending', base_sha__isnull=True
+            ).order_by('-created_at').first()
+            if review is None:
+                review = Review.objects.create(
+                    repository=repo, commit=commit, status='in_progress',
+                    review_data={'message': 'Commit review picked up by Celery task.'}
+                )
+            elif Review.objects.filter(id=review.id, status='pending').update(status='in_progress', updated_at=timezone.now()):
+                review.status = 'in_progress'
+        if review.status != 'in_progress':
             logger.warning(f"PROCESS_COMMIT_REVIEW_TASK: Review {review.id} for Commit {commit.id} is not 'pending' or 'in_progress' (current: {review.status}). Skipping.")
             return
         
         logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Processing review {review.id} for Commit {commit.id}")
+        publish_review_progress(review.id, 'in_progress')
+
+        # Sized by the files the commit's push payload listed, passed by fanned-out pushes and stored
+        # on the commit for manual triggers; commits never seen in a push fall back to llm_preference
+        changed_file_count = commit_changed_file_count((event_data or {}).get('commit') or {})
+        if changed_file_count is None:
+            changed_file_count = commit.changed_file_count
+        llm_model = route_review_model(repo, estimate_review_tokens(changed_files=changed_file_count))
+
+        # Respect the per-model and per-repository concurrency limits shared by all workers
+        slot_holder = self.request.id or f"review-{review.id}"
+        if not acquire_review_slot(llm_model, repo.id, slot_holder):
+            Review.objects.filter(id=review.id, status='in_progress').update(status='pending')
+            publish_review_progress(review.id, 'pending')
+            logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Concurrency limit reached for {llm_model} or repo {repo.id}. Review {review.id} re-queued.")
+            raise self.retry(countdown=slot_retry_countdown(), max_retries=None)
+        slot = (llm_model, repo.id, slot_holder)
+        deadline = Deadline(settings.REVIEW_TASK_DEADLINE)
         
         # Initialize LangGraph client
-        client = LangGraphClient()
-        loop.run_until_complete(client.initialize())
+        client = get_langgraph_client()
         
         if not client.review_agent:
             logger.error("PROCESS_COMMIT_REVIEW_TASK: LangGraph review agent not available after initialization.")
             raise Exception("LangGraph review agent not available.")
         
         # Prepare commit data for LangGraph
-        commit_github_data = event_data.get('commit', {})
-        if not commit_github_data:
-            # If not provided in event_data, construct from our DB model
+        commit_github_data = (event_data or {}).get('commit') or {}
+        if not commit_github_data.get('sha'):
+            # Manual triggers pass no commit data and fanned-out pushes only its changed-file lists;
+            # the rest comes from our DB model and registered users
+            known_users = {
+                user['github_id']: user
+                for user in User.objects.filter(
+                    github_id__in=[commit.author_github_id, commit.committer_github_id]
+                ).values('github_id', 'username', 'email')
+            }
+            author_user = known_users.get(commit.author_github_id, {})
+            committer_user = known_users.get(commit.committer_github_id, {})
             commit_github_data = {
                 'sha': commit.commit_hash,
                 'message': commit.message,
                 'url': commit.url,
                 'author': {
-                    'name': getattr(commit, 'author_name', None),
-                    'email': getattr(commit, 'author_email', None),
+                    'id': commit.author_github_id,
+                    'name': author_user.get('username'),
+                    'email': author_user.get('email'),
                     'date': commit.timestamp.isoformat() if commit.timestamp else None
                 },
                 'committer': {
-                    'name': getattr(commit, 'committer_name', None),
-                    'email': getattr(commit, 'committer_email', None)
-                }
+                    'id': commit.committer_github_id,
+                    'name': committer_user.get('username'),
+                    'email': committer_user.get('email')
+                },
+                **commit_github_data,
             }
         
         # If we need to fetch more detailed commit data from GitHub
@@ -337,7 +985,7 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
         repo_settings = {
             'coding_standards': repo.coding_standards or [],
             'code_metrics': repo.code_metrics or [],
-            'llm_preference': repo.llm_preference or settings.DEFAULT_LLM_MODEL,
+            'llm_preference': llm_model,
         }
         
         # Author identification for LLM usage tracking
@@ -352,23 +1000,50 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
         input_data = {
             'commit': commit_github_data,
             'repo': repo.repo_name,
-            'commit_sha': commit.commit_hash
+            'commit_sha': commit.commit_hash,
+            # The PR fields generate_review reads; the commit itself goes in as a one-commit range
+            'number': None,
+            'user': {'login': commit_author_name},
+            'base': {'repo': {'name': repo.repo_name.split('/')[-1]}},
         }
-        review_result = loop.run_until_complete(
-            client.generate_review(
-                pr_data=input_data,  # We reuse the PR review function but with commit data
-                repo_settings=repo_settings,
-                user_id=commit_author_github_id)
-        )
+        async def record_run(thread_id: str, run_id: str) -> None:
+            # Store the run so it can be cancelled (e.g. by fail_stale_reviews); if the review was already closed, cancel now
+            recorded = await Review.objects.filter(id=review.id, status='in_progress').aupdate(
+                langgraph_thread_id=thread_id, langgraph_run_id=run_id
+            )
+            if not recorded:
+                logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Review {review.id} was closed before run {run_id} started. Cancelling it.")
+                await client.cancel_run(thread_id, run_id)
+
+        try:
+            review_result = run_async(
+                client.generate_review(
+                    pr_data=input_data,  # We reuse the PR review function but with commit data
+                    repo_settings=repo_settings,
+                    user_id=commit_author_github_id,
+                    on_run_created=record_run,
+                    on_progress=make_progress_recorder(review.id),
+                    commit_range={'head_sha': commit.commit_hash, 'commits': [{'sha': commit.commit_hash, 'message': commit.message}]},
+                    timeout=deadline.remaining('starting the LangGraph run'))
+            )
+        except Exception:
+            if not Review.objects.filter(id=review.id, status='in_progress').exists():
+                logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Run for review {review.id} ended after the review was closed.")
+                return
+            raise
         logger.info(f"PROCESS_COMMIT_REVIEW_TASK: LangGraph review generated for review ID {review.id}")
         
-        raw_review_data = review_result.get('review_data', {})
-        allowed_review_keys = ["repo", "user", "fixes", "metrics", "reviews", "llm_model", "standards",'final_result']
-        filtered_review_data = {key: raw_review_data[key] for key in allowed_review_keys if key in raw_review_data}
+        filtered_review_data = filter_review_data(review_result.get('review_data', {}))
         
+        # Conditional update so a review closed mid-run (e.g. failed as stale) is not flipped back to completed
+        if not Review.objects.filter(id=review.id, status='in_progress').update(
+            review_data=filtered_review_data, status='completed', updated_at=timezone.now()
+        ):
+            logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Review {review.id} was closed while running. Discarding its result.")
+            return
         review.review_data = filtered_review_data
         review.status = 'completed'
-        review.save()
+        publish_review_progress(review.id, 'completed', files_with_findings=count_files_with_findings(filtered_review_data))
         logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Review {review.id} updated and saved as completed.")
         
         # Create a main thread for this review
@@ -383,9 +1058,9 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
             )
             logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Created main thread for review {review.id}")
         
-        # Record token usage
-        token_usage_data = review_result.get('token_usage', {})
-        if token_usage_data:
+        # Record token usage once LangSmith has ingested the run
+        run_id = review_result.get('run_id')
+        if run_id:
             author_user, _ = User.objects.get_or_create(
                 github_id=commit_author_github_id if commit_author_github_id else f"unknown_{commit_author_name}",
                 defaults={
@@ -393,16 +1068,12 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
                     'email': getattr(commit, 'author_email', None)
                 }
             )
-            LLMUsage.objects.create(
-                review=review,
-                user=author_user,
-                llm_model=repo_settings['llm_preference'],
-                input_tokens=token_usage_data.get('input_tokens', 0),
-                output_tokens=token_usage_data.get('output_tokens', 0),
-                cost=calculate_cost(token_usage_data, repo_settings['llm_preference'])
-            )
-            logger.info(f"PROCESS_COMMIT_REVIEW_TASK: LLM usage recorded for review {review.id}")
+            record_pending_llm_usage(review, author_user, repo_settings['llm_preference'], run_id)
+            logger.info(f"PROCESS_COMMIT_REVIEW_TASK: LLM usage collection scheduled for review {review.id}")
         
+        if push_review_id:
+            return
+
         # Post a comment to GitHub if possible
         github_service = GitHubService()
         review_url = f"{settings.FRONTEND_URL}/reviews/{review.id}"
@@ -416,7 +1087,7 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
         try:
             logger.info(f"PROCESS_COMMIT_REVIEW_TASK: Posting comment to GitHub commit {commit.commit_hash} in repo {repo.repo_name}")
             owner_login, repo_name = repo.repo_name.split('/')
-            loop.run_until_complete(
+            run_async(
                 github_service.post_commit_comment(
                     owner_login=owner_login,
                     repo_name=repo_name,
@@ -429,6 +1100,8 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
             logger.error(f"PROCESS_COMMIT_REVIEW_TASK: Failed to post GitHub comment: {str(e)}", exc_info=True)
             # We continue even if comment posting fails - the review is still available in our system
     
+    except Retry:
+        raise
     except Commit.DoesNotExist:
         logger.error(f"PROCESS_COMMIT_REVIEW_TASK: Commit ID {commit_model_id} not found for repo {repository_id}.")
     except Repository.DoesNotExist:
@@ -437,33 +1110,162 @@ def process_commit_review(self, event_data: Dict[str, Any], repository_id: int,
         task_id = self.request.id if self.request else "N/A"
         logger.error(f"PROCESS_COMMIT_REVIEW_TASK: Unhandled error in task {task_id} for Review ID {review.id if review else 'N/A'}: {str(e)}", exc_info=True)
         if review and review.status != 'completed':
-            review.status = 'failed'
-            review.error_message = str(e)[:1023]
-            review.save(update_fields=['status', 'error_message'])
+            if Review.objects.filter(id=review.id, status='in_progress').update(
+                status='failed', error_message=str(e)[:1023], updated_at=timezone.now()
+            ):
+                review.status = 'failed'
+                publish_review_progress(review.id, 'failed')
         raise
+    finally:
+        if slot:
+            release_review_slot(*slot)
+        if push_review_id and review and review.status in ('completed', 'failed'):
+            finish_push_review(push_review_id)
 
-def calculate_cost(token_usage: Dict[str, int], model: str) -> float:
-    """Calculate the cost of token usage based on the model."""
-    input_cost_per_token = 0.00001  # Default
-    output_cost_per_token = 0.00002 # Default
+@shared_task(bind=True, time_limit=settings.REVIEW_TASK_TIME_LIMIT)
+def process_push_review(self, push_data: Dict[str, Any], repository_id: int, review_id: int) -> None:
+    """
+    Review the combined changes of a push, before..after, in one LangGraph run.
 
-    model_key = model.lower()
-    PRICING = {
-        "gpt-4": {"input": 0.00003, "output": 0.00006},
-        "cerebras::llama-3.3-70b": {"input": 0.0000026, "output": 0.0000035}, # Made up, adjust
-        "default": {"input": 0.00001, "output": 0.00002}
-    }
+    push_data is the compact push dict built by project_push_payload. A single GitHub comment
+    is posted on the pushed head commit, however many commits the push carried.
+    """
+    logger.info(f"PROCESS_PUSH_REVIEW_TASK: Starting for review {review_id}, Repo ID {repository_id}")
+    review = None
+    slot = None
+    shard_slot = None
+    try:
+        repo = Repository.objects.select_related('owner').get(id=repository_id)
+        if not Review.objects.filter(id=review_id, status='pending').update(status='in_progress', updated_at=timezone.now()):
+            logger.warning(f"PROCESS_PUSH_REVIEW_TASK: Review {review_id} is no longer pending. Skipping.")
+            return
+        review = Review.objects.select_related('repository__owner').get(id=review_id)
+        publish_review_progress(review.id, 'in_progress')
 
-    for key_part in PRICING:
-        if key_part in model_key:
-            input_cost_per_token = PRICING[key_part]["input"]
-            output_cost_per_token = PRICING[key_part]["output"]
-            break
-    
-    input_tokens = token_usage.get('input_tokens', 0) or 0
-    output_tokens = token_usage.get('output_tokens', 0) or 0
-    
-    input_cost = input_tokens * input_cost_per_token
-    output_cost = output_tokens * output_cost_per_token
-    
-    return round(input_cost + output_cost, 6) 
\ No newline at end of file
+        before, after = push_data['before'], push_data['after']
+        llm_model = route_review_model(repo, estimate_review_tokens(changed_files=len(push_data['changed_files'])))
+        cache_key = compute_review_cache_key(repo, before, after, llm_model)
+        cached_review = find_cached_review(cache_key, exclude_review_id=review.id)
+        if cached_review:
+            if complete_from_cache(review, cached_review):
+                publish_review_progress(review.id, 'completed', files_with_findings=count_files_with_findings(review.review_data or {}))
+                post_push_review_comment(review)
+            return
+
+        # Respect the per-model and per-repository concurrency limits shared by all workers
+        slot_holder = self.request.id or f"review-{review.id}"
+        if not acquire_review_slot(llm_model, repo.id, slot_holder):
+            Review.objects.filter(id=review.id, status='in_progress').update(status='pending')
+            publish_review_progress(review.id, 'pending')
+            logger.info(f"PROCESS_PUSH_REVIEW_TASK: Concurrency limit reached for {llm_model} or repo {repo.id}. Review {review.id} re-queued.")
+            raise self.retry(countdown=slot_retry_countdown(), max_retries=None)
+        slot = (llm_model, repo.id, slot_holder)
+        deadline = Deadline(settings.REVIEW_TASK_DEADLINE)
+
+        client = get_langgraph_client()
+        if not client.review_agent:
+            logger.error("PROCESS_PUSH_REVIEW_TASK: LangGraph review agent not available after initialization.")
+            raise Exception("LangGraph review agent not available.")
+
+        repo_settings = {
+            'coding_standards': repo.coding_standards or [],
+            'code_metrics': repo.code_metrics or [],
+            'llm_preference': llm_model,
+        }
+
+        shard_runs = []
+
+        async def record_run(thread_id: str, run_id: str) -> None:
+            # Lets fail_stale_reviews cancel the runs if this worker dies
+            shard_runs.append([thread_id, run_id])
+            await Review.objects.filter(id=review.id, status='in_progress').aupdate(
+                langgraph_thread_id=shard_runs[0][0], langgraph_run_id=shard_runs[0][1],
+                langgraph_shard_runs=list(shard_runs) if len(shard_runs) > 1 else None
+            )
+
+        diff_files, shards = None, None
+        if settings.DIFF_ARTIFACTS_ENABLED:
+            diff_artifact = get_diff_artifact(repo, before, after, time_budget=deadline.remaining('fetching the diff'))
+            if diff_artifact:
+                file_policy = get_review_file_policy(repo)
+                reviewed_files, omitted_files = filter_diff_files(diff_artifact.files, file_policy)
+                if omitted_files:
+                    logger.info(f"PROCESS_PUSH_REVIEW_TASK: Review {review.id} summarizes {len(omitted_files)} of {diff_artifact.file_count} changed file(s) instead of reviewing them.")
+                diff_files = reviewed_files + omitted_files
+                if settings.REVIEW_SHARDING_ENABLED:
+                    shards = plan_diff_file_shards(reviewed_files, file_policy)
+        if shards:
+            shard_slot = acquire_shard_slots(llm_model, repo.id, slot_holder, shards)
+            if shard_slot is None:
+                logger.info(f"PROCESS_PUSH_REVIEW_TASK: No free slots for {len(shards)} parallel runs of {llm_model}. Review {review.id} runs unsharded.")
+                shards = None
+
+        logger.info(f"PROCESS_PUSH_REVIEW_TASK: Calling LangGraph to review {before}..{after} ({len(push_data['commits'])} commit(s)) for review {review.id}")
+        review_kwargs = dict(
+            # Shaped like a pull request, the form generate_review expects
+            pr_data={'number': None, 'user': push_data['user'], 'head': {'sha': after}, 'base': {'sha': before, 'repo': push_data['repo']}},
+            repo_settings=repo_settings,
+            user_id=str(push_data['user'].get('id')),
+            on_run_created=record_run,
+            on_progress=make_progress_recorder(review.id),
+            commit_range={
+                'base_sha': before,
+                'head_sha': after,
+                'commits': push_data['commits'],
+                'changed_files': push_data['changed_files'],
+            },
+            diff_files=diff_files,
+        )
+        if shards:
+            logger.info(f"PROCESS_PUSH_REVIEW_TASK: Review {review.id} is split into {len(shards)} parallel runs of {', '.join(str(len(shard)) for shard in shards)} file(s).")
+            review_result = run_async(generate_sharded_review(
+                client, shards, timeout=deadline.remaining('starting the LangGraph runs'), **review_kwargs
+            ))
+        else:
+            review_result = run_async(client.generate_review(timeout=deadline.remaining('starting the LangGraph run'), **review_kwargs))
+
+        filtered_review_data = filter_review_data(review_result.get('review_data', {}))
+        if not Review.objects.filter(id=review.id, status='in_progress').update(
+            review_data=filtered_review_data, status='completed', cache_key=cache_key, updated_at=timezone.now()
+        ):
+            logger.info(f"PROCESS_PUSH_REVIEW_TASK: Review {review.id} was closed while running. Discarding its result.")
+            return
+        review.review_data = filtered_review_data
+        review.status = 'completed'
+        publish_review_progress(review.id, 'completed', files_with_findings=count_files_with_findings(filtered_review_data))
+        logger.info(f"PROCESS_PUSH_REVIEW_TASK: Review {review.id} updated and saved as completed.")
+
+        thread_id = review_result.get('thread_id')
+        if thread_id:
+            Thread.objects.create(
+                review=review,
+                thread_id=thread_id,
+                thread_type='main',
+                title='Initial Push AI Review',
+                status='open'
+            )
+
+        # Push reviews are attributed to the repository owner, like other webhook-driven reviews
+        for run_id in filter(None, review_result.get('run_ids') or [review_result.get('run_id')]):
+            record_pending_llm_usage(review, repo.owner, repo_settings['llm_preference'], run_id)
+
+        post_push_review_comment(review)
+
+    except Retry:
+        raise
+    except Repository.DoesNotExist:
+        logger.error(f"PROCESS_PUSH_REVIEW_TASK: Repository ID {repository_id} not found.")
+    except Exception as e:
+        task_id = self.request.id if self.request else "N/A"
+        logger.error(f"PROCESS_PUSH_REVIEW_TASK: Unhandled error in task {task_id} for Review ID {review.id if review else 'N/A'}: {str(e)}", exc_info=True)
+        if review and review.status != 'completed':
+            if Review.objects.filter(id=review.id).exclude(status='completed').update(
+                status='failed', error_message=str(e)[:1023], updated_at=timezone.now()
+            ):
+                publish_review_progress(review.id, 'failed')
+        raise
+    finally:
+        if slot:
+            release_review_slot(*slot)
+        if shard_slot:
+            release_review_slot(*shard_slot)
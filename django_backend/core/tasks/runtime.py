@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import threading
+import time
+from celery.signals import worker_process_init
+from core.langgraph_client.client import LangGraphClient
+
+logger = logging.getLogger(__name__)
+
+# One event loop and one LangGraphClient per worker process (per thread, for thread pools).
+# The LangGraph SDK's HTTP connections are bound to the loop that opened them, so both live together.
+_state = threading.local()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return this worker's long-lived event loop, creating it on first use."""
+    loop = getattr(_state, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _state.loop = loop
+        _state.langgraph_client = None
+    return loop
+
+def run_async(coro):
+    """Run a coroutine to completion on this worker's event loop."""
+    loop = get_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+def get_langgraph_client() -> LangGraphClient:
+    """
+    Return this worker's shared LangGraphClient, initializing it on first use.
+
+    Assistant metadata is fetched once and the client is reused by every task.
+    A client whose initialization failed is not kept, so the next task retries it.
+    """
+    get_event_loop()
+    client = getattr(_state, 'langgraph_client', None)
+    if client is None:
+        client = LangGraphClient()
+        run_async(client.initialize())
+        if client.review_agent:
+            _state.langgraph_client = client
+            logger.info("Initialized shared LangGraph client for this worker.")
+    return client
+
+class Deadline:
+    """
+    Wall-clock budget of one task. Each stage (GitHub calls, the LangGraph run) gets what is
+    left of it, so a slow early stage shortens the later ones instead of extending the task.
+    """
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self, stage: str) -> float:
+        """Seconds left for the given stage; raises TimeoutError if the budget is already spent."""
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Review exceeded its {self.seconds:.0f}s deadline before {stage}.")
+        return remaining
+
+@worker_process_init.connect
+def reset_worker_runtime(**kwargs):
+    # Never reuse a loop or open connections inherited from the parent process across fork
+    _state.loop = None
+    _state.langgraph_client = None
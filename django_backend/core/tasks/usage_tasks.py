@@ -0,0 +1,204 @@
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from langsmith import Client
+from ..models import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+_langsmith_client = None
+
+def get_langsmith_client() -> Client:
+    """Return this process's LangSmith client, creating it on first use."""
+    global _langsmith_client
+    if _langsmith_client is None:
+        _langsmith_client = Client(api_key=settings.LANGSMITH_API_KEY)
+    return _langsmith_client
+
+# Run fields needed for usage, plus those langsmith.schemas.Run requires to parse a row; keeps list_runs responses small
+USAGE_RUN_FIELDS = [
+    'id', 'name', 'run_type', 'start_time', 'trace_id',
+    'end_time', 'prompt_tokens', 'completion_tokens', 'total_tokens',
+]
+
+def _run_token_usage(run) -> Optional[Dict[str, int]]:
+    # None while LangSmith has not finished ingesting the run
+    if run.end_time is None or run.total_tokens is None:
+        return None
+    return {
+        'input_tokens': run.prompt_tokens or 0,
+        'output_tokens': run.completion_tokens or 0,
+        'total_tokens': run.total_tokens or 0,
+    }
+
+def read_run_usage(run_id: str) -> Optional[Dict[str, int]]:
+    """
+    Read token usage for a run from LangSmith.
+
+    Returns None while LangSmith has not finished ingesting the run, so callers can try again later.
+    """
+    return _run_token_usage(get_langsmith_client().read_run(run_id=run_id))
+
+def read_runs_usage(run_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Read token usage for many runs with a single LangSmith list-runs call, keyed by run id.
+
+    If the call fails part-way, e.g. on a row that does not parse, the remaining runs are read
+    one by one and the ones that still fail are logged and left out. Raises if every one fails,
+    as LangSmith is then unreachable rather than missing some runs.
+    """
+    run_ids = list(run_ids)
+    usage_by_run = {}
+    try:
+        for run in get_langsmith_client().list_runs(run_ids=run_ids, select=USAGE_RUN_FIELDS):
+            token_usage = _run_token_usage(run)
+            if token_usage is not None:
+                usage_by_run[str(run.id)] = token_usage
+        return usage_by_run
+    except Exception as e:
+        logger.warning(f"LangSmith list-runs failed for {len(run_ids)} run(s), reading them one by one: {str(e)}")
+
+    remaining = [run_id for run_id in run_ids if run_id not in usage_by_run]
+    failures = 0
+    for run_id in remaining:
+        try:
+            token_usage = read_run_usage(run_id)
+        except Exception as e:
+            failures += 1
+            logger.warning(f"Could not read run {run_id} from LangSmith: {str(e)}")
+            if failures == len(remaining):
+                raise
+            continue
+        if token_usage is not None:
+            usage_by_run[run_id] = token_usage
+    return usage_by_run
+
+def record_pending_llm_usage(review, user, llm_model: str, run_id: str) -> LLMUsage:
+    """
+    Create a pending LLMUsage row for a finished run and schedule collect_llm_usage to fill in its tokens.
+
+    This keeps LangSmith's ingestion delay out of the review and chat request paths.
+    """
+    usage = LLMUsage.objects.create(
+        review=review, user=user, llm_model=llm_model, run_id=run_id,
+        input_tokens=0, output_tokens=0, cost=0.0, status='pending'
+    )
+    collect_llm_usage.apply_async(args=(usage.id,), countdown=settings.LLM_USAGE_COLLECT_DELAY)
+    return usage
+
+@shared_task(bind=True, max_retries=settings.LLM_USAGE_COLLECT_MAX_RETRIES)
+def collect_llm_usage(self, usage_id: int) -> None:
+    """
+    Fill in tokens and cost for a pending LLMUsage row from LangSmith.
+
+    Retries with exponential backoff until LangSmith reports the run; rows still pending
+    after the last retry are left for reconcile_llm_usage.
+    """
+    try:
+        usage = LLMUsage.objects.get(id=usage_id, status='pending')
+    except LLMUsage.DoesNotExist:
+        logger.info(f"COLLECT_LLM_USAGE_TASK: Usage {usage_id} is no longer pending. Nothing to do.")
+        return
+
+    try:
+        token_usage = read_run_usage(usage.run_id)
+    except Exception as e:
+        logger.warning(f"COLLECT_LLM_USAGE_TASK: Could not read run {usage.run_id} from LangSmith: {str(e)}")
+        token_usage = None
+
+    if token_usage is None:
+        if self.request.retries >= self.max_retries:
+            logger.warning(f"COLLECT_LLM_USAGE_TASK: No usage for run {usage.run_id} after {self.request.retries} retries. Leaving usage {usage_id} pending.")
+            return
+        countdown = min(settings.LLM_USAGE_COLLECT_DELAY * 2 ** self.request.retries, settings.LLM_USAGE_COLLECT_MAX_DELAY)
+        raise self.retry(countdown=countdown)
+
+    LLMUsage.objects.filter(id=usage_id, status='pending').update(
+        input_tokens=token_usage['input_tokens'],
+        output_tokens=token_usage['output_tokens'],
+        cost=calculate_cost(token_usage, usage.llm_model),
+        status='recorded',
+    )
+    logger.info(f"COLLECT_LLM_USAGE_TASK: Recorded {token_usage['total_tokens']} tokens for run {usage.run_id} (usage {usage_id}).")
+
+@shared_task(bind=True)
+def reconcile_llm_usage(self) -> int:
+    """
+    Fill in every LLMUsage row still pending, reading LangSmith in batches through list-runs.
+
+    Picks up runs whose collect_llm_usage retries ran out or never got scheduled. Rows that
+    LangSmith still has no usage for after LLM_USAGE_UNAVAILABLE_AFTER_HOURS, including runs it
+    fails to return, are marked unavailable so they stop being polled. A batch is only skipped
+    when LangSmith cannot be reached at all. Returns the number of rows recorded.
+    """
+    batch_size = settings.LLM_USAGE_RECONCILE_BATCH_SIZE
+    give_up_before = timezone.now() - timedelta(hours=settings.LLM_USAGE_UNAVAILABLE_AFTER_HOURS)
+    pending = LLMUsage.objects.filter(status='pending', run_id__isnull=False).order_by('id').only('id', 'run_id', 'llm_model', 'created_at')
+    total_recorded = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        try:
+            usage_by_run = read_runs_usage({usage.run_id for usage in batch})
+        except Exception as e:
+            logger.error(f"RECONCILE_LLM_USAGE_TASK: LangSmith unreachable for {len(batch)} run(s): {str(e)}", exc_info=True)
+            continue
+
+        now = timezone.now()
+        recorded = []
+        expired_ids = []
+        for usage in batch:
+            token_usage = usage_by_run.get(usage.run_id)
+            if token_usage is None:
+                if usage.created_at < give_up_before:
+                    expired_ids.append(usage.id)
+                continue
+            usage.input_tokens = token_usage['input_tokens']
+            usage.output_tokens = token_usage['output_tokens']
+            usage.cost = calculate_cost(token_usage, usage.llm_model)
+            usage.status = 'recorded'
+            usage.updated_at = now
+            recorded.append(usage)
+
+        if recorded:
+            LLMUsage.objects.bulk_update(recorded, ['input_tokens', 'output_tokens', 'cost', 'status', 'updated_at'])
+            total_recorded += len(recorded)
+        if expired_ids:
+            LLMUsage.objects.filter(id__in=expired_ids, status='pending').update(status='unavailable', updated_at=now)
+            logger.warning(f"RECONCILE_LLM_USAGE_TASK: Marked {len(expired_ids)} usage row(s) unavailable after {settings.LLM_USAGE_UNAVAILABLE_AFTER_HOURS}h without LangSmith usage.")
+
+    logger.info(f"RECONCILE_LLM_USAGE_TASK: Recorded usage for {total_recorded} pending run(s).")
+    return total_recorded
+
+def calculate_cost(token_usage: Dict[str, int], model: str) -> float:
+    """Calculate the cost of token usage based on the model."""
+    input_cost_per_token = 0.00001  # Default
+    output_cost_per_token = 0.00002 # Default
+
+    model_key = model.lower()
+    PRICING = {
+        "gpt-4": {"input": 0.00003, "output": 0.00006},
+        "cerebras::llama-3.3-70b": {"input": 0.0000026, "output": 0.0000035}, # Made up, adjust
+        "default": {"input": 0.00001, "output": 0.00002}
+    }
+
+    for key_part in PRICING:
+        if key_part in model_key:
+            input_cost_per_token = PRICING[key_part]["input"]
+            output_cost_per_token = PRICING[key_part]["output"]
+            break
+
+    input_tokens = token_usage.get('input_tokens', 0) or 0
+    output_tokens = token_usage.get('output_tokens', 0) or 0
+
+    input_cost = input_tokens * input_cost_per_token
+    output_cost = output_tokens * output_cost_per_token
+
+    return round(input_cost + output_cost, 6)
@@ -1,3 +1,659 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from kombu import Connection
+from langsmith import schemas as langsmith_schemas
+
+from django_backend.celery_app import app as celery_app
+
+from . import review_concurrency, review_scheduler, webhook_view
+from .langgraph_client.client import LangGraphClient
+from .diff_filtering import filter_diff_files, get_review_file_policy, omission_reason
+from .models import Commit, Repository, WebhookEventLog, WebhookEventPayload
+from .review_concurrency import acquire_review_slot, release_review_slot
+from .review_scheduler import enqueue_review_job, pop_due_review_jobs, review_queue_depth, review_queue_depths
+from .review_sharding import generate_sharded_review, plan_review_shards, select_diff_files
+from .services import GitHubService
+from .tasks import usage_tasks
+from .tasks.runtime import Deadline
+from .tasks.review_tasks import (
+    build_commit_rows, commit_changed_file_count, dispatch_fair_reviews, merge_incremental_review_data, process_pr_review,
+    process_webhook_event,
+)
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeRedisMixin:
+    """Point the review scheduling and concurrency state at an in-process Redis."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(review_concurrency, '_redis_client', fakeredis.FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for module, attribute, value in ((review_concurrency, '_acquire', None), (review_scheduler, '_scripts', {})):
+            patcher = mock.patch.object(module, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+def make_policy(**overrides):
+    policy = {
+        'exclude_globs': ['*.lock', 'vendor/*', '*/migrations/0*.py'],
+        'max_file_changes': 1000,
+        'skip_binary': True,
+        'chunk_token_budget': 1000,
+    }
+    policy.update(overrides)
+    return policy
+
+
+class OmissionReasonTests(SimpleTestCase):
+    def test_reviews_ordinary_source_file(self):
+        self.assertIsNone(omission_reason({'filename': 'src/app.py', 'status': 'modified', 'changes': 10, 'patch': '+x'}, make_policy()))
+
+    def test_excludes_by_file_name_in_any_directory(self):
+        self.assertEqual(omission_reason({'filename': 'web/yarn.lock', 'changes': 5, 'patch': '+x'}, make_policy()), 'excluded')
+
+    def test_excludes_by_path_from_repository_root(self):
+        policy = make_policy()
+        self.assertEqual(omission_reason({'filename': 'vendor/lib/a.go', 'changes': 5, 'patch': '+x'}, policy), 'excluded')
+        self.assertEqual(omission_reason({'filename': 'core/migrations/0001_initial.py', 'changes': 5, 'patch': '+x'}, policy), 'excluded')
+        self.assertIsNone(omission_reason({'filename': 'src/vendor.py', 'changes': 5, 'patch': '+x'}, policy))
+
+    def test_binary_files(self):
+        policy = make_policy()
+        self.assertEqual(omission_reason({'filename': 'logo.png', 'status': 'added', 'changes': 0}, policy), 'binary')
+        self.assertEqual(omission_reason({'filename': 'data.bin', 'changes': 2, 'patch': '+x', 'content_omitted': 'not_text'}, policy), 'binary')
+        self.assertIsNone(omission_reason({'filename': 'old.py', 'status': 'removed', 'changes': 0}, policy))
+
+    def test_pure_rename_is_not_binary(self):
+        rename = {'filename': 'src/new.py', 'previous_filename': 'src/old.py', 'status': 'renamed', 'changes': 0}
+        self.assertEqual(omission_reason(rename, make_policy()), 'renamed')
+        self.assertEqual(omission_reason(rename, make_policy(skip_binary=False)), 'renamed')
+        edited = {**rename, 'changes': 3, 'patch': '+x'}
+        self.assertIsNone(omission_reason(edited, make_policy()))
+
+    def test_default_globs_keep_migrations(self):
+        policy = get_review_file_policy(Repository(repo_name='acme/app'))
+        self.assertIsNone(omission_reason({'filename': 'core/migrations/0002_add_index.py', 'changes': 5, 'patch': '+x'}, policy))
+        self.assertEqual(omission_reason({'filename': 'web/yarn.lock', 'changes': 5, 'patch': '+x'}, policy), 'excluded')
+
+    def test_minified_content(self):
+        diff_file = {'filename': 'bundle.js', 'changes': 1, 'patch': '+x', 'content': 'a' * 5000}
+        self.assertEqual(omission_reason(diff_file, make_policy()), 'generated')
+        self.assertIsNone(omission_reason(diff_file, make_policy(skip_binary=False)))
+
+    def test_too_many_changed_lines(self):
+        self.assertEqual(omission_reason({'filename': 'big.py', 'changes': 1001, 'patch': '+x'}, make_policy()), 'too_large')
+
+
+class FilterDiffFilesTests(SimpleTestCase):
+    def test_splits_reviewed_files_from_summaries(self):
+        reviewed, omitted = filter_diff_files([
+            {'filename': 'a.py', 'status': 'modified', 'additions': 1, 'deletions': 0, 'changes': 1, 'patch': '+x'},
+            {'filename': 'poetry.lock', 'status': 'modified', 'additions': 50, 'deletions': 0, 'changes': 50, 'patch': '+y' * 50},
+        ], make_policy())
+        self.assertEqual([diff_file['filename'] for diff_file in reviewed], ['a.py'])
+        self.assertEqual(omitted, [{'filename': 'poetry.lock', 'status': 'modified', 'additions': 50, 'deletions': 0, 'changes': 50, 'omitted': 'excluded'}])
+
+    def test_trims_file_over_token_budget(self):
+        reviewed, _ = filter_diff_files([
+            {'filename': 'a.py', 'changes': 10, 'patch': 'p' * 8000, 'content': 'c' * 100},
+        ], make_policy(chunk_token_budget=1000))
+        self.assertNotIn('content', reviewed[0])
+        self.assertEqual(reviewed[0]['content_omitted'], 'token_budget')
+        self.assertEqual(len(reviewed[0]['patch']), 4000)
+        self.assertTrue(reviewed[0]['patch_truncated'])
+
+    def test_leaves_file_within_budget_untouched(self):
+        diff_file = {'filename': 'a.py', 'changes': 10, 'patch': 'p' * 100, 'content': 'c' * 100}
+        reviewed, _ = filter_diff_files([diff_file], make_policy())
+        self.assertEqual(reviewed, [diff_file])
+
+
+class PlanReviewShardsTests(SimpleTestCase):
+    def test_small_change_is_one_shard(self):
+        changed_files = [{'filename': 'a.py', 'changes': 10}, {'filename': 'b.py', 'changes': 20}]
+        self.assertEqual(plan_review_shards(changed_files, 1500, 25, 6), [['a.py', 'b.py']])
+
+    def test_splits_by_weight_and_keeps_directories_together(self):
+        changed_files = [{'filename': f'a/f{i}.py', 'changes': 100} for i in range(5)]
+        changed_files += [{'filename': f'b/g{i}.py', 'changes': 100} for i in range(5)]
+        shards = plan_review_shards(changed_files, 500, 25, 6)
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(sorted(shards), [[f'a/f{i}.py' for i in range(5)], [f'b/g{i}.py' for i in range(5)]])
+
+    def test_splits_by_file_count(self):
+        changed_files = [{'filename': f'd{i}/f.py', 'changes': 1} for i in range(10)]
+        shards = plan_review_shards(changed_files, 1500, 4, 6)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(sorted(filename for shard in shards for filename in shard), sorted(changed_file['filename'] for changed_file in changed_files))
+
+    def test_caps_shard_count(self):
+        changed_files = [{'filename': f'd{i}/f.py', 'changes': 1000} for i in range(10)]
+        self.assertEqual(len(plan_review_shards(changed_files, 100, 25, 3)), 3)
+
+    def test_uses_given_weight(self):
+        changed_files = [{'filename': 'a.py', 'changes': 1, 'tokens': 800}, {'filename': 'b.py', 'changes': 1, 'tokens': 800}]
+        self.assertEqual(len(plan_review_shards(changed_files, 1000, 25, 6)), 1)
+        self.assertEqual(len(plan_review_shards(changed_files, 1000, 25, 6, weight=lambda changed_file: changed_file['tokens'])), 2)
+
+    def test_every_shard_gets_omitted_file_summaries(self):
+        diff_files = [{'filename': 'a.py'}, {'filename': 'b.py'}, {'filename': 'yarn.lock', 'omitted': 'excluded'}]
+        self.assertEqual(
+            [diff_file['filename'] for diff_file in select_diff_files(diff_files, ['b.py'])],
+            ['b.py', 'yarn.lock']
+        )
+
+
+class QueueRoutingTests(SimpleTestCase):
+    def route(self, task_name, **options):
+        return celery_app.amqp.router.route(options, task_name)['queue'].name
+
+    def test_webhook_handling_and_cancellation_skip_the_review_queues(self):
+        for task_name in ('process_webhook_event', 'cancel_review_run', 'dispatch_fair_reviews'):
+            self.assertEqual(self.route(f'core.tasks.review_tasks.{task_name}'), 'control')
+
+    def test_reviews_default_to_the_webhook_queue(self):
+        for task_name in ('process_pr_review', 'process_commit_review', 'process_push_review'):
+            self.assertEqual(self.route(f'core.tasks.review_tasks.{task_name}'), 'webhook')
+
+    def test_manual_triggers_can_jump_the_webhook_backlog(self):
+        self.assertEqual(self.route('core.tasks.review_tasks.process_pr_review', queue='interactive'), 'interactive')
+
+    def test_usage_and_maintenance_run_on_backfill(self):
+        self.assertEqual(self.route('core.tasks.usage_tasks.collect_llm_usage'), 'backfill')
+        self.assertEqual(self.route('core.tasks.maintenance_tasks.fail_stale_reviews'), 'backfill')
+
+
+@override_settings(REVIEW_FAIR_REPO_WEIGHTS={})
+class FairReviewQueueTests(FakeRedisMixin, SimpleTestCase):
+    def enqueue(self, repository_id, count, countdown=0):
+        for index in range(count):
+            enqueue_review_job(repository_id, process_pr_review.name, [repository_id, index], {}, countdown=countdown)
+
+    def released(self, limit):
+        return [job['args'] for job in pop_due_review_jobs(limit)]
+
+    def test_takes_turns_across_repositories(self):
+        self.enqueue(1, 3)
+        self.enqueue(2, 1)
+        self.assertEqual(self.released(3), [[1, 0], [2, 0], [1, 1]])
+        self.assertEqual(review_queue_depths(), {'1': 1})
+
+    @override_settings(REVIEW_FAIR_REPO_WEIGHTS={'1': 2})
+    def test_weighted_repository_gives_more_jobs_per_round(self):
+        self.enqueue(1, 4)
+        self.enqueue(2, 2)
+        self.assertEqual(self.released(3), [[1, 0], [1, 1], [2, 0]])
+
+    def test_next_call_starts_with_the_following_repository(self):
+        self.enqueue(1, 2)
+        self.enqueue(2, 2)
+        self.assertEqual(self.released(1), [[1, 0]])
+        self.assertEqual(self.released(1), [[2, 0]])
+
+    def test_due_job_is_released_past_a_debounced_one(self):
+        self.enqueue(1, 1, countdown=300)
+        enqueue_review_job(1, process_pr_review.name, [1, 'due'], {})
+        self.assertEqual(self.released(5), [[1, 'due']])
+        self.assertEqual(review_queue_depth(1), 1)
+
+    def test_drained_repository_leaves_the_ring(self):
+        self.enqueue(1, 1)
+        self.assertEqual(self.released(5), [[1, 0]])
+        self.assertEqual(self.released(5), [])
+        self.assertEqual(review_concurrency.get_redis_client().llen('review-queue:ring'), 0)
+        self.enqueue(1, 1)
+        self.assertEqual(review_queue_depths(), {'1': 1})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REVIEW_FAIR_QUEUE_TARGET_DEPTH=2, REVIEW_FAIR_REPO_WEIGHTS={})
+class DispatchFairReviewsTests(FakeRedisMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        # The in-memory transport, like Redis, has no queue until something is published to it
+        patcher = mock.patch.object(dispatch_fair_reviews.app, 'connection_for_read', side_effect=lambda: Connection('memory://'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.delete_webhook_queue)
+        patcher = mock.patch.object(process_pr_review, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def delete_webhook_queue(self):
+        with Connection('memory://') as connection:
+            connection.default_channel.queue_delete('webhook')
+
+    def test_releases_jobs_when_the_webhook_queue_does_not_exist(self):
+        enqueue_review_job(1, process_pr_review.name, [{}, 1, 10], {})
+        self.assertEqual(dispatch_fair_reviews.run(), 1)
+        self.apply_async.assert_called_once_with(args=[{}, 1, 10], kwargs={}, queue='webhook')
+        self.assertEqual(review_queue_depth(1), 0)
+
+    def test_releases_only_up_to_the_target_depth(self):
+        with Connection('memory://') as connection:
+            queue = connection.SimpleQueue('webhook')
+            queue.put({})
+            queue.close()
+        for index in range(3):
+            enqueue_review_job(1, process_pr_review.name, [{}, 1, index], {})
+        self.assertEqual(dispatch_fair_reviews.run(), 1)
+        self.assertEqual(review_queue_depth(1), 2)
+
+    def test_keeps_jobs_queued_while_the_backlog_is_full(self):
+        with Connection('memory://') as connection:
+            queue = connection.SimpleQueue('webhook')
+            for _ in range(2):
+                queue.put({})
+            queue.close()
+        enqueue_review_job(1, process_pr_review.name, [{}, 1, 10], {})
+        self.assertEqual(dispatch_fair_reviews.run(), 0)
+        self.apply_async.assert_not_called()
+        self.assertEqual(review_queue_depth(1), 1)
+
+
+@override_settings(REVIEW_CONCURRENCY_PER_MODEL=2, REVIEW_MODEL_CONCURRENCY_LIMITS={'small': 1}, REVIEW_CONCURRENCY_PER_REPO=1, REVIEW_SLOT_LEASE_SECONDS=60)
+class ReviewSlotTests(FakeRedisMixin, SimpleTestCase):
+    def test_model_limit_spans_repositories(self):
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+        self.assertTrue(acquire_review_slot('m', 2, 'review-b'))
+        self.assertFalse(acquire_review_slot('m', 3, 'review-c'))
+        self.assertTrue(acquire_review_slot('other', 3, 'review-c'))
+
+    def test_per_model_limit_ignores_case(self):
+        self.assertTrue(acquire_review_slot('Small', 1, 'review-a'))
+        self.assertFalse(acquire_review_slot('small', 2, 'review-b'))
+
+    def test_takes_no_model_slot_when_the_repository_is_full(self):
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+        self.assertFalse(acquire_review_slot('m', 1, 'review-b'))
+        self.assertTrue(acquire_review_slot('m', 2, 'review-c'))
+
+    def test_holder_can_acquire_again(self):
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+
+    def test_release_frees_both_slots(self):
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+        release_review_slot('m', 1, 'review-a')
+        self.assertTrue(acquire_review_slot('m', 1, 'review-b'))
+
+    def test_expired_lease_frees_its_slot(self):
+        with mock.patch.object(review_concurrency.time, 'time', return_value=1000.0):
+            self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+            self.assertFalse(acquire_review_slot('m', 1, 'review-b'))
+        with mock.patch.object(review_concurrency.time, 'time', return_value=1061.0):
+            self.assertTrue(acquire_review_slot('m', 1, 'review-b'))
+
+    def test_fails_open_without_redis(self):
+        with mock.patch.object(review_concurrency, '_get_acquire_script', side_effect=review_concurrency.redis.ConnectionError('down')):
+            with self.assertLogs('core.review_concurrency', 'WARNING'):
+                self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+
+
+@override_settings(REVIEW_CONCURRENCY_PER_MODEL=3, REVIEW_MODEL_CONCURRENCY_LIMITS={}, REVIEW_CONCURRENCY_PER_REPO=10)
+class ShardSlotTests(FakeRedisMixin, SimpleTestCase):
+    def test_each_shard_run_takes_a_model_slot(self):
+        self.assertTrue(acquire_review_slot('m', 1, 'review-a'))
+        self.assertFalse(acquire_review_slot('m', 1, 'review-b:shards', slots=3))
+        self.assertTrue(acquire_review_slot('m', 1, 'review-b:shards', slots=2))
+        self.assertFalse(acquire_review_slot('m', 2, 'review-c'))
+        release_review_slot('m', 1, 'review-b:shards', slots=2)
+        self.assertTrue(acquire_review_slot('m', 2, 'review-c'))
+
+
+class FakeStreamPart:
+    def __init__(self, event, data):
+        self.event = event
+        self.data = data
+
+
+def make_streaming_client(hang=False):
+    """A LangGraphClient whose SDK client streams one run, optionally never finishing it."""
+    async def stream(thread_id, assistant_id, **kwargs):
+        yield FakeStreamPart('metadata', {'run_id': 'run-1'})
+        yield FakeStreamPart('values', {'final_result': {'summary': 'ok'}})
+        if hang:
+            await asyncio.sleep(60)
+
+    client = LangGraphClient.__new__(LangGraphClient)
+    client.review_agent = {'assistant_id': 'reviewer'}
+    client.client = mock.Mock()
+    client.client.threads.create = mock.AsyncMock(return_value={'thread_id': 'thread-1'})
+    client.client.runs.stream = stream
+    client.client.runs.cancel = mock.AsyncMock()
+    return client
+
+
+@override_settings(LANGGRAPH_RECURSION_LIMIT=100)
+class ReviewDeadlineTests(SimpleTestCase):
+    pr_data = {'user': {'login': 'octocat'}, 'base': {'repo': {'name': 'app'}}, 'number': 1}
+
+    def generate(self, client, timeout):
+        runs = []
+
+        async def record_run(thread_id, run_id):
+            runs.append((thread_id, run_id))
+
+        result = asyncio.run(client.generate_review(self.pr_data, {}, '1', on_run_created=record_run, timeout=timeout))
+        return result, runs
+
+    def test_run_within_its_deadline_returns_the_final_state(self):
+        client = make_streaming_client()
+        result, runs = self.generate(client, timeout=5)
+        self.assertEqual(result['review_data'], {'final_result': {'summary': 'ok'}})
+        self.assertEqual(runs, [('thread-1', 'run-1')])
+        client.client.runs.cancel.assert_not_called()
+
+    def test_overrun_is_cancelled_on_the_server(self):
+        client = make_streaming_client(hang=True)
+        with self.assertRaises(TimeoutError), self.assertLogs('core.langgraph_client.client', 'ERROR'):
+            self.generate(client, timeout=0.05)
+        client.client.runs.cancel.assert_awaited_once_with(thread_id='thread-1', run_id='run-1')
+
+    def test_deadline_is_shared_by_the_stages_of_a_task(self):
+        with mock.patch('core.tasks.runtime.time.monotonic', return_value=100.0):
+            deadline = Deadline(60)
+        with mock.patch('core.tasks.runtime.time.monotonic', return_value=150.0):
+            self.assertEqual(deadline.remaining('the review run'), 10.0)
+        with mock.patch('core.tasks.runtime.time.monotonic', return_value=161.0):
+            with self.assertRaisesMessage(TimeoutError, 'before the review run'):
+                deadline.remaining('the review run')
+
+    @override_settings(GITHUB_API_TIMEOUT=20)
+    def test_github_requests_time_out(self):
+        self.assertEqual(GitHubService('token').timeout.total, 20)
+        self.assertEqual(GitHubService('token', timeout=5).timeout.total, 5)
+
+
+class FakeShardClient:
+    def __init__(self):
+        self.reviewed = []
+
+    async def generate_review(self, shard, on_run_created, **kwargs):
+        index = shard['shard_index']
+        self.reviewed.append(shard['files'])
+        await on_run_created(f"shard-thread-{index}", f"run-{index}")
+        return {
+            'thread_id': f"shard-thread-{index}",
+            'run_id': f"run-{index}",
+            'review_data': {'reviews': [{'file': filename} for filename in shard['files']]},
+        }
+
+    async def create_thread(self):
+        return 'chat-thread'
+
+
+class GenerateShardedReviewTests(SimpleTestCase):
+    def test_chat_thread_is_separate_from_the_shard_threads(self):
+        runs = []
+
+        async def record_run(thread_id, run_id):
+            runs.append([thread_id, run_id])
+
+        client = FakeShardClient()
+        result = asyncio.run(generate_sharded_review(
+            client, [['a.py'], ['b.py']], pr_data={}, repo_settings={}, user_id='1', on_run_created=record_run
+        ))
+        self.assertEqual(result['thread_id'], 'chat-thread')
+        self.assertEqual(result['run_ids'], ['run-0', 'run-1'])
+        self.assertEqual(sorted(runs), [['shard-thread-0', 'run-0'], ['shard-thread-1', 'run-1']])
+        self.assertEqual(result['review_data']['reviews'], [{'file': 'a.py'}, {'file': 'b.py'}])
+
+
+def make_final_result(files, summary):
+    return {
+        'review': {
+            'final': [{'file': filename, 'issues': [f"issue in {filename}"]} for filename in files],
+            'syntax': [{'file': filename, 'issues': []} for filename in files],
+            'standards': [{'file': filename, 'violations': []} for filename in files],
+        },
+        'artifacts': {'fixes': {filename: f"fix for {filename}" for filename in files}, 'summary': summary},
+    }
+
+
+class MergeIncrementalReviewDataTests(SimpleTestCase):
+    def test_report_keeps_untouched_files_and_replaces_changed_ones(self):
+        previous = {'reviews': [{'file': 'a.py'}, {'file': 'b.py'}], 'final_result': make_final_result(['a.py', 'b.py'], 'old')}
+        current = {'reviews': [{'file': 'b.py', 'new': True}], 'final_result': make_final_result(['b.py'], 'new')}
+        current['final_result']['review']['final'][0]['issues'] = ['new issue in b.py']
+
+        merged = merge_incremental_review_data(previous, current, ['b.py'])
+
+        self.assertEqual(merged['reviews'], [{'file': 'a.py'}, {'file': 'b.py', 'new': True}])
+        final_result = merged['final_result']
+        self.assertEqual(
+            final_result['review']['final'],
+            [{'file': 'a.py', 'issues': ['issue in a.py']}, {'file': 'b.py', 'issues': ['new issue in b.py']}]
+        )
+        for section in ('syntax', 'standards'):
+            self.assertEqual([entry['file'] for entry in final_result['review'][section]], ['a.py', 'b.py'])
+        self.assertEqual(final_result['artifacts']['fixes'], {'a.py': 'fix for a.py', 'b.py': 'fix for b.py'})
+        self.assertEqual(final_result['artifacts']['summary'], 'new')
+
+    def test_fixed_file_without_new_findings_is_dropped(self):
+        previous = {'final_result': make_final_result(['a.py', 'b.py'], 'old')}
+        current = {'final_result': make_final_result([], 'new')}
+        merged = merge_incremental_review_data(previous, current, ['b.py'])
+        self.assertEqual([entry['file'] for entry in merged['final_result']['review']['final']], ['a.py'])
+        self.assertEqual(merged['final_result']['artifacts']['fixes'], {'a.py': 'fix for a.py'})
+
+
+def make_run(run_id, total_tokens=30):
+    return langsmith_schemas.Run(
+        id=run_id, name='review', run_type='chain', start_time='2025-01-01T00:00:00', trace_id=run_id,
+        end_time='2025-01-01T00:01:00', prompt_tokens=10, completion_tokens=20, total_tokens=total_tokens,
+    )
+
+
+class ReadRunsUsageTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(usage_tasks, 'get_langsmith_client')
+        self.client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_selects_the_fields_a_run_needs_to_parse(self):
+        required = {name for name, field in langsmith_schemas.Run.model_fields.items() if field.is_required()}
+        self.assertLessEqual(required, set(usage_tasks.USAGE_RUN_FIELDS))
+
+    def test_reads_usage_in_one_call(self):
+        run_id = '00000000-0000-0000-0000-000000000001'
+        self.client.list_runs.return_value = iter([make_run(run_id)])
+        self.assertEqual(
+            usage_tasks.read_runs_usage([run_id]),
+            {run_id: {'input_tokens': 10, 'output_tokens': 20, 'total_tokens': 30}}
+        )
+
+    def test_falls_back_to_single_reads_and_skips_runs_that_fail(self):
+        good, bad = '00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-000000000002'
+        self.client.list_runs.side_effect = ValueError('row does not parse')
+
+        def read_run(run_id):
+            if run_id == bad:
+                raise ValueError('bad run')
+            return make_run(run_id)
+
+        self.client.read_run.side_effect = read_run
+        with self.assertLogs('core.tasks.usage_tasks', 'WARNING') as logs:
+            self.assertEqual(list(usage_tasks.read_runs_usage([good, bad])), [good])
+        self.assertTrue(any(bad in line for line in logs.output))
+
+    def test_raises_when_langsmith_is_unreachable(self):
+        self.client.list_runs.side_effect = ConnectionError('down')
+        self.client.read_run.side_effect = ConnectionError('down')
+        with self.assertRaises(ConnectionError), self.assertLogs('core.tasks.usage_tasks', 'WARNING'):
+            usage_tasks.read_runs_usage(['a', 'b'])
+
+
+class CommitChangedFileCountTests(SimpleTestCase):
+    def test_counts_the_push_payload_file_lists(self):
+        self.assertEqual(commit_changed_file_count({'added': ['a.py'], 'modified': ['b.py', 'c.py'], 'removed': []}), 3)
+
+    def test_unknown_without_file_lists(self):
+        self.assertIsNone(commit_changed_file_count({'id': 'abc'}))
+
+
+def make_push_commit(sha, **overrides):
+    commit_payload = {
+        'id': sha,
+        'message': f'Commit {sha}',
+        'url': f'https://github.com/acme/app/commit/{sha}',
+        'timestamp': '2026-10-01T12:00:00Z',
+        'author': {'name': 'Octo Cat'},
+        'committer': {'id': 42, 'name': 'GitHub'},
+        'added': ['a.py'],
+        'modified': [],
+        'removed': [],
+    }
+    commit_payload.update(overrides)
+    return commit_payload
+
+
+class PushCommitUpsertTests(SimpleTestCase):
+    def test_projects_push_commits_onto_rows(self):
+        [row] = build_commit_rows(Repository(id=1, repo_name='acme/app'), [make_push_commit('c1')])
+        self.assertEqual(row.commit_hash, 'c1')
+        self.assertEqual(row.author_github_id, 'Octo Cat')
+        self.assertEqual(row.committer_github_id, '42')
+        self.assertEqual(row.message, 'Commit c1')
+        self.assertEqual(row.timestamp.isoformat(), '2026-10-01T12:00:00+00:00')
+        self.assertEqual(row.changed_file_count, 1)
+
+    def test_one_row_per_sha_and_none_without_a_sha(self):
+        commits_data = [make_push_commit('c1'), make_push_commit('c2'), make_push_commit('c1', message='Amended'), {'message': 'no sha'}]
+        with self.assertLogs('core.tasks.review_tasks', 'WARNING'):
+            rows = build_commit_rows(Repository(id=1, repo_name='acme/app'), commits_data)
+        self.assertEqual([(row.commit_hash, row.message) for row in rows], [('c1', 'Amended'), ('c2', 'Commit c2')])
+
+    @override_settings(REVIEW_PUSH_MODE='off')
+    def test_push_event_upserts_its_commits_in_one_statement(self):
+        event_log = mock.Mock(event_type='push', payload={
+            'repository': {'full_name': 'acme/app'},
+            'commits': [make_push_commit('c1'), make_push_commit('c2')],
+        })
+        with mock.patch.object(WebhookEventLog.objects, 'select_related') as select_related, \
+                mock.patch.object(Repository.objects, 'get', return_value=Repository(id=1, repo_name='acme/app')), \
+                mock.patch.object(Commit.objects, 'bulk_create') as bulk_create:
+            select_related.return_value.only.return_value.get.return_value = event_log
+            process_webhook_event.run(7)
+        bulk_create.assert_called_once()
+        rows = bulk_create.call_args.args[0]
+        self.assertEqual([row.commit_hash for row in rows], ['c1', 'c2'])
+        self.assertEqual(bulk_create.call_args.kwargs, {
+            'update_conflicts': True,
+            'unique_fields': ['repository', 'commit_hash'],
+            'update_fields': ['author_github_id', 'committer_github_id', 'message', 'url', 'timestamp', 'changed_file_count', 'updated_at'],
+        })
+
+
+def sign_webhook(secret, body):
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GITHUB_WEBHOOK_SECRET='global-secret', WEBHOOK_DELIVERY_DEDUP_TTL=60)
+class GithubWebhookTests(SimpleTestCase):
+    body = json.dumps({'action': 'opened', 'repository': {'full_name': 'acme/app'}}).encode('utf-8')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.secret_lookup = self.patch(webhook_view, 'aget_repo_webhook_secret', new=mock.AsyncMock(return_value=(1, 'repo-secret')))
+        self.patch(webhook_view, 'aclaim_webhook_secret_refresh', new=mock.AsyncMock(return_value=False))
+        self.create_log = self.patch(WebhookEventLog.objects, 'acreate', new=mock.AsyncMock(return_value=mock.Mock(pk=5)))
+        self.store_payload = self.patch(WebhookEventPayload.objects, 'abulk_create', new=mock.AsyncMock())
+        self.enqueue = self.patch(process_webhook_event, 'delay')
+
+    def patch(self, target, attribute, **kwargs):
+        patcher = mock.patch.object(target, attribute, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def deliver(self, signature=None, delivery_id='delivery-1', **headers):
+        request = RequestFactory().post(
+            '/webhook/', self.body, content_type='application/json',
+            headers={
+                'X-Hub-Signature-256': signature or sign_webhook('repo-secret', self.body),
+                'X-GitHub-Event': 'pull_request',
+                'X-GitHub-Delivery': delivery_id,
+                **headers,
+            },
+        )
+        return asyncio.run(webhook_view.github_webhook(request))
+
+    def test_signature_check(self):
+        self.assertTrue(webhook_view._signature_is_valid('s', b'{}', sign_webhook('s', b'{}')))
+        self.assertFalse(webhook_view._signature_is_valid('s', b'{}', sign_webhook('other', b'{}')))
+        self.assertFalse(webhook_view._signature_is_valid('s', b'{}', 'sha1=abc'))
+
+    def test_signed_delivery_is_logged_and_enqueued(self):
+        response = self.deliver()
+        self.assertEqual(response.status_code, 202)
+        self.secret_lookup.assert_awaited_once_with('acme/app')
+        self.assertEqual(self.create_log.await_args.kwargs['event_id'], 'delivery-1')
+        self.assertEqual(self.create_log.await_args.kwargs['repository_id'], 1)
+        self.store_payload.assert_awaited_once()
+        self.enqueue.assert_called_once_with(5)
+
+    def test_bad_signature_writes_nothing(self):
+        with self.assertLogs('core.webhook_view', 'WARNING'):
+            response = self.deliver(signature=sign_webhook('wrong-secret', self.body))
+        self.assertEqual(response.status_code, 401)
+        self.create_log.assert_not_awaited()
+        self.enqueue.assert_not_called()
+
+    def test_falls_back_to_the_global_secret(self):
+        self.secret_lookup.return_value = (1, None)
+        self.assertEqual(self.deliver(signature=sign_webhook('global-secret', self.body)).status_code, 202)
+
+    def test_missing_headers_are_rejected(self):
+        request = RequestFactory().post('/webhook/', self.body, content_type='application/json')
+        with self.assertLogs('core.webhook_view', 'WARNING'):
+            response = asyncio.run(webhook_view.github_webhook(request))
+        self.assertEqual(response.status_code, 400)
+        self.create_log.assert_not_awaited()
+
+    def test_redelivery_is_dropped_before_the_database(self):
+        self.assertEqual(self.deliver().status_code, 202)
+        response = self.deliver()
+        self.assertEqual(response.status_code, 200)
+        self.create_log.assert_awaited_once()
+        self.enqueue.assert_called_once()
+
+    def test_recorded_delivery_is_dropped_after_the_dedup_key_expires(self):
+        self.create_log.side_effect = IntegrityError
+        claim = self.patch(WebhookEventLog.objects, 'filter')
+        claim.return_value.aupdate = mock.AsyncMock(return_value=0)
+        self.assertEqual(self.deliver().status_code, 200)
+        self.assertEqual(claim.call_args.kwargs, {'event_id': 'delivery-1', 'status': 'failed'})
+        self.enqueue.assert_not_called()
+
+    def test_failed_delivery_can_be_retried(self):
+        self.create_log.side_effect = IntegrityError
+        self.patch(WebhookEventLog.objects, 'filter').return_value.aupdate = mock.AsyncMock(return_value=1)
+        self.patch(WebhookEventLog.objects, 'only').return_value.aget = mock.AsyncMock(return_value=mock.Mock(pk=9))
+        self.assertEqual(self.deliver().status_code, 202)
+        self.enqueue.assert_called_once_with(9)
+
+    def test_processing_error_lets_the_redelivery_through(self):
+        self.store_payload.side_effect = [Exception('db down'), None]
+        self.patch(WebhookEventLog.objects, 'filter').return_value.aupdate = mock.AsyncMock()
+        with self.assertLogs('core.webhook_view', 'ERROR'):
+            self.assertEqual(self.deliver().status_code, 500)
+        self.assertEqual(self.deliver().status_code, 202)
+        self.enqueue.assert_called_once_with(5)
+
+    def test_dedup_fails_open_without_the_cache(self):
+        with mock.patch.object(webhook_view.cache, 'aadd', side_effect=Exception('redis down')), self.assertLogs('core.webhook_view', 'WARNING'):
+            self.assertEqual(self.deliver().status_code, 202)
+        self.enqueue.assert_called_once_with(5)
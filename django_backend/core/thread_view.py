@@ -3,12 +3,11 @@ from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 
-from .tasks.review_tasks import calculate_cost
+from .tasks.usage_tasks import record_pending_llm_usage
 from .models import (
     User,
     Thread as ThreadModel,
     Comment as CommentModel,
-    LLMUsage as LLMUsageModel,
 )
 from .serializers import (
     ReviewSerializer, ThreadSerializer, CommentSerializer
@@ -173,8 +172,6 @@ class ThreadViewSet(viewsets.ModelViewSet):
                  actual_ai_message = ai_response_content.get('content', actual_ai_message)
 
 
-            token_usage = response.get('token_usage', {})
-            
             # Filter the feedback_data before saving
             raw_feedback_data = response.get('feedback_data', {})
             allowed_keys = [
@@ -201,22 +198,21 @@ class ThreadViewSet(viewsets.ModelViewSet):
             thread.last_comment_at = timezone.now()
             thread.save(update_fields=['last_comment_at'])
             
-            # Record token usage
-            if token_usage:
-                LLMUsageModel.objects.create(
-                    review=thread.review,
-                    user=request.user,
-                    llm_model=thread.review.repository.llm_preference or settings.DEFAULT_LLM_MODEL,
-                    input_tokens=token_usage.get('input_tokens', 0),
-                    output_tokens=token_usage.get('output_tokens', 0),
-                    cost=calculate_cost(token_usage, thread.review.repository.llm_preference or settings.DEFAULT_LLM_MODEL),
+            # Record token usage; tokens are filled in from LangSmith in the background
+            llm_usage = None
+            if response.get('run_id'):
+                llm_usage = record_pending_llm_usage(
+                    thread.review,
+                    request.user,
+                    thread.review.repository.llm_preference or settings.DEFAULT_LLM_MODEL,
+                    response['run_id'],
                 )
             
             # Return both user comment and AI response
             return Response({
                 'user_comment': CommentSerializer(user_comment).data,
                 'ai_response': CommentSerializer(ai_comment).data,
-                'token_usage': token_usage
+                'llm_usage_id': llm_usage.id if llm_usage else None
             })
             
         except Exception as e:
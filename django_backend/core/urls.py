@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # from . import views
 from .auth_view import GitHubLoginView, GitHubCallbackView, GitHubExchangeAuthTokenView, GitHubLoginRedirectView
-from .admin_view import AdminStatsView, AdminUserListView, AdminUserUpdateView
+from .admin_view import AdminStatsView, AdminUserListView, AdminUserUpdateView, AdminReviewQueueView
 from .webhook_view import github_webhook
 from .user_view import CurrentUserView, UserRepositoriesView, UserOrganizationsView
 from .repository_view import RepositoryViewSet
@@ -78,6 +78,7 @@ urlpatterns = [
 
     # Admin endpoints
     path('admin/stats/', AdminStatsView.as_view(), name='admin_stats'),
+    path('admin/review-queue/', AdminReviewQueueView.as_view(), name='admin_review_queue'),
     path('admin/users/', AdminUserListView.as_view(), name='admin_list_users'),
     path('admin/users/<int:user_id>/', AdminUserUpdateView.as_view(), name='admin_update_user'),
 ]
\ No newline at end of file
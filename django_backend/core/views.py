@@ -7,7 +7,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
 
-from .tasks.review_tasks import calculate_cost, process_commit_review, process_pr_review, process_webhook_event
+from .tasks.review_tasks import process_commit_review, process_pr_review, process_webhook_event
+from .tasks.usage_tasks import calculate_cost
 from .models import (
     User,
     Repository as DBRepository,
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Repository as DBRepository
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class _LocalLRUCache:
+    """Small bounded LRU with per-entry TTL, used in front of the shared cache."""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+_local_cache = _LocalLRUCache(
+    max_size=settings.WEBHOOK_SECRET_LOCAL_CACHE_SIZE,
+    ttl=settings.WEBHOOK_SECRET_LOCAL_CACHE_TTL,
+)
+
+def _cache_key(repo_name: str) -> str:
+    return f"webhook-secret:{repo_name}"
+
+async def aget_repo_webhook_secret(repo_name: str, refresh: bool = False) -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Return (repo_id, webhook_secret) for a repository full name, or None if it is not registered.
+
+    Lookups go through a per-process LRU, then the shared Django cache, and only hit the
+    database on a miss. Unknown repositories are cached too, so spam for unregistered
+    names doesn't reach the database. Pass refresh=True to bypass both cache layers.
+    """
+    key = _cache_key(repo_name)
+    if not refresh:
+        value = _local_cache.get(key)
+        if value is not _MISSING:
+            return value
+        try:
+            value = await cache.aget(key, _MISSING)
+        except Exception as e:
+            logger.warning(f"Webhook secret cache read failed for {repo_name}: {str(e)}")
+            value = _MISSING
+        if value is not _MISSING:
+            _local_cache.set(key, value)
+            return value
+
+    value = await DBRepository.objects.filter(repo_name=repo_name).values_list('id', 'webhook_secret').afirst()
+    value = tuple(value) if value else None
+    _local_cache.set(key, value)
+    try:
+        await cache.aset(key, value, settings.WEBHOOK_SECRET_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Webhook secret cache write failed for {repo_name}: {str(e)}")
+    return value
+
+def invalidate_repo_webhook_secret(repo_name: str) -> None:
+    """Drop a repository's cached secret after it is created, changed or deleted."""
+    key = _cache_key(repo_name)
+    _local_cache.pop(key)
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Webhook secret cache invalidation failed for {repo_name}: {str(e)}")
+
+async def aclaim_webhook_secret_refresh(repo_name: str) -> bool:
+    """
+    Allow one forced refresh of a repository's secret per WEBHOOK_SECRET_REFRESH_INTERVAL,
+    so requests with bad signatures can't each cost a database query.
+    """
+    try:
+        return await cache.aadd(f"webhook-secret-refresh:{repo_name}", 1, settings.WEBHOOK_SECRET_REFRESH_INTERVAL)
+    except Exception as e:
+        logger.warning(f"Webhook secret refresh claim failed for {repo_name}: {str(e)}")
+        return False
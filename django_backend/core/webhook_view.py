@@ -1,13 +1,13 @@
 from django.http import HttpResponse
 
 from .tasks.review_tasks import process_webhook_event
-from .models import (
-    Repository as DBRepository,
-    WebhookEventLog
-)
+from .models import WebhookEventLog, WebhookEventPayload
+from .webhook_secrets import aclaim_webhook_secret_refresh, aget_repo_webhook_secret
 import hashlib
 import hmac
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 import logging
@@ -16,10 +16,23 @@ import json
 # Create a logger instance
 logger = logging.getLogger(__name__)
 
+def _signature_is_valid(secret: str, body: bytes, signature: str) -> bool:
+    """Check the X-Hub-Signature-256 header against the raw request body."""
+    expected_signature = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={expected_signature}", signature)
+
 @csrf_exempt
 @require_POST
 async def github_webhook(request):
-    """Handle GitHub webhook events"""
+    """
+    Handle GitHub webhook events.
+
+    The body is parsed once, the repository secret comes from the webhook secret cache,
+    and the signature is verified before anything is written. Redeliveries are
+    dropped by a SET-NX on the delivery ID in the cache and, past its TTL, by the
+    unique event_id index, so each delivery is enqueued at most once. The log row
+    holds metadata only; the compressed body is stored separately.
+    """
     signature = request.headers.get('X-Hub-Signature-256')
     event_type = request.headers.get('X-GitHub-Event')
     delivery_id = request.headers.get('X-GitHub-Delivery')
@@ -28,99 +41,95 @@ async def github_webhook(request):
         logger.warning("Webhook request missing required headers (Signature, Event, Delivery ID).")
         return HttpResponse('Missing required headers', status=400)
 
-    # Find repository for this webhook
-    repository = None
     try:
-        payload = json.loads(request.body.decode('utf-8'))
-        repo_full_name = payload.get('repository', {}).get('full_name')
-        if repo_full_name:
-            try:
-                repository = await DBRepository.objects.aget(repo_name=repo_full_name)
-            except DBRepository.DoesNotExist:
-                logger.warning(f"Repository {repo_full_name} not found in the database.")
-    except json.JSONDecodeError:
-        logger.warning("Could not parse request body as JSON to identify repository.")
+        event_data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.warning(f"Invalid JSON payload for webhook event {delivery_id}: {str(e)}")
+        return HttpResponse('Invalid JSON payload', status=400)
 
-    log_entry, created = await WebhookEventLog.objects.aupdate_or_create(
-        event_id=delivery_id,
-        defaults={
-            'repository':repository,
-            'event_type': event_type,
-            'payload': {'message': 'Event received, pending verification.'}, # Store raw body initially if possible
-            'headers': dict(request.headers),
-            'status': 'received'
-        }
-    )
-    if not created:
-        log_entry.status = 'received'
-        log_entry.repository = repository
-        log_entry.error_message = None
-        log_entry.processed_at = None
-        log_entry.payload = {'message': 'Event re-received, pending verification.'}
-        log_entry.headers = dict(request.headers)
-        await log_entry.asave()
+    # Resolve the repository and its secret, normally from cache without a DB round trip
+    repository = None
+    repo_full_name = (event_data.get('repository') or {}).get('full_name') if isinstance(event_data, dict) else None
+    if repo_full_name:
+        repository = await aget_repo_webhook_secret(repo_full_name)
+        if repository is None:
+            logger.warning(f"Repository {repo_full_name} not found in the database.")
 
-    # Extract repo info from payload to find the correct secret
+    # Fall back to the global secret if no repo-specific secret is configured
+    webhook_secret = (repository and repository[1]) or settings.GITHUB_WEBHOOK_SECRET
+    signature_ok = _signature_is_valid(webhook_secret, request.body, signature)
+    if not signature_ok and repo_full_name and await aclaim_webhook_secret_refresh(repo_full_name):
+        # The cached secret may be stale if it was regenerated in another process
+        repository = await aget_repo_webhook_secret(repo_full_name, refresh=True)
+        webhook_secret = (repository and repository[1]) or settings.GITHUB_WEBHOOK_SECRET
+        signature_ok = _signature_is_valid(webhook_secret, request.body, signature)
+    if not signature_ok:
+        logger.warning(f"Invalid webhook signature for event {delivery_id}.")
+        return HttpResponse('Invalid signature', status=401)
+
+    # Cheap at-most-once gate in Redis: redeliveries are answered before touching the DB
+    delivery_key = f"webhook-delivery:{delivery_id}"
     try:
-        payload = json.loads(request.body.decode('utf-8'))
-        repo_full_name = payload.get('repository', {}).get('full_name')
-        
-        # Try to find repository-specific secret
-        webhook_secret = None
-        if repo_full_name:
-            try:
-                repo = await DBRepository.objects.aget(repo_name=repo_full_name)
-                webhook_secret = repo.webhook_secret
-            except DBRepository.DoesNotExist:
-                pass
-        
-        # Fall back to global secret if no repo-specific secret found
-        if not webhook_secret:
-            webhook_secret = settings.GITHUB_WEBHOOK_SECRET
-            
-        # Verify signature with the appropriate secret
-        expected_signature = hmac.new(
-            webhook_secret.encode('utf-8'),
-            request.body,
-            hashlib.sha256
-        ).hexdigest()
-        
-        if not hmac.compare_digest(f"sha256={expected_signature}", signature):
-            logger.warning(f"Invalid webhook signature for event {delivery_id}.")
-            log_entry.status = 'failed'
-            log_entry.error_message = "Invalid signature."
-            await log_entry.asave()
-            return HttpResponse('Invalid signature', status=401)
+        first_delivery = await cache.aadd(delivery_key, 1, settings.WEBHOOK_DELIVERY_DEDUP_TTL)
     except Exception as e:
-        logger.error(f"Error during webhook signature verification for event {delivery_id}: {str(e)}")
-        log_entry.status = 'failed'
-        log_entry.error_message = f"Signature verification error: {str(e)}"
-        await log_entry.asave()
-        return HttpResponse('Error verifying signature', status=500)
+        # Fail open: the unique event_id index below still deduplicates
+        logger.warning(f"Webhook delivery dedup check failed for event {delivery_id}: {str(e)}")
+        first_delivery = True
+    if not first_delivery:
+        logger.info(f"Duplicate webhook delivery {delivery_id} ({event_type}) ignored.")
+        return HttpResponse('Duplicate delivery ignored', status=200)
 
     try:
-        event_data = json.loads(request.body.decode('utf-8'))
-        log_entry.payload = event_data # Update with parsed JSON payload
-        await log_entry.asave(update_fields=['payload'])
+        # The hot log row only keeps metadata; the compressed body goes to the payload table
+        log_fields = {
+            'repository_id': repository[0] if repository else None,
+            'event_type': event_type,
+            'payload_size': len(request.body),
+            'payload_sha256': hashlib.sha256(request.body).hexdigest(),
+            'status': 'processed',
+            'error_message': None,
+            'processed_at': timezone.now(),
+        }
+        try:
+            log_entry = await WebhookEventLog.objects.acreate(event_id=delivery_id, **log_fields)
+        except IntegrityError:
+            # Seen after the dedup key expired: only a delivery that failed before may be retried,
+            # and the conditional update lets exactly one request claim it
+            claimed = await WebhookEventLog.objects.filter(event_id=delivery_id, status='failed').aupdate(
+                updated_at=timezone.now(), **log_fields
+            )
+            if not claimed:
+                logger.info(f"Duplicate webhook delivery {delivery_id} ({event_type}) already recorded. Ignored.")
+                return HttpResponse('Duplicate delivery ignored', status=200)
+            log_entry = await WebhookEventLog.objects.only('id').aget(event_id=delivery_id)
+
+        await WebhookEventPayload.objects.abulk_create(
+            [WebhookEventPayload(
+                event_id=log_entry.pk,
+                body=WebhookEventPayload.compress_body(request.body),
+                headers=WebhookEventPayload.compress_headers(dict(request.headers)),
+            )],
+            update_conflicts=True,
+            unique_fields=['event'],
+            update_fields=['body', 'headers'],
+        )
 
         # Dispatch to Celery task for actual processing
-        process_webhook_event.delay(event_type, event_data)
-        
-        log_entry.status = 'processed' # Mark as successfully enqueued
-        log_entry.processed_at = timezone.now()
-        await log_entry.asave(update_fields=['status', 'processed_at'])
+        # Only the log id goes through the broker; the task reads the payload back
+        process_webhook_event.delay(log_entry.pk)
         logger.info(f"Webhook event {delivery_id} ({event_type}) successfully enqueued for processing.")
         return HttpResponse('Webhook processed and enqueued', status=202)
-                
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON payload for webhook event {delivery_id}: {str(e)}")
-        log_entry.status = 'failed'
-        log_entry.error_message = f"Invalid JSON payload: {str(e)}"
-        await log_entry.asave()
-        return HttpResponse('Invalid JSON payload', status=400)
+
     except Exception as e:
         logger.error(f"Error processing webhook event {delivery_id} after verification: {str(e)}", exc_info=True)
-        log_entry.status = 'failed'
-        log_entry.error_message = f"Internal processing error: {str(e)}"
-        await log_entry.asave()
-        return HttpResponse('Error processing webhook', status=500)
\ No newline at end of file
+        await WebhookEventLog.objects.filter(event_id=delivery_id).aupdate(
+            status='failed',
+            error_message=f"Internal processing error: {str(e)}",
+            processed_at=None,
+        )
+        # Let GitHub's redelivery through since nothing was enqueued
+        try:
+            await cache.adelete(delivery_key)
+        except Exception as cache_error:
+            logger.warning(f"Could not clear webhook delivery dedup key for event {delivery_id}: {str(cache_error)}")
+        return HttpResponse('Error processing webhook', status=500)
@@ -13,6 +13,37 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
+# Queues:
+#   control     - short tasks that must not wait behind reviews: webhook event handling,
+#                 run cancellation and the fair-share review dispatcher
+#   interactive - reviews a user is waiting on (manual triggers, re-reviews)
+#   webhook     - the reviews webhooks schedule
+#   backfill    - usage collection and maintenance
+# Run a worker per queue so webhook bursts never delay interactive reviews, e.g.:
+#   celery -A django_backend worker -Q control -c 2 -n control@%h
+#   celery -A django_backend worker -Q interactive -c 4 -n interactive@%h
+#   celery -A django_backend worker -Q webhook -c 8 -n webhook@%h
+#   celery -A django_backend worker -Q backfill -c 2 -n backfill@%h
+# Size interactive for peak manual use and webhook for push volume; keep the sum of the
+# review workers near the LLM provider limits in REVIEW_CONCURRENCY_PER_MODEL.
+# A worker consuming several queues takes from them round-robin, not by priority, so a
+# single worker serving everything gives interactive reviews no precedence. Use it for
+# development only.
+app.conf.task_default_queue = 'webhook'
+app.conf.task_routes = {
+    'core.tasks.review_tasks.process_webhook_event': {'queue': 'control'},
+    'core.tasks.review_tasks.process_pr_review': {'queue': 'webhook'}, # Manual triggers pass queue='interactive'
+    'core.tasks.review_tasks.process_commit_review': {'queue': 'webhook'},
+    'core.tasks.review_tasks.process_push_review': {'queue': 'webhook'},
+    'core.tasks.review_tasks.cancel_review_run': {'queue': 'control'},
+    # It measures the webhook queue's backlog and must not wait behind the reviews in it
+    'core.tasks.review_tasks.dispatch_fair_reviews': {'queue': 'control'},
+    'core.tasks.usage_tasks.*': {'queue': 'backfill'},
+    'core.tasks.maintenance_tasks.*': {'queue': 'backfill'},
+}
+# Reviews run for minutes; a worker should not hold queued tasks it cannot start yet
+app.conf.worker_prefetch_multiplier = 1
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
+import json
 import os
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -167,6 +169,7 @@ GITHUB_CLIENT_ID = "Ov23liI7bdjnUEQpEQwJ"  # Replace with actual value or load f
 GITHUB_CLIENT_SECRET = "6f1e13cf4d4b274465656d12ac174d65187c0272" # Replace with actual value or load from env
 GITHUB_CALLBACK_URL = "http://localhost:8000/api/v1/auth/github/callback" # Replace with actual value or load from env
 GITHUB_WEBHOOK_SECRET = "lhigjojihgfdtyuiodghj64thjki" # From your FastAPI config
+GITHUB_API_TIMEOUT = float(os.getenv('GITHUB_API_TIMEOUT', 20)) # Seconds per GitHub API request
 FRONTEND_URL = "http://localhost:5173" # From your FastAPI config
 # JWT Settings (if using django-rest-framework-simplejwt)
 SIMPLE_JWT = {
@@ -208,9 +211,62 @@ DEFAULT_TEMPERATURE = 0.3
 DEFAULT_MAX_TOKENS = 32768
 DEFAULT_MAX_TOOL_CALLS = 7
 
+# Review scheduling
+REVIEW_DEBOUNCE_SECONDS = int(os.getenv('REVIEW_DEBOUNCE_SECONDS', 60)) # Quiet window before a pushed PR head is reviewed
+REVIEW_INCREMENTAL_ENABLED = os.getenv('REVIEW_INCREMENTAL_ENABLED', 'True') == 'True' # Review only commits since the last completed review of a PR
+REVIEW_INCREMENTAL_MAX_CHANGED_FILES = int(os.getenv('REVIEW_INCREMENTAL_MAX_CHANGED_FILES', 100)) # Larger deltas get a full review
+REVIEW_SHARDING_ENABLED = os.getenv('REVIEW_SHARDING_ENABLED', 'True') == 'True' # Review large PRs as parallel runs over file groups
+REVIEW_SHARD_TARGET_CHANGES = int(os.getenv('REVIEW_SHARD_TARGET_CHANGES', 1500)) # Changed lines per shard
+REVIEW_SHARD_MAX_FILES = int(os.getenv('REVIEW_SHARD_MAX_FILES', 25)) # Files per shard
+REVIEW_SHARD_MAX_SHARDS = int(os.getenv('REVIEW_SHARD_MAX_SHARDS', 6)) # Parallel runs per review
+# Changed files not sent to the review agent, unless a repository sets its own review_exclude_globs
+REVIEW_DEFAULT_EXCLUDE_GLOBS = [pattern.strip() for pattern in os.getenv(
+    'REVIEW_DEFAULT_EXCLUDE_GLOBS',
+    '*.lock,package-lock.json,pnpm-lock.yaml,go.sum,*.min.js,*.min.css,*.map,*.snap,*_pb2.py,*.pb.go,'
+    'vendor/*,*/vendor/*,node_modules/*,*/node_modules/*,dist/*'
+).split(',') if pattern.strip()]
+REVIEW_MAX_FILE_CHANGES = int(os.getenv('REVIEW_MAX_FILE_CHANGES', 3000)) # Files with more changed lines are summarized, not reviewed
+REVIEW_CHUNK_TOKEN_BUDGET = int(os.getenv('REVIEW_CHUNK_TOKEN_BUDGET', 24000)) # Diff tokens per review run; more is split into parallel runs
+REVIEW_MODEL_TIERS = json.loads(os.getenv('REVIEW_MODEL_TIERS', '[]')) # e.g. [{"model": "CEREBRAS::llama3.1-8b", "max_tokens": 8000}, {"model": "CEREBRAS::llama-3.3-70b", "max_tokens": null}]; [] always uses llm_preference
+REVIEW_PUSH_MODE = os.getenv('REVIEW_PUSH_MODE', 'off') # off, range (one review of before..after) or fan_out (per-commit reviews, one summary)
+REVIEW_PUSH_DEFAULT_BRANCH_ONLY = os.getenv('REVIEW_PUSH_DEFAULT_BRANCH_ONLY', 'True') == 'True' # Other branches are reviewed through their PRs
+REVIEW_PUSH_MAX_FAN_OUT = int(os.getenv('REVIEW_PUSH_MAX_FAN_OUT', 20)) # Larger pushes are reviewed as one range instead
+
+# Diffs prefetched for the review agent, stored once per base..head (see core.diff_artifacts)
+DIFF_ARTIFACTS_ENABLED = os.getenv('DIFF_ARTIFACTS_ENABLED', 'True') == 'True'
+DIFF_ARTIFACT_MAX_FILE_BYTES = int(os.getenv('DIFF_ARTIFACT_MAX_FILE_BYTES', 100000)) # Larger files are passed as patch only
+DIFF_ARTIFACT_MAX_BYTES = int(os.getenv('DIFF_ARTIFACT_MAX_BYTES', 2000000)) # File contents kept per diff
+DIFF_ARTIFACT_FETCH_CONCURRENCY = int(os.getenv('DIFF_ARTIFACT_FETCH_CONCURRENCY', 8)) # Parallel GitHub content requests
+DIFF_ARTIFACT_MAX_FILES = int(os.getenv('DIFF_ARTIFACT_MAX_FILES', 300)) # Files whose contents are downloaded per diff
+DIFF_ARTIFACT_FETCH_DEADLINE = int(os.getenv('DIFF_ARTIFACT_FETCH_DEADLINE', 60)) # Seconds a review may spend prefetching before the agent fetches for itself
+DIFF_ARTIFACT_RETENTION_DAYS = int(os.getenv('DIFF_ARTIFACT_RETENTION_DAYS', 14))
+# Concurrent reviews per LLM model and per repository, enforced across workers in Redis
+REVIEW_CONCURRENCY_REDIS_URL = os.getenv('REVIEW_CONCURRENCY_REDIS_URL', os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1'))
+REVIEW_CONCURRENCY_PER_MODEL = int(os.getenv('REVIEW_CONCURRENCY_PER_MODEL', 4))
+REVIEW_CONCURRENCY_PER_REPO = int(os.getenv('REVIEW_CONCURRENCY_PER_REPO', 2))
+REVIEW_MODEL_CONCURRENCY_LIMITS = json.loads(os.getenv('REVIEW_MODEL_CONCURRENCY_LIMITS', '{}')) # e.g. {"cerebras::llama-3.3-70b": 8}, keys lower-case
+REVIEW_SLOT_LEASE_SECONDS = int(os.getenv('REVIEW_SLOT_LEASE_SECONDS', 1800)) # Slots of crashed workers free themselves after this
+REVIEW_SLOT_RETRY_DELAY = int(os.getenv('REVIEW_SLOT_RETRY_DELAY', 15)) # Base seconds before a throttled review task is retried
+# Fair scheduling of webhook-driven reviews across repositories
+REVIEW_FAIR_SCHEDULING_ENABLED = os.getenv('REVIEW_FAIR_SCHEDULING_ENABLED', 'True') == 'True'
+REVIEW_FAIR_DISPATCH_INTERVAL = int(os.getenv('REVIEW_FAIR_DISPATCH_INTERVAL', 5)) # Seconds between dispatcher runs
+REVIEW_FAIR_QUEUE_TARGET_DEPTH = int(os.getenv('REVIEW_FAIR_QUEUE_TARGET_DEPTH', 8)) # Review tasks kept waiting in the webhook queue
+REVIEW_FAIR_REPO_WEIGHTS = json.loads(os.getenv('REVIEW_FAIR_REPO_WEIGHTS', '{}')) # e.g. {"42": 3}: jobs per round for repository 42
+REVIEW_PROGRESS_MIN_INTERVAL = float(os.getenv('REVIEW_PROGRESS_MIN_INTERVAL', 2)) # Min seconds between partial review_data saves
+REVIEW_PROGRESS_TTL = int(os.getenv('REVIEW_PROGRESS_TTL', 3600)) # Seconds a published progress event stays readable
+
+# Deadlines (seconds). A review task's budget is handed down to its LangGraph run and GitHub calls.
+REVIEW_TASK_DEADLINE = int(os.getenv('REVIEW_TASK_DEADLINE', 1200)) # Budget for one review once it holds its slots
+REVIEW_TASK_TIME_LIMIT = REVIEW_TASK_DEADLINE + int(os.getenv('REVIEW_TASK_GRACE_SECONDS', 120)) # Celery hard limit, a backstop for the deadline
+REVIEW_STALE_AFTER = REVIEW_TASK_TIME_LIMIT + 300 # In-progress reviews untouched for this long are failed by fail_stale_reviews
+FEEDBACK_RUN_DEADLINE = int(os.getenv('FEEDBACK_RUN_DEADLINE', 180)) # Chat replies are awaited inside a web request
+
 # LangGraph
 LANGGRAPH_API_URL = os.getenv('LANGGRAPH_API_URL', 'http://localhost:8123')
 LANGGRAPH_API_KEY = os.getenv('LANGGRAPH_API_KEY', '')
+LANGGRAPH_CONNECT_TIMEOUT = float(os.getenv('LANGGRAPH_CONNECT_TIMEOUT', 5))
+LANGGRAPH_READ_TIMEOUT = float(os.getenv('LANGGRAPH_READ_TIMEOUT', 120)) # Longest silence tolerated on a response or stream
+LANGGRAPH_RECURSION_LIMIT = int(os.getenv('LANGGRAPH_RECURSION_LIMIT', 500)) # Max graph steps per run
 LANGSMITH_API_KEY = os.getenv('LANGSMITH_API_KEY', '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')
 # LangGraph Assistant Configuration
 LANGGRAPH_REVIEW_ASSISTANT_ID = os.getenv('LANGGRAPH_REVIEW_ASSISTANT_ID', "80c5c4d8-dc67-5ab3-8734-c1e23e87e5ad")
@@ -224,6 +280,61 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_IMPORTS = (
+    'core.tasks.review_tasks',
+    'core.tasks.maintenance_tasks',
+    'core.tasks.usage_tasks',
+)
+CELERY_BEAT_SCHEDULE = {
+    'prune-webhook-event-logs': {
+        'task': 'core.tasks.maintenance_tasks.prune_webhook_event_logs',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'dispatch-fair-reviews': {
+        'task': 'core.tasks.review_tasks.dispatch_fair_reviews',
+        'schedule': timedelta(seconds=REVIEW_FAIR_DISPATCH_INTERVAL),
+        'options': {'expires': REVIEW_FAIR_DISPATCH_INTERVAL}, # A late round is superseded by the next one
+    },
+    'reconcile-llm-usage': {
+        'task': 'core.tasks.usage_tasks.reconcile_llm_usage',
+        'schedule': crontab(minute='*/10'),
+    },
+    'prune-diff-artifacts': {
+        'task': 'core.tasks.maintenance_tasks.prune_diff_artifacts',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'fail-stale-reviews': {
+        'task': 'core.tasks.maintenance_tasks.fail_stale_reviews',
+        'schedule': crontab(minute='*/5'),
+    },
+}
+
+# LLM usage collection from LangSmith
+LLM_USAGE_COLLECT_DELAY = int(os.getenv('LLM_USAGE_COLLECT_DELAY', 5)) # Seconds before the first LangSmith read, doubled per retry
+LLM_USAGE_COLLECT_MAX_DELAY = int(os.getenv('LLM_USAGE_COLLECT_MAX_DELAY', 300)) # Cap on the retry backoff
+LLM_USAGE_COLLECT_MAX_RETRIES = int(os.getenv('LLM_USAGE_COLLECT_MAX_RETRIES', 6))
+LLM_USAGE_RECONCILE_BATCH_SIZE = int(os.getenv('LLM_USAGE_RECONCILE_BATCH_SIZE', 100)) # Runs per LangSmith list-runs call
+LLM_USAGE_UNAVAILABLE_AFTER_HOURS = int(os.getenv('LLM_USAGE_UNAVAILABLE_AFTER_HOURS', 24)) # Stop polling runs LangSmith never reports
+
+# Webhook event retention
+WEBHOOK_EVENT_RETENTION_DAYS = int(os.getenv('WEBHOOK_EVENT_RETENTION_DAYS', 30)) # Older deliveries are pruned nightly
+WEBHOOK_EVENT_PRUNE_BATCH_SIZE = int(os.getenv('WEBHOOK_EVENT_PRUNE_BATCH_SIZE', 5000)) # Rows deleted per statement
+
+# Cache - shared across web and Celery workers (webhook secret lookups, etc.)
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL', 'redis://localhost:6379/1')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+    }
+}
+
+# Webhook secret cache: repo_name -> (repo_id, webhook_secret)
+WEBHOOK_SECRET_CACHE_TTL = int(os.getenv('WEBHOOK_SECRET_CACHE_TTL', 3600)) # Seconds in the shared cache
+WEBHOOK_SECRET_LOCAL_CACHE_TTL = int(os.getenv('WEBHOOK_SECRET_LOCAL_CACHE_TTL', 30)) # Seconds in each process
+WEBHOOK_SECRET_LOCAL_CACHE_SIZE = int(os.getenv('WEBHOOK_SECRET_LOCAL_CACHE_SIZE', 1024)) # Max repos per process
+WEBHOOK_SECRET_REFRESH_INTERVAL = int(os.getenv('WEBHOOK_SECRET_REFRESH_INTERVAL', 60)) # Min seconds between DB re-reads of a repo's secret after a bad signature
+WEBHOOK_DELIVERY_DEDUP_TTL = int(os.getenv('WEBHOOK_DELIVERY_DEDUP_TTL', 86400)) # Seconds an X-GitHub-Delivery ID is remembered
 
 # It's highly recommended to load sensitive keys and environment-specific settings
 # from environment variables rather than hardcoding them.
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useParams } from "react-router-dom";
 import {
   Box,
@@ -24,6 +24,9 @@ import ThreadList from "../components/review/ThreadList";
 import { reviewService } from "../services/reviewService";
 import { SmartToy as AIIcon } from "@mui/icons-material";
 
+const PROGRESS_POLL_INTERVAL_MS = 3000;
+const RUNNING_STATUSES = ["pending", "in_progress"];
+
 const ReviewPage = () => {
   const { reviewId } = useParams();
   const [reviewData, setReviewData] = useState(null);
@@ -39,6 +42,8 @@ const ReviewPage = () => {
   const [ratingSuccess, setRatingSuccess] = useState(false);
   const [ratingError, setRatingError] = useState(null);
   const [currentDisplayedReview, setCurrentDisplayedReview] = useState(null);
+  const [progress, setProgress] = useState(null);
+  const lastCheckpointRef = useRef(null);
   // Fetch initial data
   useEffect(() => {
     const fetchReviewData = async () => {
@@ -72,6 +77,37 @@ const ReviewPage = () => {
     fetchReviewData();
   }, [reviewId]);
 
+  // While the review is running, poll its lightweight progress and
+  // re-fetch the partial report only when a new checkpoint was saved
+  const reviewStatus = reviewData?.status;
+  useEffect(() => {
+    if (!RUNNING_STATUSES.includes(reviewStatus)) return undefined;
+
+    const pollProgress = async () => {
+      try {
+        const latest = await reviewService.getReviewProgress(reviewId);
+        setProgress(latest);
+        const checkpointKey = `${latest.status}:${latest.checkpoint}`;
+        if (checkpointKey === lastCheckpointRef.current) return;
+        lastCheckpointRef.current = checkpointKey;
+
+        const data = await reviewService.getReview(reviewId);
+        setReviewData(data);
+        setCurrentDisplayedReview(
+          data?.review_data?.final_result || data?.review_data || null
+        );
+        if (!RUNNING_STATUSES.includes(data.status)) {
+          await fetchReviewThreads();
+        }
+      } catch (err) {
+        console.error("Error polling review progress:", err);
+      }
+    };
+
+    const intervalId = setInterval(pollProgress, PROGRESS_POLL_INTERVAL_MS);
+    return () => clearInterval(intervalId);
+  }, [reviewId, reviewStatus]);
+
   // Fetch threads function (can be called after updates)
   const fetchReviewThreads = async () => {
     try {
@@ -193,6 +229,9 @@ const ReviewPage = () => {
           </strong>
           {reviewData?.repository &&
             ` • Repository: ${reviewData.repository.repo_name}`}
+          {RUNNING_STATUSES.includes(reviewData?.status) &&
+            progress?.files_with_findings > 0 &&
+            ` • Files with findings so far: ${progress.files_with_findings}`}
         </Typography>
       </Box>
 
@@ -28,6 +28,17 @@ export const reviewService = {
     }
   },
 
+  // Get lightweight progress for a pending or running review
+  getReviewProgress: async (reviewId) => {
+    try {
+      const response = await apiClient.get(`/reviews/${reviewId}/progress/`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching review progress:', error);
+      throw error;
+    }
+  },
+
   // Get review history
   getReviewHistory: async (context, id) => {
     try {